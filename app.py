@@ -1,16 +1,21 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-from datetime import datetime, date, timedelta
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import json
-import sqlite3
-from sqlite3 import Error
+from datetime import date, timedelta
 import calendar
-import time
-import threading
+import os
+
+# numpy/plotly são importados nas funções que desenham gráficos: módulos sem
+# gráficos (e a primeira execução do processo) não pagam por eles
+
+from orion import (
+    booking, cache, database, forecast, housekeeping, instrumentation, inventory, jobs, kpis, properties,
+    reports, reservations
+)
+from orion.availability import OUT_OF_SERVICE_STATUSES, get_month_occupancy, get_occupancy_matrix
+from orion.guests import MIN_QUERY_LENGTH as MIN_GUEST_QUERY_LENGTH, get_guest, get_guest_stays, search_guests
+from orion.revenue import RevenueManagementSystem, get_rate_trend
+from orion.search import search_availability
+from orion.units import get_unit_codes, get_units
 
 # Configuração da página
 st.set_page_config(
@@ -82,170 +87,6 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Inicialização do banco de dados com schema avançado
-def init_advanced_db():
-    conn = sqlite3.connect('orion_pms.db')
-    c = conn.cursor()
-    
-    # Tabela de hóspedes com dados completos
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS guests (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            first_name TEXT NOT NULL,
-            last_name TEXT NOT NULL,
-            email TEXT,
-            phone TEXT,
-            document_type TEXT,
-            document_number TEXT UNIQUE,
-            nationality TEXT,
-            date_of_birth DATE,
-            preferences TEXT,
-            loyalty_tier TEXT DEFAULT 'Standard',
-            loyalty_points INTEGER DEFAULT 0,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    # Tabela de unidades habitacionais com atributos avançados
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS units (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            code TEXT UNIQUE NOT NULL,
-            name TEXT,
-            type TEXT NOT NULL,
-            floor INTEGER,
-            capacity INTEGER DEFAULT 2,
-            max_capacity INTEGER DEFAULT 2,
-            base_rate DECIMAL(10, 2) NOT NULL,
-            status TEXT DEFAULT 'available',
-            amenities TEXT,
-            view_type TEXT,
-            cleaning_time INTEGER DEFAULT 30,
-            last_maintenance DATE,
-            next_maintenance DATE,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    # Tabela de reservas com campos expandidos
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS reservations (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            confirmation_code TEXT UNIQUE,
-            guest_id INTEGER,
-            unit_id INTEGER,
-            check_in DATE NOT NULL,
-            check_out DATE NOT NULL,
-            adults INTEGER DEFAULT 1,
-            children INTEGER DEFAULT 0,
-            status TEXT DEFAULT 'confirmed',
-            source TEXT NOT NULL,
-            rate DECIMAL(10, 2) NOT NULL,
-            total_amount DECIMAL(12, 2),
-            currency TEXT DEFAULT 'BRL',
-            payment_status TEXT DEFAULT 'pending',
-            payment_method TEXT,
-            special_requests TEXT,
-            notes TEXT,
-            created_by INTEGER,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (guest_id) REFERENCES guests (id),
-            FOREIGN KEY (unit_id) REFERENCES units (id)
-        )
-    ''')
-    
-    # Tabela de tarifas dinâmicas
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS rates (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            unit_type TEXT NOT NULL,
-            date DATE NOT NULL,
-            rate DECIMAL(10, 2) NOT NULL,
-            min_stay INTEGER DEFAULT 1,
-            max_stay INTEGER DEFAULT 30,
-            stop_sell BOOLEAN DEFAULT FALSE,
-            cutof_days INTEGER DEFAULT 0,
-            availability INTEGER DEFAULT 0,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            UNIQUE(unit_type, date)
-        )
-    ''')
-    
-    # Tabela de tarefas de housekeeping
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS housekeeping (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            unit_id INTEGER NOT NULL,
-            task_type TEXT NOT NULL,
-            status TEXT DEFAULT 'pending',
-            assigned_to TEXT,
-            estimated_time INTEGER,
-            actual_time INTEGER,
-            notes TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            completed_at TIMESTAMP,
-            FOREIGN KEY (unit_id) REFERENCES units (id)
-        )
-    ''')
-    
-    # Inserir dados iniciais
-    c.execute("SELECT COUNT(*) FROM units")
-    if c.fetchone()[0] == 0:
-        # Unidades de exemplo
-        units_data = [
-            ('101', 'Standard City View', 'Standard', 1, 2, 2, 250.00, 'available', 
-             'WiFi, TV, Ar-condicionado, Frigobar', 'city', 30, '2024-01-15', '2024-07-15'),
-            ('102', 'Standard Garden View', 'Standard', 1, 2, 2, 280.00, 'available', 
-             'WiFi, TV, Ar-condicionado, Frigobar, Varanda', 'garden', 30, '2024-01-20', '2024-07-20'),
-            ('201', 'Luxo Premium', 'Luxo', 2, 3, 4, 450.00, 'available', 
-             'WiFi, TV LED, Ar-condicionado, Frigobar, Varanda, Hidromassagem', 'ocean', 45, '2024-02-10', '2024-08-10'),
-            ('202', 'Luxo Executivo', 'Luxo', 2, 2, 3, 420.00, 'maintenance', 
-             'WiFi, TV LED, Ar-condicionado, Frigobar, Área de trabalho', 'city', 45, '2024-02-15', '2024-08-15'),
-            ('301', 'Suíte Master', 'Suite', 3, 4, 6, 750.00, 'available', 
-             'WiFi, TV 4K, Ar-condicionado, Frigobar, Varanda, Hidromassagem, Cozinha', 'ocean', 60, '2024-03-01', '2024-09-01')
-        ]
-        
-        c.executemany(
-            """INSERT INTO units 
-            (code, name, type, floor, capacity, max_capacity, base_rate, status, amenities, view_type, cleaning_time, last_maintenance, next_maintenance) 
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-            units_data
-        )
-        
-        # Tarifas de exemplo
-        today = date.today()
-        rate_data = []
-        for i in range(90):  # 90 dias de tarifas
-            current_date = today + timedelta(days=i)
-            for unit_type in ['Standard', 'Luxo', 'Suite']:
-                # Lógica de precificação dinâmica simulada
-                base_rate = 250.00 if unit_type == 'Standard' else 450.00 if unit_type == 'Luxo' else 750.00
-                
-                # Aumento de preço nos finais de semana
-                if current_date.weekday() >= 5:  # Sábado ou Domingo
-                    base_rate *= 1.3
-                
-                # Aumento de preço em feriados (exemplo simplificado)
-                holiday_multiplier = 1.5 if current_date.month == 12 and current_date.day in [24, 25, 31] else 1.0
-                base_rate *= holiday_multiplier
-                
-                rate_data.append((
-                    unit_type, current_date, round(base_rate, 2), 
-                    1, 30, False, 14, 5
-                ))
-        
-        c.executemany(
-            """INSERT INTO rates 
-            (unit_type, date, rate, min_stay, max_stay, stop_sell, cutof_days, availability) 
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
-            rate_data
-        )
-    
-    conn.commit()
-    return conn
-
 # Componentes modernos da interface
 def create_modern_metric_card(title, value, change=None, icon="📊", help_text=None):
     """Cria um cartão de métrica moderno"""
@@ -269,154 +110,230 @@ def create_modern_metric_card(title, value, change=None, icon="📊", help_text=
     """
     return card
 
+def current_db_path():
+    """Banco da propriedade selecionada na barra lateral (ou o banco padrão)"""
+    configured = properties.get_properties()
+    if not configured:
+        return database.DEFAULT_DB_PATH
+    code = st.session_state.get('property')
+    return configured[code if code in configured else next(iter(configured))]['db_path']
+
+@instrumentation.timed('figure')
 def create_availability_calendar(unit_id, month, year):
     """Cria um calendário visual de disponibilidade"""
+    import numpy as np
+    import plotly.graph_objects as go
+    
     cal = calendar.Calendar()
-    month_days = cal.monthdayscalendar(year, month)
-    
-    # Buscar reservas para esta unidade no mês
-    conn = init_advanced_db()
-    start_date = date(year, month, 1)
-    end_date = date(year, month, calendar.monthrange(year, month)[1])
-    
-    reservations = pd.read_sql_query("""
-        SELECT check_in, check_out FROM reservations 
-        WHERE unit_id = ? AND status IN ('confirmed', 'checked-in')
-        AND ((check_in BETWEEN ? AND ?) OR (check_out BETWEEN ? AND ?))
-    """, conn, params=(unit_id, start_date, end_date, start_date, end_date))
-    conn.close()
-    
-    # Criar calendário
-    fig = make_subplots(
-        rows=len(month_days), cols=7,
-        subplot_titles=[calendar.day_abbr[i] for i in range(7)],
-        vertical_spacing=0.05,
-        horizontal_spacing=0.05
-    )
+    month_days = np.array(cal.monthdayscalendar(year, month))
     
-    # Adicionar dias e reservas
-    for row_idx, week in enumerate(month_days):
-        for col_idx, day in enumerate(week):
-            if day != 0:
-                current_date = date(year, month, day)
-                
-                # Verificar se está reservado
-                is_reserved = any(
-                    row['check_in'] <= current_date <= row['check_out'] 
-                    for _, row in reservations.iterrows()
-                )
-                
-                color = 'red' if is_reserved else 'green'
-                
-                fig.add_trace(
-                    go.Scatter(
-                        x=[col_idx + 0.5], y=[row_idx + 0.5],
-                        text=[str(day)],
-                        mode='text+markers',
-                        marker=dict(size=30, color=color, opacity=0.3),
-                        textfont=dict(size=14, color='black'),
-                        showlegend=False
-                    ),
-                    row=row_idx + 1, col=col_idx + 1
-                )
+    # Ocupação da unidade no mês (uma consulta, expansão vetorizada)
+    occupancy = get_month_occupancy([unit_id], month, year, db_path=current_db_path())
+    occupied_nights = occupancy.unit_row(unit_id)
+    
+    # Grade semanas × dias da semana; posições fora do mês ficam vazias
+    in_month = month_days > 0
+    z = np.full(month_days.shape, np.nan)
+    z[in_month] = occupied_nights[month_days[in_month] - 1]
+    labels = np.where(in_month, month_days.astype(str), '')
     
+    # Um único trace de heatmap para o mês inteiro
+    fig = go.Figure(go.Heatmap(
+        z=z,
+        x=[calendar.day_abbr[i] for i in range(7)],
+        text=labels,
+        texttemplate='%{text}',
+        textfont=dict(size=14, color='black'),
+        colorscale=[[0, 'rgba(56, 161, 105, 0.35)'], [1, 'rgba(229, 62, 62, 0.35)']],
+        zmin=0, zmax=1,
+        showscale=False,
+        xgap=4, ygap=4,
+        hoverinfo='skip'
+    ))
+    
+    fig.update_yaxes(autorange='reversed', showticklabels=False)
+    fig.update_xaxes(side='top')
     fig.update_layout(
-        height=200,
-        showlegend=False,
+        height=60 * len(month_days) + 80,
+        margin=dict(l=10, r=10, t=70, b=10),
         title=f"Disponibilidade - {calendar.month_name[month]} {year}"
     )
     
     return fig
 
-# Módulo de Revenue Management Inteligente
-class RevenueManagementSystem:
-    def __init__(self):
-        self.conn = init_advanced_db()
-    
-    def calculate_optimal_rate(self, unit_type, check_in, length_of_stay, current_occupancy):
-        """Calcula a tarifa ideal baseada em múltiplos fatores"""
-        # Obter tarifa base
-        base_rate_df = pd.read_sql_query(
-            "SELECT rate FROM rates WHERE unit_type = ? AND date = ?",
-            self.conn, params=(unit_type, check_in)
-        )
-        
-        if base_rate_df.empty:
-            # Se não encontrar tarifa específica, usar base padrão
-            base_rate = 250.00 if unit_type == 'Standard' else 450.00 if unit_type == 'Luxo' else 750.00
-        else:
-            base_rate = base_rate_df['rate'].iloc[0]
-        
-        # Fatores de ajuste
-        day_of_week = check_in.weekday()
-        season_factor = self._get_season_factor(check_in)
-        demand_factor = self._get_demand_factor(check_in, length_of_stay)
-        occupancy_factor = self._get_occupancy_factor(current_occupancy)
-        
-        # Cálculo da tarifa ideal
-        optimal_rate = base_rate * season_factor * demand_factor * occupancy_factor
-        
-        # Ajuste para final de semana
-        if day_of_week >= 5:  # Sábado ou Domingo
-            optimal_rate *= 1.25
-        
-        return round(optimal_rate, 2)
-    
-    def _get_season_factor(self, date):
-        """Fator de ajuste sazonal"""
-        month = date.month
-        if month in [12, 1, 2]:  # Alta temporada
-            return 1.5
-        elif month in [6, 7, 11]:  # Média temporada
-            return 1.2
-        else:  # Baixa temporada
-            return 0.9
-    
-    def _get_demand_factor(self, check_in, length_of_stay):
-        """Fator baseado na demanda prevista"""
-        # Simulação de previsão de demanda
-        days_until_checkin = (check_in - date.today()).days
-        
-        if days_until_checkin <= 7:
-            return 1.8  # Última hora
-        elif days_until_checkin <= 30:
-            return 1.3  # Médio prazo
-        else:
-            return 1.0  # Longo prazo
-    
-    def _get_occupancy_factor(self, occupancy_rate):
-        """Fator baseado na ocupação atual"""
-        if occupancy_rate >= 0.9:
-            return 1.6  # Ocupação muito alta
-        elif occupancy_rate >= 0.7:
-            return 1.3  # Ocupação alta
-        elif occupancy_rate >= 0.5:
-            return 1.1  # Ocupação média
-        else:
-            return 0.95  # Ocupação baixa
+@instrumentation.timed('figure')
+def create_occupancy_grid(start_date, days, unit_types=None):
+    """Cria o mapa de ocupação de todas as unidades (linhas) por data (colunas)"""
+    import numpy as np
+    import plotly.graph_objects as go
+    
+    occupancy = get_occupancy_matrix(start_date, start_date + timedelta(days=days), unit_types=unit_types,
+                                     db_path=current_db_path())
+    
+    # 0 = livre, 1 = ocupada, 2 = fora de serviço
+    z = occupancy.occupied.astype(np.int8)
+    out_of_service = occupancy.units['status'].isin(OUT_OF_SERVICE_STATUSES).to_numpy()
+    z[out_of_service] = 2
+    
+    fig = go.Figure(go.Heatmap(
+        z=z,
+        x=occupancy.dates,
+        y=occupancy.units['code'] + ' · ' + occupancy.units['type'],
+        colorscale=[
+            [0, '#c6f6d5'], [0.33, '#c6f6d5'],
+            [0.33, '#feb2b2'], [0.66, '#feb2b2'],
+            [0.66, '#cbd5e0'], [1, '#cbd5e0']
+        ],
+        zmin=0, zmax=2,
+        showscale=False,
+        xgap=1, ygap=1,
+        hovertemplate='%{y}<br>%{x|%d/%m/%Y}<extra></extra>'
+    ))
+    
+    fig.update_yaxes(autorange='reversed', type='category')
+    fig.update_layout(
+        height=min(max(18 * len(occupancy.units) + 80, 250), 1200),
+        margin=dict(l=10, r=10, t=30, b=10),
+        title="🟩 Livre   🟥 Ocupada   ⬜ Fora de serviço"
+    )
+    
+    return fig
 
-# Sistema de auto-atualização simplificado
+# Cores das barras da linha do tempo por status da reserva
+TIMELINE_COLORS = {'confirmed': '#667eea', 'checked-in': '#38a169', 'checked-out': '#a0aec0'}
+TIMELINE_LABELS = {'confirmed': 'Confirmada', 'checked-in': 'Hospedado', 'checked-out': 'Encerrada'}
+
+def _epoch_ms(dates):
+    return (dates.astype('int64') / 1e6).to_numpy()
+
+@instrumentation.timed('figure')
+def create_reservation_timeline(units, stays, start, end):
+    """Linha do tempo (Gantt) unidade × data das reservas da janela visível"""
+    import numpy as np
+    import plotly.graph_objects as go
+    
+    rows = len(units)
+    row_of = pd.Series(np.arange(rows), index=units['id'])
+    row_px = min(max(900 / max(rows, 1), 6), 28)
+    
+    # Barras do meio-dia do check-in ao meio-dia do check-out, recortadas na janela.
+    # Datas em ms desde a época (float): o eixo de datas aceita e o envio é binário
+    lo = _epoch_ms(stays['check_in'].clip(lower=pd.Timestamp(start)) + pd.Timedelta(hours=13))
+    hi = _epoch_ms(stays['check_out'].clip(upper=pd.Timestamp(end)) + pd.Timedelta(hours=11))
+    y = row_of.reindex(stays['unit_id']).to_numpy(dtype=float)
+    
+    fig = go.Figure()
+    for status, color in TIMELINE_COLORS.items():
+        mask = (stays['status'] == status).to_numpy()
+        count = int(mask.sum())
+        if count == 0:
+            continue
+        # Um único trace WebGL por status: segmentos separados por lacunas (NaN)
+        x = np.full(count * 3, np.nan)
+        x[0::3], x[1::3] = lo[mask], hi[mask]
+        ys = np.full(count * 3, np.nan)
+        ys[0::3] = ys[1::3] = y[mask]
+        fig.add_trace(go.Scattergl(
+            x=x, y=ys, mode='lines', line=dict(color=color, width=row_px * 0.7),
+            name=TIMELINE_LABELS[status], legendgroup=status, hoverinfo='skip'
+        ))
+        # Marcadores no meio de cada barra carregam o hover
+        selected = stays.loc[mask]
+        fig.add_trace(go.Scattergl(
+            x=(lo[mask] + hi[mask]) / 2, y=y[mask],
+            mode='markers', marker=dict(color=color, size=row_px * 0.7, symbol='square'),
+            legendgroup=status, showlegend=False,
+            customdata=np.column_stack([
+                selected['confirmation_code'], selected['guest_name'],
+                selected['check_in'].dt.strftime('%d/%m'), selected['check_out'].dt.strftime('%d/%m'),
+                selected['source'].astype(str),
+            ]),
+            hovertemplate='<b>%{customdata[0]}</b> · %{customdata[1]}<br>'
+                          '%{customdata[2]} → %{customdata[3]} · %{customdata[4]}<extra></extra>'
+        ))
+    
+    out_of_service = units['status'].isin(OUT_OF_SERVICE_STATUSES).to_numpy()
+    labels = np.where(out_of_service, '⛔ ', '') + units['code'].astype(str) + ' · ' + units['type'].astype(str)
+    fig.update_yaxes(
+        tickmode='array', tickvals=np.arange(rows), ticktext=labels,
+        range=[rows - 0.5, -0.5], fixedrange=True, showgrid=False
+    )
+    fig.update_xaxes(range=[pd.Timestamp(start), pd.Timestamp(end)], dtick=86400000, tickformat='%d/%m', side='top')
+    if start <= date.today() < end:
+        fig.add_vline(x=pd.Timestamp(date.today()) + pd.Timedelta(hours=12), line_dash='dot', line_color='#e53e3e')
+    fig.update_layout(
+        height=int(min(max(rows * row_px + 120, 300), 1400)),
+        margin=dict(l=10, r=10, t=60, b=10),
+        legend=dict(orientation='h', y=-0.02),
+        hoverlabel=dict(bgcolor='white')
+    )
+    return fig
+
+@instrumentation.timed('figure')
+def create_occupancy_by_type_chart(date_range, unit_types=None):
+    """Gráfico de barras da ocupação por tipo de unidade"""
+    import plotly.express as px
+    
+    return px.bar(
+        get_occupancy_by_unit_type(date_range, unit_types),
+        x='unit_type', y='occupancy_rate',
+        color='unit_type',
+        labels={'unit_type': 'Tipo de Unidade', 'occupancy_rate': 'Taxa de Ocupação (%)'}
+    )
+
+@instrumentation.timed('figure')
+def create_revenue_forecast_chart(unit_types=None):
+    """Gráfico da receita projetada para os próximos dias"""
+    import plotly.express as px
+    
+    revenue = get_revenue_forecast(unit_types=unit_types).rename(columns={
+        'otb_revenue': 'Contratada', 'projected_revenue': 'Projetada'
+    })
+    return px.line(
+        revenue, x='date', y=['Contratada', 'Projetada'],
+        labels={'date': 'Data', 'value': 'Receita (R$)', 'variable': ''},
+        markers=True
+    )
+
+# Sistema de auto-atualização parcial
 class AutoRefreshSystem:
-    def __init__(self, interval_minutes=2):
-        self.interval = interval_minutes * 60  # Converter para segundos
-        self.last_refresh = time.time()
+    """Atualiza apenas as áreas ao vivo do dashboard, cada uma no seu intervalo"""
+    
+    DEFAULT_INTERVALS = {'kpis': 60, 'arrivals': 60, 'availability': 120}  # segundos
     
-    def check_refresh(self):
-        current_time = time.time()
-        if current_time - self.last_refresh >= self.interval:
-            self.last_refresh = current_time
-            return True
-        return False
+    def __init__(self, intervals=None, enabled=True):
+        self.intervals = dict(self.DEFAULT_INTERVALS, **(intervals or {}))
+        self.enabled = enabled
+        self._rendered = {}
+    
+    def run_every(self, section):
+        """Intervalo do fragmento (None desliga a atualização automática)"""
+        return self.intervals[section] if self.enabled else None
+    
+    def render(self, section, tables, params, build):
+        """Reaproveita o conteúdo da área se nem os dados (da propriedade) nem os parâmetros mudaram"""
+        db_path = current_db_path()
+        versions = cache.get_data_versions(db_path)
+        key = (db_path, tuple(versions.get(table, 0) for table in tables), repr(params))
+        rendered = self._rendered.get(section)
+        if rendered is not None and rendered[0] == key:
+            return rendered[1]
+        content = build()
+        self._rendered[section] = (key, content)
+        return content
 
 # Interface principal moderna
 def main():
+    # Schema e pool de conexões são criados apenas na primeira execução do processo
+    database.get_pool(current_db_path())
+    
+    # Rotinas recorrentes (reprecificação, estatísticas, housekeeping...) numa
+    # thread do processo, fora da renderização; iniciada uma única vez
+    jobs.start_scheduler()
+    
     # Inicializar sistema de auto-atualização
     if 'refresh_system' not in st.session_state:
-        st.session_state.refresh_system = AutoRefreshSystem(interval_minutes=2)
-    
-    # Verificar se precisa atualizar
-    if st.session_state.refresh_system.check_refresh():
-        st.rerun()
+        st.session_state.refresh_system = AutoRefreshSystem()
     
     st.markdown('<h1 class="main-header">🏨 Orion PMS - Sistema de Gestão Hoteleira</h1>', unsafe_allow_html=True)
     
@@ -430,6 +347,12 @@ def main():
         </div>
         """, unsafe_allow_html=True)
         
+        # Multipropriedade: as telas de uma propriedade usam o banco escolhido aqui
+        configured = properties.get_properties()
+        if len(configured) > 1:
+            st.selectbox("Propriedade", list(configured), key="property",
+                         format_func=lambda code: configured[code]['name'])
+        
         st.header("Navegação")
         menu_options = ["Dashboard", "Reservas", "Hóspedes", "Unidades", "Tarifas", "Housekeeping", "Relatórios", "Revenue Management"]
         selected_menu = st.selectbox("Selecione o módulo:", menu_options, label_visibility="collapsed")
@@ -450,112 +373,278 @@ def main():
                 options=["Standard", "Luxo", "Suite"],
                 default=["Standard", "Luxo", "Suite"]
             )
+            
+            # Multipropriedade: KPIs consolidados de todos os hotéis
+            group_view = properties.is_multi_property() and st.toggle(
+                "Visão do grupo", value=True,
+                help=f"Consolida as {len(properties.get_properties())} propriedades cadastradas"
+            )
+        
+        st.session_state.refresh_system.enabled = st.toggle(
+            "Atualização automática",
+            value=st.session_state.refresh_system.enabled,
+            help="Atualiza KPIs, chegadas e disponibilidade sem recarregar a página"
+        )
+        
+        show_instrumentation = st.toggle(
+            "Painel de desempenho",
+            key="show_instrumentation",
+            help="Tempos de renderização, consultas SQL e gráficos da última execução"
+        )
         
         # Botão de atualização manual
         if st.button("🔄 Atualizar Dados", use_container_width=True):
+            cache.clear_all()
             st.rerun()
     
-    # Navegação entre módulos
-    if selected_menu == "Dashboard":
-        show_modern_dashboard()
-    elif selected_menu == "Reservas":
-        show_reservations_module()
-    elif selected_menu == "Hóspedes":
-        show_guests_module()
-    elif selected_menu == "Revenue Management":
-        show_revenue_management_module()
-    elif selected_menu == "Unidades":
-        show_units_module()
-    else:
-        st.info(f"Módulo {selected_menu} em desenvolvimento")
+    # Navegação entre módulos (cada renderização é medida)
+    with instrumentation.collect(selected_menu) as render:
+        if selected_menu == "Dashboard" and group_view:
+            show_group_dashboard(date_range, unit_type_filter)
+        elif selected_menu == "Dashboard":
+            show_modern_dashboard(date_range, unit_type_filter)
+        elif selected_menu == "Reservas":
+            show_reservations_module()
+        elif selected_menu == "Hóspedes":
+            show_guests_module()
+        elif selected_menu == "Revenue Management":
+            show_revenue_management_module()
+        elif selected_menu == "Unidades":
+            show_units_module()
+        elif selected_menu == "Housekeeping":
+            show_housekeeping_module()
+        elif selected_menu == "Relatórios":
+            show_reports_module()
+        else:
+            st.info(f"Módulo {selected_menu} em desenvolvimento")
+    
+    if show_instrumentation:
+        with st.sidebar:
+            show_instrumentation_panel(render)
 
-def show_modern_dashboard():
-    """Dashboard moderno com métricas em tempo real"""
-    st.header("📊 Dashboard de Performance")
+def show_instrumentation_panel(render):
+    """Painel lateral com os tempos da última renderização e o log de lentidão"""
+    st.divider()
+    st.subheader("⏱️ Desempenho")
+    st.metric(f"Renderização - {render.name}", f"{render.duration_ms:.0f} ms")
     
-    # Métricas em tempo real
-    conn = init_advanced_db()
+    totals = render.totals()
+    if totals:
+        st.dataframe(
+            pd.DataFrame([
+                {'Tipo': kind, 'Qtd.': values['count'], 'Tempo (ms)': round(values['duration_ms'], 1)}
+                for kind, values in totals.items()
+            ]),
+            hide_index=True, use_container_width=True
+        )
     
-    # KPI Cards
-    col1, col2, col3, col4 = st.columns(4)
+    events = pd.DataFrame(render.events, columns=instrumentation.EVENT_FIELDS)
+    if not events.empty:
+        st.caption("Operações mais lentas")
+        st.dataframe(
+            events.nlargest(10, 'duration_ms')[['kind', 'name', 'duration_ms', 'rows']],
+            hide_index=True, use_container_width=True
+        )
     
-    with col1:
-        occupancy_rate = get_occupancy_rate()
-        st.markdown(create_modern_metric_card(
-            "Taxa de Ocupação", 
-            f"{occupancy_rate}%", 
-            change=2.5,
-            icon="🏨",
-            help_text="Percentual de unidades ocupadas"
-        ), unsafe_allow_html=True)
+    job_status = jobs.get_job_status(current_db_path())
+    if not job_status.empty:
+        st.caption("Rotinas em segundo plano")
+        st.dataframe(
+            job_status[['job', 'last_run', 'status', 'last_ms', 'avg_ms', 'failures', 'next_run_at']],
+            hide_index=True, use_container_width=True
+        )
     
-    with col2:
-        adr = get_average_daily_rate()
-        st.markdown(create_modern_metric_card(
-            "ADR (Diária Média)", 
-            f"R$ {adr}", 
-            change=3.2,
-            icon="💰",
-            help_text="Average Daily Rate - Receita média por unidade ocupada"
-        ), unsafe_allow_html=True)
+    slow = instrumentation.slow_operations()
+    st.caption(f"Log de lentidão: {len(slow)} operações ≥ {instrumentation.SLOW_THRESHOLD_MS:.0f} ms")
+    st.download_button(
+        "📥 Exportar log (CSV)",
+        instrumentation.export_csv(slow),
+        file_name="orion_slow_log.csv",
+        mime="text/csv",
+        use_container_width=True
+    )
+
+def show_modern_dashboard(date_range=None, unit_types=None):
+    """Dashboard moderno com métricas em tempo real"""
+    st.header("📊 Dashboard de Performance")
     
-    with col3:
-        revpar = get_revpar()
-        st.markdown(create_modern_metric_card(
-            "RevPAR", 
-            f"R$ {revpar}", 
-            change=1.8,
-            icon="📈",
-            help_text="Revenue Per Available Room - Receita por unidade disponível"
-        ), unsafe_allow_html=True)
+    if date_range is None:
+        date_range = (date.today(), date.today() + timedelta(days=7))
+    refresh = st.session_state.refresh_system
     
-    with col4:
-        arrivals = get_today_arrivals()
-        st.markdown(create_modern_metric_card(
-            "Check-ins Hoje", 
-            str(arrivals), 
-            change=-5.0,
-            icon="🚪",
-            help_text="Hóspedes previstos para check-in hoje"
-        ), unsafe_allow_html=True)
+    # KPI Cards (área ao vivo)
+    @st.fragment(run_every=refresh.run_every('kpis'))
+    def live_kpi_cards():
+        cards = refresh.render(
+            'kpis', ('daily_stats', 'reservations', 'units'), (date_range, unit_types, date.today()),
+            lambda: build_kpi_cards(date_range, unit_types)
+        )
+        for col, card in zip(st.columns(4), cards):
+            with col:
+                st.markdown(card, unsafe_allow_html=True)
+    
+    live_kpi_cards()
     
     # Gráficos de performance
     col1, col2 = st.columns(2)
     
+    # Figuras reaproveitadas entre reexecuções enquanto os dados não mudam
     with col1:
         st.subheader("Ocupação por Tipo de Unidade")
-        fig = px.bar(
-            get_occupancy_by_unit_type(),
-            x='unit_type', y='occupancy_rate',
-            color='unit_type',
-            labels={'unit_type': 'Tipo de Unidade', 'occupancy_rate': 'Taxa de Ocupação (%)'}
+        fig = refresh.render(
+            'occupancy_chart', ('daily_stats', 'reservations', 'units'), (date_range, unit_types, date.today()),
+            lambda: create_occupancy_by_type_chart(date_range, unit_types)
         )
         st.plotly_chart(fig, use_container_width=True)
     
     with col2:
         st.subheader("Previsão de Receita - Próximos 7 Dias")
-        revenue_data = get_revenue_forecast()
-        fig = px.line(
-            revenue_data,
-            x='date', y='projected_revenue',
-            labels={'date': 'Data', 'projected_revenue': 'Receita Projetada (R$)'},
-            markers=True
+        fig = refresh.render(
+            'revenue_chart', ('daily_stats', 'reservations', 'demand_forecast'), (unit_types, date.today()),
+            lambda: create_revenue_forecast_chart(unit_types)
         )
         st.plotly_chart(fig, use_container_width=True)
     
-    # Mapa de calor de disponibilidade
-    st.subheader("Calendário de Disponibilidade")
-    selected_unit = st.selectbox("Selecione a unidade:", get_available_units())
-    if selected_unit:
+    # Chegadas do dia (área ao vivo)
+    @st.fragment(run_every=refresh.run_every('arrivals'))
+    def live_arrivals():
+        st.subheader("Chegadas de Hoje")
+        today = date.today()
+        arrivals = refresh.render(
+            'arrivals', ('reservations', 'guests', 'units'), (unit_types, today),
+            lambda: kpis.get_arrivals(today, unit_types, db_path=current_db_path())
+        )
+        if arrivals.empty:
+            st.info("Nenhuma chegada prevista para hoje")
+        else:
+            st.dataframe(
+                arrivals,
+                column_config={'check_out': st.column_config.DateColumn('check_out', format="DD/MM/YYYY")},
+                hide_index=True, use_container_width=True
+            )
+    
+    live_arrivals()
+    
+    # Disponibilidade (área ao vivo)
+    @st.fragment(run_every=refresh.run_every('availability'))
+    def live_availability():
         today = date.today()
-        fig = create_availability_calendar(selected_unit, today.month, today.year)
+        
+        # Mapa de calor de disponibilidade
+        st.subheader("Calendário de Disponibilidade")
+        units = get_available_units()
+        selected_unit = st.selectbox("Selecione a unidade:", list(units), format_func=units.get)
+        if selected_unit:
+            fig = refresh.render(
+                'calendar', ('reservations', 'units'), (selected_unit, today.month, today.year),
+                lambda: create_availability_calendar(selected_unit, today.month, today.year)
+            )
+            st.plotly_chart(fig, use_container_width=True)
+        
+        # Visão de toda a casa: unidades × datas
+        st.subheader("Mapa de Ocupação - Todas as Unidades")
+        horizon = st.select_slider("Horizonte (dias)", options=[14, 30, 60, 90, 180], value=30)
+        fig = refresh.render(
+            'occupancy_grid', ('reservations', 'units'), (today, horizon, unit_types),
+            lambda: create_occupancy_grid(today, horizon, unit_types)
+        )
         st.plotly_chart(fig, use_container_width=True)
+    
+    live_availability()
+
+def show_group_dashboard(date_range=None, unit_types=None):
+    """Dashboard consolidado das propriedades (consultas em paralelo)"""
+    import plotly.express as px
+    
+    st.header("📊 Dashboard do Grupo")
+    
+    if date_range is None:
+        date_range = (date.today(), date.today() + timedelta(days=7))
+    start, end = _period_bounds(date_range)
+    
+    try:
+        by_property, current, changes = properties.group_kpis(start, end, unit_types)
+        daily = properties.group_daily_revenue(start, end, unit_types)
+    except properties.PropertyError as error:
+        st.error(str(error))
+        return
+    
+    cards = [
+        ("Taxa de Ocupação", f"{current['occupancy_rate']}%", 'occupancy_rate', "🏨"),
+        ("ADR (Diária Média)", f"R$ {current['adr']:.2f}", 'adr', "💰"),
+        ("RevPAR", f"R$ {current['revpar']:.2f}", 'revpar', "📈"),
+        ("Receita", f"R$ {current['revenue']:,.2f}", 'revenue', "🏦"),
+    ]
+    for col, (title, value, key, icon) in zip(st.columns(4), cards):
+        with col:
+            st.markdown(
+                create_modern_metric_card(title, value, change=changes[key], icon=icon,
+                                          help_text="Consolidado de todas as propriedades"),
+                unsafe_allow_html=True
+            )
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.subheader("Desempenho por Propriedade")
+        st.dataframe(
+            by_property.drop(columns='property').rename(columns={
+                'property_name': 'Propriedade', 'occupancy_rate': 'Ocupação (%)', 'adr': 'ADR',
+                'revpar': 'RevPAR', 'revenue': 'Receita', 'arrivals': 'Chegadas'
+            }),
+            hide_index=True, use_container_width=True
+        )
+    with col2:
+        st.subheader("Receita Diária por Propriedade")
+        with instrumentation.measure('figure', 'receita_grupo'):
+            fig = px.bar(
+                daily, x='date', y='revenue', color='property_name',
+                labels={'date': 'Data', 'revenue': 'Receita (R$)', 'property_name': 'Propriedade'}
+            )
+        st.plotly_chart(fig, use_container_width=True)
+
+def build_kpi_cards(date_range, unit_types=None):
+    """Monta o HTML dos cartões de KPI do dashboard"""
+    current, changes = get_period_kpis(date_range, unit_types)
+    arrivals, arrivals_change = get_today_arrivals(unit_types)
+    return [
+        create_modern_metric_card(
+            "Taxa de Ocupação", 
+            f"{current['occupancy_rate']}%", 
+            change=changes['occupancy_rate'],
+            icon="🏨",
+            help_text="Percentual de unidades ocupadas"
+        ),
+        create_modern_metric_card(
+            "ADR (Diária Média)", 
+            f"R$ {current['adr']:.2f}", 
+            change=changes['adr'],
+            icon="💰",
+            help_text="Average Daily Rate - Receita média por unidade ocupada"
+        ),
+        create_modern_metric_card(
+            "RevPAR", 
+            f"R$ {current['revpar']:.2f}", 
+            change=changes['revpar'],
+            icon="📈",
+            help_text="Revenue Per Available Room - Receita por unidade disponível"
+        ),
+        create_modern_metric_card(
+            "Check-ins Hoje", 
+            str(arrivals), 
+            change=arrivals_change,
+            icon="🚪",
+            help_text="Hóspedes previstos para check-in hoje"
+        ),
+    ]
 
 def show_revenue_management_module():
     """Módulo avançado de Revenue Management"""
+    import plotly.express as px
+    
     st.header("💰 Revenue Management System")
     
-    rms = RevenueManagementSystem()
+    db_path = current_db_path()
+    rms = RevenueManagementSystem(db_path)
     
     col1, col2 = st.columns(2)
     
@@ -564,11 +653,22 @@ def show_revenue_management_module():
         unit_type = st.selectbox("Tipo de Unidade", ["Standard", "Luxo", "Suite"])
         check_in = st.date_input("Data de Check-in", min_value=date.today())
         length_of_stay = st.slider("Noites", 1, 30, 3)
-        current_occupancy = st.slider("Ocupação Atual (%)", 0, 100, 75) / 100
+        
+        # Ocupação real da data (inventário); o slider permite simular outro cenário
+        day = inventory.get_day_inventory(check_in, unit_type, db_path)
+        st.metric(
+            "Ocupação na Data", f"{day['occupancy'] * 100:.0f}%",
+            help=f"{day['rooms_sold']} vendidas, {day['out_of_order']} fora de serviço, "
+                 f"{day['available']} disponíveis de {day['total_rooms']}"
+        )
+        current_occupancy = None
+        if st.checkbox("Simular outra ocupação"):
+            current_occupancy = st.slider("Ocupação Simulada (%)", 0, 100, round(day['occupancy'] * 100)) / 100
         
         optimal_rate = rms.calculate_optimal_rate(unit_type, check_in, length_of_stay, current_occupancy)
         
-        st.metric("Tarifa Ideal Recomendada", f"R$ {optimal_rate:.2f}")
+        st.metric("Tarifa Ideal Recomendada", f"R$ {optimal_rate:.2f}",
+                  help="Diária do check-in, com o desconto para estadias longas")
     
     with col2:
         st.subheader("Análise de Mercado")
@@ -576,13 +676,45 @@ def show_revenue_management_module():
         
         # Gráfico de tendência de preços
         price_trend_data = get_price_trend_data()
-        fig = px.line(
-            price_trend_data,
-            x='date', y='rate',
-            color='unit_type',
-            title='Tendência de Preços por Tipo de Unidade',
-            labels={'date': 'Data', 'rate': 'Tarifa (R$)'}
+        with instrumentation.measure('figure', 'tendencia_precos'):
+            fig = px.line(
+                price_trend_data,
+                x='date', y='rate',
+                color='unit_type',
+                title='Tendência de Preços por Tipo de Unidade',
+                labels={'date': 'Data', 'rate': 'Tarifa (R$)'}
+            )
+        st.plotly_chart(fig, use_container_width=True)
+    
+    # Reprecificação em lote do inventário
+    st.subheader("Reprecificação do Horizonte")
+    col1, col2 = st.columns([1, 3])
+    
+    with col1:
+        horizon = st.select_slider("Horizonte (dias)", options=[30, 90, 180, 365], value=90)
+        group_grid = properties.is_multi_property() and st.checkbox(
+            "Todas as propriedades", help="Grade calculada em paralelo em cada propriedade"
         )
+        # Tarifas são aplicadas na propriedade selecionada
+        apply_rates = st.button("💾 Aplicar tarifas sugeridas", disabled=group_grid, use_container_width=True)
+    
+    with col2:
+        if group_grid:
+            rate_grid = properties.group_rate_grid(date.today(), horizon)
+        else:
+            rate_grid = rms.optimize_rates(date.today(), horizon)
+        if apply_rates:
+            rms.write_rates(rate_grid)
+            st.success(f"{len(rate_grid)} tarifas atualizadas")
+        with instrumentation.measure('figure', 'tarifas_sugeridas'):
+            fig = px.line(
+                rate_grid,
+                x='date', y='optimal_rate',
+                color='unit_type',
+                line_dash='property_name' if group_grid else None,
+                labels={'date': 'Data', 'optimal_rate': 'Tarifa Sugerida (R$)', 'unit_type': 'Tipo de Unidade',
+                        'property_name': 'Propriedade'}
+            )
         st.plotly_chart(fig, use_container_width=True)
     
     # Recomendações estratégicas
@@ -618,89 +750,465 @@ def show_reservations_module():
     
     with tab1:
         st.subheader("Criar Nova Reserva")
-        st.info("Funcionalidade em desenvolvimento")
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            check_in = st.date_input("Check-in", value=date.today(), min_value=date.today(), key="search_check_in")
+        with col2:
+            check_out = st.date_input("Check-out", value=date.today() + timedelta(days=1),
+                                      min_value=date.today() + timedelta(days=1), key="search_check_out")
+        with col3:
+            adults = st.number_input("Adultos", min_value=1, max_value=10, value=2)
+        with col4:
+            children = st.number_input("Crianças", min_value=0, max_value=10, value=0)
+        
+        if check_out <= check_in:
+            st.warning("A data de check-out deve ser posterior ao check-in")
+        else:
+            results = search_availability(check_in, check_out, int(adults), int(children),
+                                          db_path=current_db_path())
+            if results.empty:
+                st.info("Nenhuma unidade disponível para os critérios informados")
+            else:
+                st.dataframe(
+                    results[['code', 'name', 'type', 'max_capacity', 'nights', 'average_rate', 'total_price', 'units_left']],
+                    column_config={
+                        'code': 'Unidade', 'name': 'Nome', 'type': 'Tipo',
+                        'max_capacity': 'Capacidade', 'nights': 'Noites',
+                        'average_rate': st.column_config.NumberColumn('Diária Média', format="R$ %.2f"),
+                        'total_price': st.column_config.NumberColumn('Total', format="R$ %.2f"),
+                        'units_left': 'Restantes'
+                    },
+                    hide_index=True,
+                    use_container_width=True
+                )
+                
+                with st.form("new_reservation"):
+                    unit_labels = dict(zip(results['unit_id'], results['code'] + ' - ' + results['type']))
+                    unit_id = st.selectbox("Unidade", list(unit_labels), format_func=unit_labels.get)
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        first_name = st.text_input("Nome")
+                        email = st.text_input("E-mail")
+                        document_number = st.text_input("Documento")
+                    with col2:
+                        last_name = st.text_input("Sobrenome")
+                        phone = st.text_input("Telefone")
+                        source = st.selectbox("Origem", booking.SOURCES)
+                    special_requests = st.text_area("Pedidos especiais")
+                    
+                    if st.form_submit_button("✅ Confirmar Reserva", use_container_width=True):
+                        if not first_name or not last_name:
+                            st.error("Informe nome e sobrenome do hóspede")
+                        else:
+                            try:
+                                created = booking.create_reservation(
+                                    int(unit_id), check_in, check_out, source,
+                                    adults=int(adults), children=int(children),
+                                    guest={
+                                        'first_name': first_name, 'last_name': last_name,
+                                        'email': email or None, 'phone': phone or None,
+                                        'document_number': document_number or None
+                                    },
+                                    special_requests=special_requests or None,
+                                    db_path=current_db_path()
+                                )
+                                st.success(
+                                    f"Reserva {created['confirmation_code']} confirmada - "
+                                    f"total R$ {created['total_amount']:.2f}"
+                                )
+                            except booking.BookingError as e:
+                                st.error(str(e))
     
     with tab2:
         st.subheader("Reservas Existentes")
-        st.info("Funcionalidade em desenvolvimento")
+        show_reservations_browser()
     
     with tab3:
         st.subheader("Visualização em Calendário")
-        st.info("Funcionalidade em desenvolvimento")
+        show_reservations_timeline()
+
+def show_reservations_browser():
+    """Lista de reservas filtrada no servidor, paginada por keyset"""
+    db_path = current_db_path()
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        statuses = st.multiselect("Status", reservations.STATUSES, default=['confirmed', 'checked-in'])
+        sources = st.multiselect("Origem", reservations.get_reservation_sources(db_path))
+    with col2:
+        period = st.date_input(
+            "Check-in entre",
+            value=(date.today() - timedelta(days=30), date.today() + timedelta(days=90))
+        )
+        units = get_unit_codes(db_path)
+        unit_ids = st.multiselect("Unidade", list(units), format_func=units.get)
+    with col3:
+        guest = st.text_input("Hóspede", placeholder="Nome, e-mail, telefone ou documento")
+        sort_labels = {'check_in': 'Check-in', 'check_out': 'Check-out', 'created_at': 'Criação'}
+        sort = st.selectbox("Ordenar por", list(sort_labels), format_func=sort_labels.get)
+        descending = st.toggle("Mais recentes primeiro", value=True)
+    
+    start, end = _period_bounds(period)
+    filters = dict(
+        statuses=statuses, sources=sources, start=start, end=end, unit_ids=unit_ids,
+        guest=guest.strip() or None, sort=sort, descending=descending, db_path=db_path
+    )
+    
+    # Pilha de cursores das páginas visitadas; reinicia quando os filtros mudam
+    state = st.session_state.setdefault('reservations_pages', {'filters': None, 'cursors': [None]})
+    if state['filters'] != filters:
+        state['filters'], state['cursors'] = filters, [None]
+    
+    page, next_cursor = reservations.list_reservations(after=state['cursors'][-1], **filters)
+    if page.empty:
+        st.info("Nenhuma reserva encontrada para os filtros informados")
+    else:
+        st.dataframe(
+            page,
+            column_order=[column for column in page.columns if column != 'id'],
+            column_config={
+                'confirmation_code': 'Código', 'guest_name': 'Hóspede', 'unit_code': 'Unidade',
+                'unit_type': 'Tipo',
+                'check_in': st.column_config.DateColumn('Check-in', format="DD/MM/YYYY"),
+                'check_out': st.column_config.DateColumn('Check-out', format="DD/MM/YYYY"),
+                'nights': 'Noites', 'adults': 'Adultos', 'children': 'Crianças',
+                'status': 'Status', 'source': 'Origem',
+                'total_amount': st.column_config.NumberColumn('Total', format="R$ %.2f"),
+                'payment_status': 'Pagamento', 'created_at': 'Criada em'
+            },
+            hide_index=True,
+            use_container_width=True
+        )
+    
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        if st.button("◀ Anterior", disabled=len(state['cursors']) == 1, use_container_width=True):
+            state['cursors'].pop()
+            st.rerun()
+    with col2:
+        st.caption(f"Página {len(state['cursors'])}")
+    with col3:
+        if st.button("Próxima ▶", disabled=next_cursor is None, use_container_width=True):
+            state['cursors'].append(next_cursor)
+            st.rerun()
+
+def _shift_timeline(days):
+    st.session_state.timeline_start += timedelta(days=days)
+
+def _reset_timeline():
+    st.session_state.timeline_start = date.today() - timedelta(days=2)
+
+def show_reservations_timeline():
+    """Linha do tempo das reservas: só a janela visível (datas × faixa de unidades) é consultada"""
+    if 'timeline_start' not in st.session_state:
+        _reset_timeline()
+    
+    col1, col2, col3, col4 = st.columns([2, 2, 2, 1])
+    with col1:
+        st.date_input("Início", key="timeline_start", format="DD/MM/YYYY")
+    with col2:
+        days = st.select_slider("Janela (dias)", options=[7, 14, 31, 62], value=31)
+    with col3:
+        unit_types = st.multiselect("Tipo de Unidade", ["Standard", "Luxo", "Suite"], key="timeline_types")
+    with col4:
+        page_size = st.selectbox("Unidades", [50, 100, 300], index=2)
+    
+    # Navegação no tempo: cada passo consulta apenas a nova janela
+    nav = st.columns(5)
+    nav[0].button("⏪", on_click=_shift_timeline, args=(-days,), use_container_width=True, help="Janela anterior")
+    nav[1].button("◀ 7 dias", on_click=_shift_timeline, args=(-7,), use_container_width=True)
+    nav[2].button("Hoje", on_click=_reset_timeline, use_container_width=True)
+    nav[3].button("7 dias ▶", on_click=_shift_timeline, args=(7,), use_container_width=True)
+    nav[4].button("⏩", on_click=_shift_timeline, args=(days,), use_container_width=True, help="Próxima janela")
+    
+    start = st.session_state.timeline_start
+    end = start + timedelta(days=days)
+    types = unit_types or None
+    
+    def fetch(page):
+        return reservations.get_timeline(start, end, types, unit_offset=(page - 1) * page_size,
+                                         unit_limit=page_size, db_path=current_db_path())
+    
+    # Faixa de unidades: a página vem do estado (o seletor fica acima do gráfico)
+    page = st.session_state.setdefault('timeline_page', 1)
+    units, stays, total = fetch(page)
+    pages = max((total + page_size - 1) // page_size, 1)
+    if page > pages:
+        st.session_state.timeline_page = page = pages
+        units, stays, total = fetch(page)
+    if pages > 1:
+        st.number_input(f"Página de unidades (de {pages})", min_value=1, max_value=pages, key="timeline_page")
+    if units.empty:
+        st.info("Nenhuma unidade para os filtros informados")
+        return
+    
+    fig = st.session_state.refresh_system.render(
+        'timeline', ('reservations', 'guests', 'units'), (start, days, types, page, page_size),
+        lambda: create_reservation_timeline(units, stays, start, end)
+    )
+    st.plotly_chart(fig, use_container_width=True)
+    first = (page - 1) * page_size + 1
+    st.caption(
+        f"{len(stays)} reservas · unidades {first}-{first + len(units) - 1} de {total} · "
+        f"{start:%d/%m/%Y} a {end - timedelta(days=1):%d/%m/%Y}"
+    )
 
 def show_guests_module():
     """Módulo de gestão de hóspedes"""
     st.header("👥 Gestão de Hóspedes")
-    st.info("Funcionalidade em desenvolvimento")
+    
+    query = st.text_input(
+        "Buscar hóspede",
+        placeholder="Nome, e-mail, telefone ou documento",
+        help="Busca por início de palavra, sem diferenciar acentos"
+    )
+    if len(query.strip()) < MIN_GUEST_QUERY_LENGTH:
+        st.caption(f"Digite ao menos {MIN_GUEST_QUERY_LENGTH} caracteres para buscar")
+        return
+    
+    db_path = current_db_path()
+    results = search_guests(query, db_path=db_path)
+    if results.empty:
+        st.info("Nenhum hóspede encontrado")
+        return
+    
+    st.dataframe(
+        results,
+        column_order=[column for column in results.columns if column != 'id'],
+        column_config={
+            'first_name': 'Nome', 'last_name': 'Sobrenome', 'email': 'E-mail',
+            'phone': 'Telefone', 'document_number': 'Documento',
+            'nationality': 'Nacionalidade', 'loyalty_tier': 'Fidelidade'
+        },
+        hide_index=True,
+        use_container_width=True
+    )
+    
+    labels = dict(zip(results['id'], results['first_name'] + ' ' + results['last_name']
+                      + ' · ' + results['document_number'].fillna('-')))
+    guest_id = st.selectbox("Hóspede", list(labels), format_func=labels.get)
+    guest = get_guest(int(guest_id), db_path)
+    if guest:
+        col1, col2 = st.columns([1, 2])
+        with col1:
+            st.subheader(f"{guest['first_name']} {guest['last_name']}")
+            st.write(f"**E-mail:** {guest['email'] or '-'}")
+            st.write(f"**Telefone:** {guest['phone'] or '-'}")
+            st.write(f"**Documento:** {guest['document_number'] or '-'}")
+            st.write(f"**Fidelidade:** {guest['loyalty_tier']} ({guest['loyalty_points']} pontos)")
+        with col2:
+            st.subheader("Histórico de Estadias")
+            stays = get_guest_stays(int(guest_id), db_path)
+            if stays.empty:
+                st.info("Nenhuma estadia registrada")
+            else:
+                st.dataframe(
+                    stays,
+                    column_config={
+                        'check_in': st.column_config.DateColumn('check_in', format="DD/MM/YYYY"),
+                        'check_out': st.column_config.DateColumn('check_out', format="DD/MM/YYYY"),
+                    },
+                    hide_index=True, use_container_width=True
+                )
 
 def show_units_module():
     """Módulo de gestão de unidades"""
+    import plotly.express as px
+    
     st.header("🏠 Gestão de Unidades Habitacionais")
     
-    conn = init_advanced_db()
-    units_df = pd.read_sql_query("SELECT * FROM units", conn)
-    conn.close()
+    units_df = get_units(current_db_path())
     
     col1, col2 = st.columns([2, 1])
     
     with col1:
         st.subheader("Unidades Cadastradas")
-        display_df = units_df[['code', 'name', 'type', 'status', 'base_rate']].copy()
-        st.dataframe(display_df, use_container_width=True)
+        st.dataframe(
+            units_df, column_order=['code', 'name', 'type', 'status', 'base_rate'],
+            hide_index=True, use_container_width=True
+        )
     
     with col2:
         st.subheader("Status das Unidades")
         status_counts = units_df['status'].value_counts()
-        fig = px.pie(
-            values=status_counts.values,
-            names=status_counts.index,
-            title="Distribuição por Status"
-        )
+        with instrumentation.measure('figure', 'status_unidades'):
+            fig = px.pie(
+                values=status_counts.values,
+                names=status_counts.index,
+                title="Distribuição por Status"
+            )
         st.plotly_chart(fig, use_container_width=True)
 
-# Funções auxiliares para dados (implementações simplificadas)
-def get_occupancy_rate():
-    return 78.5  # Simulado
+def show_housekeeping_module():
+    """Módulo de housekeeping: tarefas do dia e escala da equipe"""
+    import plotly.express as px
+    
+    st.header("🧹 Housekeeping")
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        day = st.date_input("Dia", value=date.today(), key="housekeeping_day")
+    with col2:
+        team_size = st.number_input("Camareiras no turno", min_value=1, max_value=100, value=8)
+    with col3:
+        shift_start = st.time_input("Início do planejamento", value=housekeeping.DEFAULT_SHIFT_START)
+    
+    db_path = current_db_path()
+    if st.button("📋 Gerar tarefas e planejar equipe", use_container_width=True):
+        housekeeping.plan_day(day, housekeeping.default_attendants(int(team_size)), shift_start, db_path)
+    
+    tasks = housekeeping.get_day_tasks(day, db_path=db_path)
+    if tasks.empty:
+        st.info("Nenhuma tarefa para o dia. Gere as tarefas para planejar a equipe.")
+        return
+    
+    pending = tasks[tasks['status'] == 'pending']
+    planned = tasks.dropna(subset=['scheduled_start'])
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Tarefas", len(tasks))
+    col2.metric("Pendentes", len(pending))
+    col3.metric("Chegadas prioritárias", int((pending['priority'] > 0).sum()))
+    col4.metric("Fim previsto", planned['scheduled_end'].max().strftime('%H:%M') if not planned.empty else "-")
+    
+    if not planned.empty:
+        with instrumentation.measure('figure', 'escala_housekeeping'):
+            fig = px.timeline(
+                planned, x_start='scheduled_start', x_end='scheduled_end', y='assigned_to',
+                color='task_type', hover_data=['unit_code', 'notes'],
+                labels={'assigned_to': 'Camareira', 'task_type': 'Tarefa'}
+            )
+            fig.update_yaxes(autorange='reversed')
+        st.plotly_chart(fig, use_container_width=True)
+    
+    st.dataframe(
+        tasks,
+        column_order=[column for column in tasks.columns if column not in ('id', 'scheduled_end')],
+        column_config={
+            'unit_code': 'Unidade', 'floor': 'Andar', 'task_type': 'Tarefa', 'status': 'Status',
+            'priority': 'Prioridade', 'assigned_to': 'Responsável', 'estimated_time': 'Minutos',
+            'scheduled_start': st.column_config.DatetimeColumn('Início', format="HH:mm"),
+            'notes': 'Observações'
+        },
+        hide_index=True,
+        use_container_width=True
+    )
+
+def show_reports_module():
+    """Módulo de relatórios gerenciais (gerados em streaming para download)"""
+    st.header("📑 Relatórios")
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        period_type = st.radio("Período", ["Mensal", "Anual", "Personalizado"], horizontal=True)
+    today = date.today()
+    if period_type == "Mensal":
+        with col2:
+            month = st.selectbox("Mês", range(1, 13), index=today.month - 1,
+                                 format_func=lambda m: calendar.month_name[m])
+        with col3:
+            year = st.number_input("Ano", min_value=2000, max_value=2100, value=today.year)
+        start, end = reports.month_period(int(year), month)
+    elif period_type == "Anual":
+        with col2:
+            year = st.number_input("Ano", min_value=2000, max_value=2100, value=today.year)
+        start, end = reports.year_period(int(year))
+    else:
+        with col2:
+            start, end = _period_bounds(st.date_input("Intervalo", value=(today.replace(day=1), today)))
+    
+    st.caption(f"De {start.strftime('%d/%m/%Y')} a {(end - timedelta(days=1)).strftime('%d/%m/%Y')}")
+    
+    titles = {report_id: report['title'] for report_id, report in reports.REPORTS.items()}
+    preview_id = st.selectbox("Pré-visualizar", list(titles), format_func=titles.get)
+    db_path = current_db_path()
+    columns, rows = reports.preview(preview_id, start, end, db_path=db_path)
+    if rows:
+        st.dataframe(pd.DataFrame(rows, columns=columns), hide_index=True, use_container_width=True)
+        if len(rows) == 100:
+            st.caption("Exibindo as primeiras 100 linhas; o arquivo contém o relatório completo")
+    else:
+        st.info("Sem dados no período")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        selected = st.multiselect("Relatórios da planilha", reports.SUMMARY_REPORTS,
+                                  default=reports.SUMMARY_REPORTS, format_func=titles.get)
+        group_report = properties.is_multi_property() and st.checkbox(
+            "Consolidar todas as propriedades", help="Uma coluna identifica a propriedade de cada linha"
+        )
+        if st.button("📊 Gerar planilha (Excel)", disabled=not selected, use_container_width=True):
+            if group_report:
+                path, name = reports.render_group(selected, start, end, 'xlsx')
+            else:
+                path, name = reports.render(selected, start, end, 'xlsx', db_path=db_path)
+            _set_report_file(path, name, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+    with col2:
+        detail = st.selectbox("Detalhamento", reports.DETAIL_REPORTS, format_func=titles.get)
+        if st.button("📄 Gerar detalhamento (CSV)", use_container_width=True):
+            path, name = reports.render([detail], start, end, 'csv', db_path=db_path)
+            _set_report_file(path, name, "text/csv")
+    
+    # A sessão guarda só o caminho; o arquivo é lido do disco ao exibir o botão
+    if 'report_file' in st.session_state:
+        path, name, mime = st.session_state.report_file
+        try:
+            with open(path, 'rb') as data:
+                st.download_button(f"📥 Baixar {name}", data, file_name=name, mime=mime,
+                                   use_container_width=True)
+        except FileNotFoundError:
+            del st.session_state.report_file
+            st.info("O arquivo gerado expirou; gere o relatório novamente")
 
-def get_average_daily_rate():
-    return 345.75  # Simulado
+def _set_report_file(path, name, mime):
+    """Guarda o relatório gerado na sessão, removendo o arquivo anterior"""
+    previous = st.session_state.get('report_file')
+    if previous and previous[0] != path and os.path.exists(previous[0]):
+        os.remove(previous[0])
+    st.session_state.report_file = (path, name, mime)
 
-def get_revpar():
-    return 271.36  # Simulado
+# Funções auxiliares para dados
+def _period_bounds(date_range):
+    """Converte o filtro de período em (início, fim exclusivo)"""
+    if isinstance(date_range, (tuple, list)) and len(date_range) == 2:
+        start, end = date_range
+    else:
+        start = date_range[0] if isinstance(date_range, (tuple, list)) and date_range else date.today()
+        end = start
+    return start, end + timedelta(days=1)
 
-def get_today_arrivals():
-    return 12  # Simulado
+def get_period_kpis(date_range, unit_types=None):
+    start, end = _period_bounds(date_range)
+    return kpis.get_kpis(start, end, unit_types, current_db_path())
 
-def get_occupancy_by_unit_type():
-    return pd.DataFrame({
-        'unit_type': ['Standard', 'Luxo', 'Suite'],
-        'occupancy_rate': [82.3, 74.6, 65.2]
-    })
+def get_occupancy_rate(date_range, unit_types=None):
+    return get_period_kpis(date_range, unit_types)[0]['occupancy_rate']
 
-def get_revenue_forecast():
-    dates = [date.today() + timedelta(days=i) for i in range(7)]
-    return pd.DataFrame({
-        'date': dates,
-        'projected_revenue': [12500, 13200, 14500, 15200, 14800, 16200, 17500]
-    })
+def get_average_daily_rate(date_range, unit_types=None):
+    return get_period_kpis(date_range, unit_types)[0]['adr']
+
+def get_revpar(date_range, unit_types=None):
+    return get_period_kpis(date_range, unit_types)[0]['revpar']
+
+def get_today_arrivals(unit_types=None):
+    today = date.today()
+    current, changes = kpis.get_kpis(today, today + timedelta(days=1), unit_types, current_db_path())
+    return current['arrivals'], changes['arrivals']
+
+def get_occupancy_by_unit_type(date_range, unit_types=None):
+    start, end = _period_bounds(date_range)
+    return kpis.get_occupancy_by_unit_type(start, end, unit_types, current_db_path())
+
+def get_revenue_forecast(days=7, unit_types=None):
+    """Receita contratada (on the books) e projetada pelo pickup para os próximos dias"""
+    demand = forecast.get_forecast(date.today(), days, unit_types, db_path=current_db_path())
+    revenue = demand.groupby('date', as_index=False)[['otb_revenue', 'expected_revenue']].sum()
+    return revenue.rename(columns={'expected_revenue': 'projected_revenue'})
 
 def get_available_units():
-    return ["101", "102", "201", "202", "301"]
-
-def get_price_trend_data():
-    dates = [date.today() + timedelta(days=i) for i in range(30)]
-    data = []
-    for unit_type in ["Standard", "Luxo", "Suite"]:
-        base_rate = 250 if unit_type == "Standard" else 450 if unit_type == "Luxo" else 750
-        for i, d in enumerate(dates):
-            # Variação de preço simulada
-            variation = np.sin(i / 3) * 0.2 + 1
-            data.append({
-                'date': d,
-                'unit_type': unit_type,
-                'rate': base_rate * variation
-            })
-    return pd.DataFrame(data)
+    """Unidades cadastradas como {id: código}"""
+    return get_unit_codes(current_db_path())
+
+def get_price_trend_data(days=30):
+    return get_rate_trend(date.today(), days, db_path=current_db_path())
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1 @@
+"""Orion PMS - núcleo de dados e motores do sistema de gestão hoteleira."""
@@ -0,0 +1,138 @@
+"""Motor de disponibilidade: matriz de ocupação unidade × data.
+
+Uma reserva ocupa as noites de ``check_in`` (inclusive) até ``check_out``
+(exclusive). Todas as reservas que cruzam o período são lidas numa única
+consulta e expandidas de uma vez para a matriz com NumPy.
+"""
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from orion import database
+from orion.cache import cached
+
+# Status de reserva que bloqueiam a unidade
+ACTIVE_STATUSES = database.BLOCKING_STATUSES
+
+# Status de unidade que a retiram da venda
+OUT_OF_SERVICE_STATUSES = database.OUT_OF_SERVICE_STATUSES
+
+
+class OccupancyMatrix:
+    """Ocupação por noite de um conjunto de unidades num período"""
+
+    def __init__(self, units, start, days, occupied):
+        self.units = units  # DataFrame indexado por id (code, type, status...)
+        self.start = start
+        self.days = days
+        self.occupied = occupied  # ndarray bool (unidades × dias)
+        self._row = {unit_id: i for i, unit_id in enumerate(units.index)}
+
+    @property
+    def dates(self):
+        return pd.date_range(self.start, periods=self.days, freq='D')
+
+    def unit_row(self, unit_id):
+        """Linha de ocupação (bool por noite) de uma unidade"""
+        return self.occupied[self._row[unit_id]]
+
+    def day_index(self, day):
+        return (day - self.start).days
+
+    def is_free(self, unit_id, check_in, check_out):
+        """Indica se a unidade está livre em todas as noites da estadia"""
+        lo = max(self.day_index(check_in), 0)
+        hi = min(self.day_index(check_out), self.days)
+        return not self.unit_row(unit_id)[lo:hi].any()
+
+    def free_units(self, check_in, check_out):
+        """Ids das unidades livres durante toda a estadia"""
+        lo = max(self.day_index(check_in), 0)
+        hi = min(self.day_index(check_out), self.days)
+        busy = self.occupied[:, lo:hi].any(axis=1)
+        return self.units.index[~busy].tolist()
+
+    def rooms_sold(self):
+        """Quantidade de unidades ocupadas por noite"""
+        return self.occupied.sum(axis=0)
+
+    def occupancy_by_date(self):
+        """Taxa de ocupação (%) por data"""
+        total = max(len(self.units), 1)
+        return pd.Series(self.rooms_sold() / total * 100, index=self.dates)
+
+    def to_frame(self):
+        """Matriz como DataFrame (linhas = códigos das unidades, colunas = datas)"""
+        return pd.DataFrame(self.occupied, index=self.units['code'], columns=self.dates)
+
+
+def _load_units(conn, unit_ids=None, unit_types=None):
+    query = "SELECT id, code, type, status FROM units"
+    clauses, params = [], []
+    if unit_ids is not None:
+        unit_ids = list(unit_ids)
+        clauses.append(f"id IN ({','.join('?' * len(unit_ids))})")
+        params.extend(unit_ids)
+    if unit_types is not None:
+        unit_types = list(unit_types)
+        clauses.append(f"type IN ({','.join('?' * len(unit_types))})")
+        params.extend(unit_types)
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+    query += " ORDER BY code"
+    return pd.read_sql_query(query, conn, params=params, index_col='id')
+
+
+def _load_stays(conn, start, end):
+    # Sobreposição correta: inclui estadias que abrangem o período inteiro
+    cur = conn.execute(f"""
+        SELECT unit_id, substr(check_in, 1, 10), substr(check_out, 1, 10)
+        FROM reservations
+        WHERE status IN ({','.join('?' * len(ACTIVE_STATUSES))})
+        AND check_in < ? AND check_out > ?
+    """, (*ACTIVE_STATUSES, end.isoformat(), start.isoformat()))
+    return cur.fetchall()
+
+
+def build_occupancy_matrix(units, stays, start, days):
+    """Expande intervalos de estadia para a matriz de ocupação"""
+    occupied = np.zeros((len(units), days), dtype=bool)
+    if not stays or units.empty:
+        return OccupancyMatrix(units, start, days, occupied)
+
+    unit_ids, check_ins, check_outs = zip(*stays)
+    rows = units.index.get_indexer(unit_ids)
+    known = rows >= 0
+
+    origin = np.datetime64(start, 'D')
+    lo = (np.array(check_ins, dtype='datetime64[D]') - origin).astype(np.int64)
+    hi = (np.array(check_outs, dtype='datetime64[D]') - origin).astype(np.int64)
+    lo = np.clip(lo, 0, days)[known]
+    hi = np.clip(hi, 0, days)[known]
+    rows = rows[known]
+
+    # Vetor de diferenças: +1 na entrada, -1 na saída, soma acumulada por linha
+    delta = np.zeros((len(units), days + 1), dtype=np.int32)
+    np.add.at(delta, (rows, lo), 1)
+    np.add.at(delta, (rows, hi), -1)
+    occupied = np.cumsum(delta[:, :days], axis=1) > 0
+    return OccupancyMatrix(units, start, days, occupied)
+
+
+@cached('reservations', 'units')
+def get_occupancy_matrix(start, end, unit_ids=None, unit_types=None,
+                         db_path=database.DEFAULT_DB_PATH):
+    """Matriz de ocupação das noites de ``start`` até ``end`` (exclusive)"""
+    days = max((end - start).days, 0)
+    with database.connection(db_path) as conn:
+        units = _load_units(conn, unit_ids, unit_types)
+        stays = _load_stays(conn, start, end)
+    return build_occupancy_matrix(units, stays, start, days)
+
+
+def get_month_occupancy(unit_ids, month, year, db_path=database.DEFAULT_DB_PATH):
+    """Atalho para a matriz de um mês inteiro"""
+    start = date(year, month, 1)
+    end = (start + timedelta(days=32)).replace(day=1)
+    return get_occupancy_matrix(start, end, unit_ids=unit_ids, db_path=db_path)
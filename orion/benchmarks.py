@@ -0,0 +1,434 @@
+"""Suíte de benchmarks dos caminhos de dados do Orion PMS.
+
+Gera (e reaproveita) bases sintéticas em ``.bench/`` e cronometra cada
+função de dados com o cache frio. Os resultados podem ser gravados como
+linha de base e comparados em execuções futuras para apontar regressões.
+
+Casos ``startup.*`` medem a aplicação Streamlit num processo novo: a
+primeira renderização a frio (interpretador, importações, schema e
+consultas) e o custo de cada nova execução do script. Casos com orçamento
+(``budget_ms``) falham quando a mediana o ultrapassa.
+
+``--memory`` acrescenta o relatório de memória dos DataFrames carregados
+pelos módulos: bytes com os tipos compactos (:mod:`orion.frames`) e com a
+representação original (texto em ``object``, inteiros de 64 bits).
+
+Uso::
+
+    python -m orion.benchmarks --size medium --save baseline.json
+    python -m orion.benchmarks --size medium --compare baseline.json
+    python -m orion.benchmarks --size medium --only units --memory
+"""
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+from orion import cache, database
+
+BENCH_DIR = os.environ.get("ORION_BENCH_DIR", ".bench")
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(PROJECT_DIR, "app.py")
+
+DATASETS = {
+    'small': dict(units=50, guests=5000, years=1),
+    'medium': dict(units=200, guests=20000, years=3),
+    'large': dict(units=500, guests=100000, years=5),
+}
+
+# Tolerância padrão antes de acusar regressão (fração da mediana de referência)
+DEFAULT_TOLERANCE = 0.25
+# Diferenças absolutas abaixo deste valor (ms) são tratadas como ruído
+NOISE_FLOOR_MS = 1.0
+
+_cases = []
+_frames = []
+
+
+def benchmark(name, repeat=5, warm=False, budget_ms=None):
+    """Registra um caso de benchmark; a função recebe o caminho do banco.
+
+    Casos que medem o próprio tempo (ex.: dentro de um subprocesso) retornam
+    a duração em ms; caso contrário vale o tempo de parede da chamada.
+    """
+    def decorator(func):
+        _cases.append({'name': name, 'func': func, 'repeat': repeat, 'warm': warm, 'budget_ms': budget_ms})
+        return func
+    return decorator
+
+
+def frame_loader(name):
+    """Registra um carregador de DataFrame para o relatório de memória"""
+    def decorator(func):
+        _frames.append({'name': name, 'func': func})
+        return func
+    return decorator
+
+
+def dataset_path(size):
+    """Banco sintético do tamanho pedido, gerado na primeira vez no dia"""
+    from orion.datagen import generate_dataset
+
+    os.makedirs(BENCH_DIR, exist_ok=True)
+    path = os.path.join(BENCH_DIR, f"{size}-{date.today().isoformat()}.db")
+    if not os.path.exists(path):
+        generate_dataset(path, **DATASETS[size])
+    return path
+
+
+@benchmark('availability.matrix_365d')
+def _bench_availability_matrix(db_path):
+    from orion.availability import get_occupancy_matrix
+    today = date.today()
+    get_occupancy_matrix(today, today + timedelta(days=365), db_path=db_path)
+
+
+@benchmark('availability.month_one_unit')
+def _bench_availability_month(db_path):
+    from orion.availability import get_month_occupancy
+    today = date.today()
+    get_month_occupancy([1], today.month, today.year, db_path=db_path)
+
+
+@benchmark('revenue.optimize_365d')
+def _bench_optimize_rates(db_path):
+    from orion.revenue import RevenueManagementSystem
+    RevenueManagementSystem(db_path).optimize_rates(date.today(), 365)
+
+
+@benchmark('forecast.rebuild_365d', budget_ms=2000)
+def _bench_forecast(db_path):
+    from orion import forecast
+    # Curvas de pickup e previsão de todos os tipos recalculadas do zero
+    forecast.refresh_forecast(force=True, db_path=db_path)
+
+
+@benchmark('revenue.optimize_365d_4_scenarios')
+def _bench_optimize_scenarios(db_path):
+    from orion.revenue import RevenueManagementSystem
+    RevenueManagementSystem(db_path).optimize_rates(
+        date.today(), 365, occupancy_scenarios=[0.3, 0.5, 0.7, 0.9]
+    )
+
+
+@benchmark('search.availability_3_nights', repeat=20)
+def _bench_search(db_path):
+    from orion.search import search_availability
+    check_in = date.today() + timedelta(days=30)
+    search_availability(check_in, check_in + timedelta(days=3), 2, db_path=db_path)
+
+
+@benchmark('kpis.week')
+def _bench_kpis_week(db_path):
+    from orion import kpis
+    today = date.today()
+    kpis.get_kpis(today, today + timedelta(days=7), db_path=db_path)
+
+
+@benchmark('kpis.year')
+def _bench_kpis_year(db_path):
+    from orion import kpis
+    today = date.today()
+    kpis.get_kpis(today - timedelta(days=365), today, db_path=db_path)
+
+
+@benchmark('kpis.week_cached', repeat=20, warm=True)
+def _bench_kpis_cached(db_path):
+    from orion import kpis
+    today = date.today()
+    kpis.get_kpis(today, today + timedelta(days=7), db_path=db_path)
+
+
+@benchmark('units.listing')
+def _bench_units(db_path):
+    from orion.units import get_units
+    get_units(db_path=db_path)
+
+
+@benchmark('reservations.timeline_31d', repeat=10)
+def _bench_timeline(db_path):
+    from orion import reservations
+    # Janela de um mês com todas as unidades (a consulta da linha do tempo)
+    start = date.today() - timedelta(days=2)
+    reservations.get_timeline(start, start + timedelta(days=31), db_path=db_path)
+
+
+@benchmark('booking.concurrent_8x50', repeat=1)
+def _bench_booking(db_path):
+    from orion.booking import run_booking_stress
+    # Escritas vão para uma cópia, preservando a base compartilhada
+    with tempfile.TemporaryDirectory() as tmp:
+        copy = os.path.join(tmp, "booking.db")
+        with database.connection(db_path) as conn:
+            conn.execute("VACUUM INTO ?", (copy,))
+        result = run_booking_stress(8, 50, db_path=copy, seed=1)
+        database.get_pool(copy).close_all()
+    if result['overbookings']:
+        raise AssertionError(f"{result['overbookings']} overbookings")
+
+
+# Cópias da base usadas como propriedades do grupo (geradas uma vez por dia)
+GROUP_SIZE = 20
+
+
+def property_copies(db_path, count=GROUP_SIZE):
+    """Cadastro de ``count`` propriedades, cada uma numa cópia da base"""
+    folder = os.path.splitext(db_path)[0] + "-properties"
+    os.makedirs(folder, exist_ok=True)
+    registry = {}
+    for i in range(1, count + 1):
+        path = os.path.join(folder, f"property-{i:02d}.db")
+        if not os.path.exists(path):
+            with database.connection(db_path) as conn:
+                conn.execute("VACUUM INTO ?", (path,))
+        database.get_pool(path)
+        registry[f"P{i:02d}"] = {'name': f"Propriedade {i:02d}", 'db_path': path}
+    return registry
+
+
+@benchmark('properties.group_kpis_1')
+def _bench_group_single(db_path):
+    from orion import properties
+    properties.group_kpis(date.today() - timedelta(days=30), date.today(), properties=property_copies(db_path, 1))
+
+
+@benchmark(f'properties.group_kpis_{GROUP_SIZE}')
+def _bench_group(db_path):
+    from orion import properties
+    # Deve ficar próximo do caso com uma propriedade: as consultas rodam em paralelo
+    properties.group_kpis(date.today() - timedelta(days=30), date.today(), properties=property_copies(db_path))
+
+
+@frame_loader('units.get_units')
+def _frame_units(db_path):
+    from orion.units import get_units
+    return get_units(db_path=db_path)
+
+
+@frame_loader('reservations.page_500')
+def _frame_reservations(db_path):
+    from orion import reservations
+    return reservations.list_reservations(limit=reservations.MAX_PAGE_SIZE, db_path=db_path)[0]
+
+
+@frame_loader('guests.stays_top_guest')
+def _frame_stays(db_path):
+    from orion.guests import get_guest_stays
+    with database.connection(db_path) as conn:
+        guest_id = conn.execute("""
+            SELECT guest_id FROM reservations WHERE guest_id IS NOT NULL
+            GROUP BY guest_id ORDER BY COUNT(*) DESC LIMIT 1
+        """).fetchone()[0]
+    return get_guest_stays(guest_id, db_path=db_path)
+
+
+@frame_loader('kpis.arrivals_busiest_day')
+def _frame_arrivals(db_path):
+    from orion import kpis
+    with database.connection(db_path) as conn:
+        day = conn.execute("""
+            SELECT check_in FROM reservations WHERE status IN ('confirmed', 'checked-in')
+            GROUP BY check_in ORDER BY COUNT(*) DESC LIMIT 1
+        """).fetchone()[0]
+    return kpis.get_arrivals(date.fromisoformat(day[:10]), db_path=db_path)
+
+
+@frame_loader('housekeeping.day_tasks')
+def _frame_tasks(db_path):
+    from orion import housekeeping
+    with database.connection(db_path) as conn:
+        day = conn.execute("SELECT MAX(task_date) FROM housekeeping").fetchone()[0]
+    return housekeeping.get_day_tasks(date.fromisoformat(day[:10]) if day else date.today(), db_path=db_path)
+
+
+def _original_frame(frame):
+    """O DataFrame como era lido antes dos tipos compactos"""
+    import pandas as pd
+
+    original = {}
+    for column in frame.columns:
+        dtype = frame[column].dtype
+        if isinstance(dtype, pd.CategoricalDtype) or pd.api.types.is_datetime64_any_dtype(dtype):
+            original[column] = frame[column].astype(str).astype(object)
+        elif pd.api.types.is_integer_dtype(dtype):
+            has_nulls = frame[column].isna().any()
+            original[column] = frame[column].astype('float64' if has_nulls else 'int64')
+        else:
+            original[column] = frame[column]
+    return pd.DataFrame(original, index=frame.index)
+
+
+def memory_report(db_path):
+    """Memória de cada DataFrame registrado: {nome: {rows, compact_kb, original_kb}}"""
+    from orion import frames
+
+    report = {}
+    for loader in _frames:
+        cache.clear_all()
+        frame = loader['func'](db_path)
+        report[loader['name']] = {
+            'rows': len(frame),
+            'compact_kb': round(frames.memory_usage(frame) / 1024, 1),
+            'original_kb': round(frames.memory_usage(_original_frame(frame)) / 1024, 1),
+        }
+    return report
+
+
+def format_memory(report):
+    lines = [f"{'dataframe':40} {'linhas':>8} {'compacto (KB)':>14} {'original (KB)':>14} {'redução':>8}"]
+    for name, item in report.items():
+        reduction = 1 - item['compact_kb'] / item['original_kb'] if item['original_kb'] else 0.0
+        lines.append(
+            f"{name:40} {item['rows']:8d} {item['compact_kb']:14.1f} {item['original_kb']:14.1f} {reduction:8.0%}"
+        )
+    return "\n".join(lines)
+
+
+# Executado num interpretador novo: primeira renderização e reexecuções do app
+_APP_SCRIPT = """
+import json, statistics, sys, time
+started = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file(sys.argv[1], default_timeout=120)
+app.run()
+first_render = time.perf_counter() - started
+reruns = []
+for _ in range(int(sys.argv[2])):
+    rerun_started = time.perf_counter()
+    app.run()
+    reruns.append(time.perf_counter() - rerun_started)
+if app.exception:
+    sys.exit(app.exception[0].value)
+print(json.dumps({
+    'first_render_ms': first_render * 1000,
+    'rerun_ms': statistics.median(reruns) * 1000 if reruns else None,
+}))
+"""
+
+
+def run_app(db_path, reruns=0):
+    """Renderiza o app (página inicial) num processo novo; retorna os tempos em ms"""
+    result = subprocess.run(
+        [sys.executable, "-c", _APP_SCRIPT, APP_PATH, str(reruns)],
+        # Sem o agendador: as rotinas em segundo plano não entram na medição
+        env=dict(os.environ, ORION_DB_PATH=os.path.abspath(db_path), PYTHONPATH=PROJECT_DIR, ORION_JOBS="0"),
+        cwd=PROJECT_DIR, capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+@benchmark('startup.cold_first_render', repeat=3, budget_ms=3000)
+def _bench_cold_start(db_path):
+    # Tempo de parede: interpretador, importações, schema e primeira renderização
+    run_app(db_path)
+
+
+@benchmark('startup.rerun', repeat=3, budget_ms=150)
+def _bench_rerun(db_path):
+    return run_app(db_path, reruns=10)['rerun_ms']
+
+
+def run(size='medium', only=None):
+    """Executa os casos registrados e retorna {nome: estatísticas em ms}"""
+    db_path = dataset_path(size)
+    database.get_pool(db_path)
+    results = {}
+    for case in _cases:
+        if only and not any(pattern in case['name'] for pattern in only):
+            continue
+        if case['warm']:
+            case['func'](db_path)
+        timings = []
+        for _ in range(case['repeat']):
+            if not case['warm']:
+                cache.clear_all()
+            started = time.perf_counter()
+            measured = case['func'](db_path)
+            timings.append(measured if measured is not None else (time.perf_counter() - started) * 1000)
+        results[case['name']] = {
+            'median_ms': round(statistics.median(timings), 3),
+            'min_ms': round(min(timings), 3),
+            'max_ms': round(max(timings), 3),
+            'repeat': case['repeat'],
+        }
+        if case['budget_ms'] is not None:
+            results[case['name']]['budget_ms'] = case['budget_ms']
+    return results
+
+
+def over_budget(results):
+    """Casos cuja mediana ultrapassa o orçamento absoluto"""
+    return [
+        (name, stats['budget_ms'], stats['median_ms'])
+        for name, stats in results.items()
+        if stats.get('budget_ms') is not None and stats['median_ms'] > stats['budget_ms']
+    ]
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Lista os casos mais lentos que a referência além da tolerância"""
+    regressions = []
+    for name, stats in results.items():
+        reference = baseline.get(name)
+        if not reference or 'median_ms' not in stats:
+            continue
+        limit = reference['median_ms'] * (1 + tolerance)
+        if stats['median_ms'] > limit and stats['median_ms'] - reference['median_ms'] > NOISE_FLOOR_MS:
+            regressions.append((name, reference['median_ms'], stats['median_ms']))
+    return regressions
+
+
+def format_results(results, baseline=None):
+    lines = [f"{'caso':40} {'mediana (ms)':>14} {'mín (ms)':>10} {'ref (ms)':>10}"]
+    for name, stats in results.items():
+        reference = (baseline or {}).get(name, {}).get('median_ms')
+        ref = f"{reference:10.2f}" if reference is not None else f"{'-':>10}"
+        lines.append(f"{name:40} {stats['median_ms']:14.2f} {stats['min_ms']:10.2f} {ref}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmarks dos caminhos de dados do Orion PMS")
+    parser.add_argument("--size", choices=sorted(DATASETS), default='medium')
+    parser.add_argument("--only", nargs='*', help="Executa apenas casos cujo nome contenha estes trechos")
+    parser.add_argument("--save", help="Grava os resultados como linha de base (JSON)")
+    parser.add_argument("--compare", help="Compara com uma linha de base (JSON)")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--memory", action="store_true", help="Inclui o relatório de memória dos DataFrames")
+    args = parser.parse_args(argv)
+
+    results = run(args.size, args.only)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print(format_results(results, baseline))
+    if args.memory:
+        print()
+        print(format_memory(memory_report(dataset_path(args.size))))
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    failed = False
+    for name, budget, median in over_budget(results):
+        print(f"ORÇAMENTO {name}: {median:.2f} ms > {budget:.2f} ms")
+        failed = True
+    if baseline is not None:
+        regressions = compare(results, baseline, args.tolerance)
+        for name, before, after in regressions:
+            print(f"REGRESSÃO {name}: {before:.2f} ms -> {after:.2f} ms")
+        failed = failed or bool(regressions)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
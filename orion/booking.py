@@ -0,0 +1,232 @@
+"""Motor de reservas com detecção de conflitos.
+
+Cada reserva é criada numa transação ``BEGIN IMMEDIATE``: o bloqueio de
+escrita é obtido antes da checagem de sobreposição, então checagem e
+inserção são atômicas mesmo com muitas sessões gravando ao mesmo tempo. Os
+triggers de overbooking do schema são a última barreira para escritas que
+não passam por aqui.
+"""
+import secrets
+import sqlite3
+import threading
+import time
+from datetime import date, timedelta
+
+from orion import database, loyalty
+from orion.availability import ACTIVE_STATUSES, OUT_OF_SERVICE_STATUSES
+from orion.search import price_stay
+
+CONFIRMATION_ALPHABET = "ABCDEFGHJKLMNPQRSTUVWXYZ23456789"
+CONFIRMATION_PREFIX = "ORN"
+
+SOURCES = ["Direto", "Telefone", "Walk-in", "Booking.com", "Expedia", "Airbnb"]
+# Origens vendidas pelos canais: sujeitas à antecedência mínima (cutof_days)
+CHANNEL_SOURCES = ("Booking.com", "Expedia", "Airbnb")
+
+
+class BookingError(Exception):
+    """Reserva recusada por regra de negócio"""
+
+
+class UnitUnavailableError(BookingError):
+    """A unidade já está reservada em alguma noite do período"""
+
+
+def generate_confirmation_code(length=8):
+    """Código de confirmação legível (sem caracteres ambíguos)"""
+    suffix = ''.join(secrets.choice(CONFIRMATION_ALPHABET) for _ in range(length))
+    return f"{CONFIRMATION_PREFIX}-{suffix}"
+
+
+def find_or_create_guest(conn, first_name, last_name, email=None, phone=None,
+                         document_number=None, nationality=None):
+    """Retorna o id do hóspede (pelo documento, se informado) criando-o se necessário"""
+    if document_number:
+        row = conn.execute(
+            "SELECT id FROM guests WHERE document_number = ?", (document_number,)
+        ).fetchone()
+        if row:
+            return row[0]
+    cur = conn.execute("""
+        INSERT INTO guests (first_name, last_name, email, phone, document_number, nationality)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, (first_name, last_name, email, phone, document_number or None, nationality))
+    return cur.lastrowid
+
+
+def _check_unit(conn, unit_id, guests):
+    unit = conn.execute(
+        "SELECT type, base_rate, max_capacity, status FROM units WHERE id = ?", (unit_id,)
+    ).fetchone()
+    if unit is None:
+        raise BookingError(f"Unidade {unit_id} não encontrada")
+    unit_type, base_rate, max_capacity, status = unit
+    if status in OUT_OF_SERVICE_STATUSES:
+        raise BookingError("Unidade fora de serviço")
+    if max_capacity is not None and guests > max_capacity:
+        raise BookingError(f"Capacidade máxima da unidade é {max_capacity} hóspedes")
+    return unit_type, base_rate
+
+
+def _has_conflict(conn, unit_id, check_in, check_out):
+    return conn.execute(f"""
+        SELECT 1 FROM reservations
+        WHERE unit_id = ? AND check_out > ? AND check_in < ?
+        AND status IN ({','.join('?' * len(ACTIVE_STATUSES))})
+        LIMIT 1
+    """, (unit_id, check_in.isoformat(), check_out.isoformat(), *ACTIVE_STATUSES)).fetchone() is not None
+
+
+def create_reservation(unit_id, check_in, check_out, source, guest_id=None, adults=1,
+                       children=0, guest=None, payment_method=None, special_requests=None,
+                       notes=None, created_by=None, today=None, db_path=database.DEFAULT_DB_PATH):
+    """Cria uma reserva confirmada de forma atômica.
+
+    ``guest`` (dict com first_name, last_name, email...) cria ou reaproveita o
+    hóspede na mesma transação quando ``guest_id`` não é informado.
+    """
+    nights = (check_out - check_in).days
+    if nights <= 0:
+        raise BookingError("A data de check-out deve ser posterior ao check-in")
+
+    for _ in range(3):
+        code = generate_confirmation_code()
+        try:
+            with database.transaction(db_path, immediate=True) as conn:
+                unit_type, base_rate = _check_unit(conn, unit_id, adults + children)
+                if _has_conflict(conn, unit_id, check_in, check_out):
+                    raise UnitUnavailableError("Unidade já reservada no período")
+
+                total_amount = price_stay(conn, unit_type, base_rate, check_in, check_out, today,
+                                          channel=source in CHANNEL_SOURCES)
+                if total_amount is None:
+                    raise BookingError("Tarifa fechada para venda (restrições do período)")
+
+                if guest_id is None and guest:
+                    guest_id = find_or_create_guest(conn, **guest)
+
+                cur = conn.execute("""
+                    INSERT INTO reservations
+                    (confirmation_code, guest_id, unit_id, check_in, check_out, adults, children,
+                     status, source, rate, total_amount, payment_method, special_requests, notes, created_by)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, 'confirmed', ?, ?, ?, ?, ?, ?, ?)
+                """, (
+                    code, guest_id, unit_id, check_in.isoformat(), check_out.isoformat(),
+                    adults, children, source, round(total_amount / nights, 2), total_amount,
+                    payment_method, special_requests, notes, created_by
+                ))
+            return {'id': cur.lastrowid, 'confirmation_code': code, 'total_amount': total_amount}
+        except sqlite3.DatabaseError as e:
+            if 'overbooking' in str(e):
+                raise UnitUnavailableError("Unidade já reservada no período") from e
+            # Colisão improvável de código de confirmação: tenta outro código
+            if not (isinstance(e, sqlite3.IntegrityError) and 'confirmation_code' in str(e)):
+                raise
+    raise BookingError("Não foi possível gerar um código de confirmação único")
+
+
+def cancel_reservation(reservation_id, db_path=database.DEFAULT_DB_PATH):
+    """Cancela uma reserva, liberando a unidade"""
+    with database.transaction(db_path, immediate=True) as conn:
+        cur = conn.execute("""
+            UPDATE reservations SET status = 'cancelled', updated_at = CURRENT_TIMESTAMP
+            WHERE id = ? AND status IN ('confirmed', 'checked-in')
+        """, (reservation_id,))
+    return cur.rowcount > 0
+
+
+def check_out_reservation(reservation_id, db_path=database.DEFAULT_DB_PATH):
+    """Encerra a estadia e credita os pontos de fidelidade na mesma transação"""
+    with database.transaction(db_path, immediate=True) as conn:
+        cur = conn.execute("""
+            UPDATE reservations SET status = 'checked-out', updated_at = CURRENT_TIMESTAMP
+            WHERE id = ? AND status IN ('confirmed', 'checked-in')
+        """, (reservation_id,))
+        if cur.rowcount == 0:
+            return False
+        loyalty.accrue(conn, reservation_id=reservation_id)
+    return True
+
+
+def count_overbookings(db_path=database.DEFAULT_DB_PATH):
+    """Pares de reservas ativas sobrepostas na mesma unidade (deve ser zero)"""
+    placeholders = ','.join('?' * len(ACTIVE_STATUSES))
+    with database.connection(db_path) as conn:
+        return conn.execute(f"""
+            SELECT COUNT(*) FROM reservations a
+            JOIN reservations b ON b.unit_id = a.unit_id AND b.id > a.id
+                AND b.check_out > a.check_in AND b.check_in < a.check_out
+            WHERE a.status IN ({placeholders}) AND b.status IN ({placeholders})
+        """, (*ACTIVE_STATUSES, *ACTIVE_STATUSES)).fetchone()[0]
+
+
+def run_booking_stress(threads=16, attempts_per_thread=200, horizon_days=60, lead_days=30,
+                       db_path=database.DEFAULT_DB_PATH, seed=None):
+    """Dispara reservas concorrentes aleatórias e confere que não há overbooking.
+
+    Retorna totais de reservas criadas, recusadas por conflito, erros,
+    overbookings encontrados e reservas por segundo.
+    """
+    import random
+
+    with database.connection(db_path) as conn:
+        unit_ids = [row[0] for row in conn.execute(
+            f"SELECT id FROM units WHERE status NOT IN ({','.join('?' * len(OUT_OF_SERVICE_STATUSES))})",
+            OUT_OF_SERVICE_STATUSES
+        )]
+    if not unit_ids:
+        raise BookingError("Nenhuma unidade disponível para o teste")
+
+    today = date.today()
+    totals = {'booked': 0, 'conflicts': 0, 'rejected': 0}
+    lock = threading.Lock()
+
+    def worker(worker_seed):
+        rng = random.Random(worker_seed)
+        local = {'booked': 0, 'conflicts': 0, 'rejected': 0}
+        for _ in range(attempts_per_thread):
+            check_in = today + timedelta(days=lead_days + rng.randrange(horizon_days))
+            check_out = check_in + timedelta(days=rng.randint(1, 5))
+            try:
+                create_reservation(rng.choice(unit_ids), check_in, check_out, 'Stress',
+                                   today=today, db_path=db_path)
+                local['booked'] += 1
+            except UnitUnavailableError:
+                local['conflicts'] += 1
+            except BookingError:
+                local['rejected'] += 1
+        with lock:
+            for key, value in local.items():
+                totals[key] += value
+
+    base_seed = seed if seed is not None else random.randrange(1 << 30)
+    pool = [threading.Thread(target=worker, args=(base_seed + i,)) for i in range(threads)]
+    started = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    totals['overbookings'] = count_overbookings(db_path)
+    totals['seconds'] = round(elapsed, 3)
+    totals['bookings_per_second'] = round(totals['booked'] / elapsed, 1) if elapsed else 0.0
+    return totals
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    import os
+    import tempfile
+
+    parser = argparse.ArgumentParser(description="Teste de carga do motor de reservas")
+    parser.add_argument("--db", help="Banco a usar (padrão: cópia temporária nova)")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--attempts", type=int, default=200)
+    args = parser.parse_args()
+
+    db_path = args.db or os.path.join(tempfile.mkdtemp(), "booking_stress.db")
+    result = run_booking_stress(args.threads, args.attempts, db_path=db_path)
+    print(json.dumps(result, indent=2))
+    raise SystemExit(1 if result['overbookings'] else 0)
@@ -0,0 +1,115 @@
+"""Cache de dados compartilhado entre sessões, invalidado por escrita.
+
+Cada função decorada com :func:`cached` declara as tabelas de que depende. A
+chave do cache inclui os argumentos e a versão atual dessas tabelas (tabela
+``data_versions``, incrementada por triggers), de modo que qualquer escrita
+invalida imediatamente os resultados afetados. O TTL e o tamanho máximo
+limitam a memória e a idade dos resultados.
+
+Os objetos retornados são compartilhados: quem chama não deve modificá-los.
+"""
+import functools
+import inspect
+import os
+import threading
+
+from cachetools import TTLCache
+
+from orion import database
+
+DEFAULT_TTL = int(os.environ.get("ORION_CACHE_TTL", "300"))
+DEFAULT_MAXSIZE = int(os.environ.get("ORION_CACHE_MAXSIZE", "128"))
+
+_registry = []
+
+
+def get_data_versions(db_path=database.DEFAULT_DB_PATH):
+    """Versão atual de cada tabela monitorada"""
+    with database.connection(db_path) as conn:
+        return dict(conn.execute("SELECT table_name, version FROM data_versions").fetchall())
+
+
+def _freeze(value):
+    """Converte argumentos mutáveis (listas, dicts) em chaves hashable"""
+    if isinstance(value, (list, tuple, set, frozenset)):
+        frozen = tuple(_freeze(v) for v in value)
+        return tuple(sorted(frozen, key=repr)) if isinstance(value, (set, frozenset)) else frozen
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    return value
+
+
+class DataCache:
+    """Cache TTL limitado de uma função de dados"""
+
+    def __init__(self, func, tables, ttl, maxsize):
+        self.func = func
+        self.tables = tables
+        self.signature = inspect.signature(func)
+        self.entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __call__(self, *args, **kwargs):
+        bound = self.signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        db_path = bound.arguments.get('db_path', database.DEFAULT_DB_PATH)
+        versions = get_data_versions(db_path)
+        key = (
+            _freeze(tuple(bound.arguments.items())),
+            tuple(versions.get(table, 0) for table in self.tables)
+        )
+
+        with self.lock:
+            try:
+                value = self.entries[key]
+                self.hits += 1
+                return value
+            except KeyError:
+                self.misses += 1
+
+        # Calculado fora do lock: sessões concorrentes não se bloqueiam
+        value = self.func(*args, **kwargs)
+        with self.lock:
+            self.entries[key] = value
+        return value
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+def cached(*tables, ttl=DEFAULT_TTL, maxsize=DEFAULT_MAXSIZE):
+    """Decora uma função de dados dependente das tabelas informadas"""
+    def decorator(func):
+        cache = DataCache(func, tables, ttl, maxsize)
+        _registry.append(cache)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return cache(*args, **kwargs)
+
+        wrapper.cache = cache
+        return wrapper
+    return decorator
+
+
+def clear_all():
+    """Esvazia todos os caches do processo"""
+    for cache in _registry:
+        cache.clear()
+
+
+def cache_stats():
+    """Acertos, falhas e tamanho de cada cache registrado"""
+    return [
+        {
+            'function': f"{cache.func.__module__}.{cache.func.__qualname__}",
+            'tables': ', '.join(cache.tables),
+            'entries': len(cache.entries),
+            'hits': cache.hits,
+            'misses': cache.misses,
+        }
+        for cache in _registry
+    ]
@@ -0,0 +1,341 @@
+"""Feed de ARI (disponibilidade, tarifas e restrições) para channel managers.
+
+Cada alteração em ``rates`` - inclusive a disponibilidade, que acompanha o
+inventário - é capturada por trigger em ``ari_changes`` na mesma transação
+da escrita. O publicador lê as alterações pendentes de um canal, mantém só
+o estado mais recente de cada (tipo, data), junta datas consecutivas com os
+mesmos valores em intervalos e envia lotes JSON a um endpoint HTTP::
+
+    {"channel": "...", "batch_id": "...", "updates": [
+        {"unit_type": "Luxo", "start": "2026-11-01", "end": "2026-11-03",
+         "rate": 450.0, "availability": 12, "min_stay": 1, "max_stay": 30,
+         "stop_sell": false, "cutoff_days": 0}
+    ]}
+
+``end`` é inclusivo. As mensagens levam valores absolutos, então reenviar um
+lote é inofensivo: a posição do canal só avança depois que todos os lotes
+do ciclo foram aceitos (entrega ao menos uma vez).
+Alterações já entregues a todos os canais são descartadas
+(:func:`prune_changes`, também pela rotina diária ``ari_prune``).
+
+Contrapressão: cada ciclo lê no máximo ``max_changes`` alterações, os lotes
+são enviados em sequência e respostas 429/503 são respeitadas
+(``Retry-After``). Enquanto o endpoint está lento as alterações se acumulam
+no banco e são coalescidas no ciclo seguinte - o volume enviado cresce com
+o número de intervalos alterados, não com o número de escritas.
+
+Uso::
+
+    python -m orion.channels stub --port 8765
+    python -m orion.channels publish --endpoint http://localhost:8765/ari
+"""
+import json
+import logging
+import os
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from orion import database
+
+DEFAULT_ENDPOINT = os.environ.get("ORION_ARI_ENDPOINT", "")
+DEFAULT_TOKEN = os.environ.get("ORION_ARI_TOKEN", "")
+DEFAULT_CHANNEL = "default"
+
+logger = logging.getLogger("orion.channels")
+
+BATCH_SIZE = 500          # intervalos por requisição
+MAX_CHANGES = 100_000     # alterações lidas por ciclo
+MAX_RETRIES = 5
+BACKOFF_SECONDS = 0.5
+MAX_BACKOFF_SECONDS = 30.0
+TIMEOUT_SECONDS = 10
+FULL_SYNC_DAYS = 365
+
+# Colunas de rates e o nome publicado
+_FIELDS = dict(zip(database.ARI_COLUMNS, ('rate', 'availability', 'min_stay', 'max_stay', 'stop_sell',
+                                          'cutoff_days')))
+RETRY_STATUSES = (408, 425, 429, 500, 502, 503, 504)
+
+
+class DeliveryError(Exception):
+    """O endpoint não aceitou um lote após todas as tentativas"""
+
+
+def _values(row):
+    """Valores publicados de uma linha (rate, availability, ...) em tipos JSON"""
+    rate, availability, min_stay, max_stay, stop_sell, cutoff = row
+    return (
+        None if rate is None else round(float(rate), 2), availability, min_stay, max_stay,
+        None if stop_sell is None else bool(stop_sell), cutoff,
+    )
+
+
+def coalesce(changes):
+    """Reduz alterações a intervalos de datas consecutivas com os mesmos valores.
+
+    ``changes`` são tuplas ``(unit_type, data ISO, rate, availability,
+    min_stay, max_stay, stop_sell, cutof_days)`` em ordem de captura; vale a
+    última de cada (tipo, data).
+    """
+    latest = {}
+    for unit_type, day, *values in changes:
+        latest[(unit_type, str(day)[:10])] = _values(values)
+
+    ranges = []
+    for (unit_type, day), values in sorted(latest.items()):
+        current = date.fromisoformat(day)
+        last = ranges[-1] if ranges else None
+        if (last and last['unit_type'] == unit_type and last['_values'] == values
+                and last['_end'] + timedelta(days=1) == current):
+            last['_end'] = current
+            continue
+        ranges.append({'unit_type': unit_type, '_start': current, '_end': current, '_values': values})
+
+    return [
+        {
+            'unit_type': item['unit_type'], 'start': item['_start'].isoformat(), 'end': item['_end'].isoformat(),
+            **dict(zip(_FIELDS.values(), item['_values'])),
+        }
+        for item in ranges
+    ]
+
+
+def prune_changes(conn):
+    """Remove alterações já entregues a todos os canais; retorna as removidas.
+
+    Sem canal registrado nada é consumido e o feed inteiro é descartado: um
+    canal novo começa com a grade completa (:meth:`ChannelPublisher.full_sync`).
+    """
+    cur = conn.execute("""
+        DELETE FROM ari_changes
+        WHERE id <= COALESCE(
+            (SELECT MIN(last_change_id) FROM ari_feed_state),
+            (SELECT MAX(id) FROM ari_changes)
+        )
+    """)
+    return cur.rowcount
+
+
+class ChannelPublisher:
+    """Publica as alterações de ARI de um canal num endpoint HTTP"""
+
+    def __init__(self, endpoint=DEFAULT_ENDPOINT, channel=DEFAULT_CHANNEL, token=DEFAULT_TOKEN,
+                 batch_size=BATCH_SIZE, max_changes=MAX_CHANGES, max_retries=MAX_RETRIES,
+                 backoff=BACKOFF_SECONDS, timeout=TIMEOUT_SECONDS, db_path=database.DEFAULT_DB_PATH):
+        if not endpoint:
+            raise ValueError("Endpoint do canal não configurado (ORION_ARI_ENDPOINT)")
+        self.endpoint = endpoint
+        self.channel = channel
+        self.batch_size = batch_size
+        self.max_changes = max_changes
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.db_path = db_path
+        self.session = requests.Session()  # conexão reaproveitada entre lotes
+        if token:
+            self.session.headers['Authorization'] = f"Bearer {token}"
+
+    def cursor(self):
+        """Última alteração entregue (None se o canal ainda não foi sincronizado)"""
+        with database.connection(self.db_path) as conn:
+            row = conn.execute(
+                "SELECT last_change_id FROM ari_feed_state WHERE channel = ?", (self.channel,)
+            ).fetchone()
+        return None if row is None else row[0]
+
+    def _advance(self, last_change_id):
+        with database.transaction(self.db_path, immediate=True) as conn:
+            conn.execute("""
+                INSERT INTO ari_feed_state (channel, last_change_id, delivered_at)
+                VALUES (?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT (channel) DO UPDATE SET
+                    last_change_id = MAX(last_change_id, excluded.last_change_id),
+                    delivered_at = excluded.delivered_at
+            """, (self.channel, last_change_id))
+            prune_changes(conn)
+
+    def _post(self, updates, batch_id):
+        """Envia um lote com novas tentativas (backoff exponencial e Retry-After)"""
+        payload = {'channel': self.channel, 'batch_id': batch_id, 'updates': updates}
+        for attempt in range(self.max_retries + 1):
+            wait = min(self.backoff * 2 ** attempt, MAX_BACKOFF_SECONDS)
+            try:
+                response = self.session.post(self.endpoint, json=payload, timeout=self.timeout)
+            except requests.RequestException as error:
+                reason = str(error)
+            else:
+                if response.status_code < 300:
+                    return
+                if response.status_code not in RETRY_STATUSES:
+                    raise DeliveryError(f"Lote {batch_id} recusado: HTTP {response.status_code}")
+                reason = f"HTTP {response.status_code}"
+                retry_after = response.headers.get('Retry-After')
+                if retry_after and retry_after.isdigit():
+                    wait = min(float(retry_after), MAX_BACKOFF_SECONDS)
+            if attempt < self.max_retries:
+                time.sleep(wait)
+        raise DeliveryError(f"Lote {batch_id} não entregue após {self.max_retries + 1} tentativas: {reason}")
+
+    def _send(self, updates, position):
+        for index in range(0, len(updates), self.batch_size):
+            self._post(updates[index:index + self.batch_size], f"{self.channel}-{position}-{index // self.batch_size}")
+
+    def full_sync(self, days=FULL_SYNC_DAYS, today=None):
+        """Envia a grade completa do horizonte e posiciona o canal no fim do feed"""
+        today = today or date.today()
+        # Grade e posição lidas no mesmo instante (mesma transação)
+        with database.transaction(self.db_path) as conn:
+            position = conn.execute("SELECT COALESCE(MAX(id), 0) FROM ari_changes").fetchone()[0]
+            rows = conn.execute(f"""
+                SELECT unit_type, date, {', '.join(database.ARI_COLUMNS)} FROM rates
+                WHERE date >= ? AND date < ?
+            """, (today.isoformat(), (today + timedelta(days=days)).isoformat())).fetchall()
+        updates = coalesce(rows)
+        self._send(updates, f"full{position}")
+        self._advance(position)
+        return len(updates)
+
+    def publish(self, today=None):
+        """Um ciclo de publicação; retorna o número de intervalos enviados.
+
+        Canais novos começam com :meth:`full_sync`. Datas passadas não são
+        publicadas.
+        """
+        position = self.cursor()
+        if position is None:
+            return self.full_sync(today=today)
+        with database.connection(self.db_path) as conn:
+            rows = conn.execute(f"""
+                SELECT id, unit_type, ari_date, {', '.join(database.ARI_COLUMNS)} FROM ari_changes
+                WHERE id > ? ORDER BY id LIMIT ?
+            """, (position, self.max_changes)).fetchall()
+        if not rows:
+            return 0
+        today = (today or date.today()).isoformat()
+        updates = coalesce(row[1:] for row in rows if str(row[2])[:10] >= today)
+        last_id = rows[-1][0]
+        self._send(updates, last_id)
+        self._advance(last_id)
+        return len(updates)
+
+    def run(self, interval=5.0, stop_event=None):
+        """Publica continuamente até ``stop_event``; falhas são repetidas no ciclo seguinte"""
+        stop_event = stop_event or threading.Event()
+        while not stop_event.is_set():
+            try:
+                sent = self.publish()
+            except DeliveryError as error:
+                logger.warning("[%s] %s", self.channel, error)
+                sent = 0
+            # Backlog lido até o limite: segue sem esperar
+            if sent == 0 or self.pending() == 0:
+                stop_event.wait(interval)
+
+    def pending(self):
+        """Alterações capturadas ainda não entregues ao canal"""
+        position = self.cursor() or 0  # antes de pegar a conexão: cursor() usa outra do pool
+        with database.connection(self.db_path) as conn:
+            return conn.execute("SELECT COUNT(*) FROM ari_changes WHERE id > ?", (position,)).fetchone()[0]
+
+
+class StubEndpoint:
+    """Endpoint HTTP local que grava os lotes recebidos (para testes e homologação).
+
+    ``fail_first`` respostas 503 com ``Retry-After`` simulam um canal
+    sobrecarregado; ``delay`` atrasa cada resposta (segundos).
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, fail_first=0, retry_after=0, delay=0.0):
+        self.batches = []
+        self.fail_first = fail_first
+        self.retry_after = retry_after
+        self.delay = delay
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                time.sleep(stub.delay)
+                with stub._lock:
+                    failing = stub.fail_first > 0
+                    if failing:
+                        stub.fail_first -= 1
+                    else:
+                        stub.batches.append(json.loads(body))
+                if failing:
+                    self.send_response(503)
+                    self.send_header('Retry-After', str(stub.retry_after))
+                else:
+                    self.send_response(200)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.url = f"http://{host}:{self.server.server_address[1]}/ari"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+    @property
+    def updates(self):
+        return [update for batch in self.batches for update in batch['updates']]
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Feed de ARI do Orion PMS para channel managers")
+    parser.add_argument("--db", default=database.DEFAULT_DB_PATH)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    publish = commands.add_parser("publish", help="Publica as alterações pendentes")
+    publish.add_argument("--endpoint", default=DEFAULT_ENDPOINT)
+    publish.add_argument("--channel", default=DEFAULT_CHANNEL)
+    publish.add_argument("--full", action="store_true", help="Reenvia a grade completa do horizonte")
+    publish.add_argument("--follow", action="store_true", help="Continua publicando a cada --interval s")
+    publish.add_argument("--interval", type=float, default=5.0)
+
+    stub = commands.add_parser("stub", help="Endpoint local que imprime os lotes recebidos")
+    stub.add_argument("--port", type=int, default=8765)
+    stub.add_argument("--fail-first", type=int, default=0)
+
+    args = parser.parse_args(argv)
+    if args.command == "stub":
+        with StubEndpoint(port=args.port, fail_first=args.fail_first) as endpoint:
+            print(f"Recebendo lotes em {endpoint.url} (Ctrl+C para sair)")
+            seen = 0
+            try:
+                while True:
+                    time.sleep(1)
+                    for batch in endpoint.batches[seen:]:
+                        print(f"{batch['batch_id']}: {len(batch['updates'])} intervalos")
+                    seen = len(endpoint.batches)
+            except KeyboardInterrupt:
+                return 0
+
+    publisher = ChannelPublisher(args.endpoint, args.channel, db_path=args.db)
+    if args.follow:
+        publisher.run(args.interval)
+        return 0
+    sent = publisher.full_sync() if args.full else publisher.publish()
+    print(f"{sent} intervalos publicados no canal {args.channel}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
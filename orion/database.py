@@ -0,0 +1,997 @@
+"""Camada de acesso ao banco de dados SQLite do Orion PMS.
+
+O schema é criado/migrado uma única vez por processo, na primeira vez em que
+um banco é acessado. As conexões são longas, ficam num pool por arquivo de
+banco e são emprestadas aos módulos da interface via context managers.
+"""
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+from orion.instrumentation import InstrumentedConnection
+
+DEFAULT_DB_PATH = os.environ.get("ORION_DB_PATH", "orion_pms.db")
+
+# Pragmas aplicados em toda conexão nova
+CONNECTION_PRAGMAS = (
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),
+    ("busy_timeout", 30000),
+    ("cache_size", -16000),  # ~16 MB de page cache por conexão
+    ("temp_store", "MEMORY"),
+    ("mmap_size", 134217728),
+)
+
+POOL_SIZE = int(os.environ.get("ORION_DB_POOL_SIZE", "8"))
+
+
+def _create_base_schema(c):
+    """Migração 1: tabelas principais do PMS"""
+    # Tabela de hóspedes com dados completos
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS guests (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            first_name TEXT NOT NULL,
+            last_name TEXT NOT NULL,
+            email TEXT,
+            phone TEXT,
+            document_type TEXT,
+            document_number TEXT UNIQUE,
+            nationality TEXT,
+            date_of_birth DATE,
+            preferences TEXT,
+            loyalty_tier TEXT DEFAULT 'Standard',
+            loyalty_points INTEGER DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # Tabela de unidades habitacionais com atributos avançados
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS units (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            code TEXT UNIQUE NOT NULL,
+            name TEXT,
+            type TEXT NOT NULL,
+            floor INTEGER,
+            capacity INTEGER DEFAULT 2,
+            max_capacity INTEGER DEFAULT 2,
+            base_rate DECIMAL(10, 2) NOT NULL,
+            status TEXT DEFAULT 'available',
+            amenities TEXT,
+            view_type TEXT,
+            cleaning_time INTEGER DEFAULT 30,
+            last_maintenance DATE,
+            next_maintenance DATE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # Tabela de reservas com campos expandidos
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS reservations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            confirmation_code TEXT UNIQUE,
+            guest_id INTEGER,
+            unit_id INTEGER,
+            check_in DATE NOT NULL,
+            check_out DATE NOT NULL,
+            adults INTEGER DEFAULT 1,
+            children INTEGER DEFAULT 0,
+            status TEXT DEFAULT 'confirmed',
+            source TEXT NOT NULL,
+            rate DECIMAL(10, 2) NOT NULL,
+            total_amount DECIMAL(12, 2),
+            currency TEXT DEFAULT 'BRL',
+            payment_status TEXT DEFAULT 'pending',
+            payment_method TEXT,
+            special_requests TEXT,
+            notes TEXT,
+            created_by INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (guest_id) REFERENCES guests (id),
+            FOREIGN KEY (unit_id) REFERENCES units (id)
+        )
+    ''')
+
+    # Tabela de tarifas dinâmicas
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS rates (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            unit_type TEXT NOT NULL,
+            date DATE NOT NULL,
+            rate DECIMAL(10, 2) NOT NULL,
+            min_stay INTEGER DEFAULT 1,
+            max_stay INTEGER DEFAULT 30,
+            stop_sell BOOLEAN DEFAULT FALSE,
+            cutof_days INTEGER DEFAULT 0,
+            availability INTEGER DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(unit_type, date)
+        )
+    ''')
+
+    # Tabela de tarefas de housekeeping
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS housekeeping (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            unit_id INTEGER NOT NULL,
+            task_type TEXT NOT NULL,
+            status TEXT DEFAULT 'pending',
+            assigned_to TEXT,
+            estimated_time INTEGER,
+            actual_time INTEGER,
+            notes TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            completed_at TIMESTAMP,
+            FOREIGN KEY (unit_id) REFERENCES units (id)
+        )
+    ''')
+
+
+def _seed_demo_data(c):
+    """Insere os dados iniciais de demonstração num banco vazio"""
+    c.execute("SELECT COUNT(*) FROM units")
+    if c.fetchone()[0] != 0:
+        return
+
+    # Unidades de exemplo
+    units_data = [
+        ('101', 'Standard City View', 'Standard', 1, 2, 2, 250.00, 'available',
+         'WiFi, TV, Ar-condicionado, Frigobar', 'city', 30, '2024-01-15', '2024-07-15'),
+        ('102', 'Standard Garden View', 'Standard', 1, 2, 2, 280.00, 'available',
+         'WiFi, TV, Ar-condicionado, Frigobar, Varanda', 'garden', 30, '2024-01-20', '2024-07-20'),
+        ('201', 'Luxo Premium', 'Luxo', 2, 3, 4, 450.00, 'available',
+         'WiFi, TV LED, Ar-condicionado, Frigobar, Varanda, Hidromassagem', 'ocean', 45, '2024-02-10', '2024-08-10'),
+        ('202', 'Luxo Executivo', 'Luxo', 2, 2, 3, 420.00, 'maintenance',
+         'WiFi, TV LED, Ar-condicionado, Frigobar, Área de trabalho', 'city', 45, '2024-02-15', '2024-08-15'),
+        ('301', 'Suíte Master', 'Suite', 3, 4, 6, 750.00, 'available',
+         'WiFi, TV 4K, Ar-condicionado, Frigobar, Varanda, Hidromassagem, Cozinha', 'ocean', 60, '2024-03-01', '2024-09-01')
+    ]
+
+    c.executemany(
+        """INSERT INTO units
+        (code, name, type, floor, capacity, max_capacity, base_rate, status, amenities, view_type, cleaning_time, last_maintenance, next_maintenance)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+        units_data
+    )
+
+    # Tarifas de exemplo
+    today = date.today()
+    rate_data = []
+    for i in range(90):  # 90 dias de tarifas
+        current_date = today + timedelta(days=i)
+        for unit_type in ['Standard', 'Luxo', 'Suite']:
+            # Lógica de precificação dinâmica simulada
+            base_rate = 250.00 if unit_type == 'Standard' else 450.00 if unit_type == 'Luxo' else 750.00
+
+            # Aumento de preço nos finais de semana
+            if current_date.weekday() >= 5:  # Sábado ou Domingo
+                base_rate *= 1.3
+
+            # Aumento de preço em feriados (exemplo simplificado)
+            holiday_multiplier = 1.5 if current_date.month == 12 and current_date.day in [24, 25, 31] else 1.0
+            base_rate *= holiday_multiplier
+
+            rate_data.append((
+                unit_type, current_date.isoformat(), round(base_rate, 2),
+                1, 30, False, 14
+            ))
+
+    # availability é preenchida a partir do inventário (trigger de rates)
+    c.executemany(
+        """INSERT INTO rates
+        (unit_type, date, rate, min_stay, max_stay, stop_sell, cutof_days)
+        VALUES (?, ?, ?, ?, ?, ?, ?)""",
+        rate_data
+    )
+
+
+def _create_stay_index(c):
+    """Migração 2: índice de cobertura para consultas de sobreposição de estadias"""
+    c.execute('''
+        CREATE INDEX IF NOT EXISTS idx_reservations_stay
+        ON reservations (check_out, check_in, unit_id, status)
+    ''')
+
+
+# Status de reserva que contam como unidade vendida nas estatísticas
+SOLD_STATUSES = ('confirmed', 'checked-in', 'checked-out')
+
+# Maior estadia (em noites) expandida para as estatísticas diárias
+MAX_STAT_NIGHTS = 3660
+
+_STATUS_LIST = ", ".join(f"'{s}'" for s in SOLD_STATUSES)
+
+_DAILY_STATS_UPSERT = """
+    ON CONFLICT (stat_date, unit_type) DO UPDATE SET
+        rooms_sold = rooms_sold + excluded.rooms_sold,
+        revenue = revenue + excluded.revenue,
+        arrivals = arrivals + excluded.arrivals,
+        departures = departures + excluded.departures
+"""
+
+
+def _stay_delta_sql(row, sign):
+    """INSERT que soma (sign=1) ou subtrai (sign=-1) uma estadia de daily_stats"""
+    return f"""
+        INSERT INTO daily_stats (stat_date, unit_type, rooms_sold, revenue, arrivals, departures)
+        SELECT date({row}.check_in, '+' || o.n || ' days'), s.unit_type,
+               {sign} * (o.n < s.nights),
+               {sign} * (o.n < s.nights) * CAST({row}.rate AS REAL),
+               {sign} * (o.n = 0),
+               {sign} * (o.n = s.nights)
+        FROM day_offsets o, (
+            SELECT CAST(julianday({row}.check_out) - julianday({row}.check_in) AS INTEGER) AS nights,
+                   COALESCE((SELECT type FROM units WHERE id = {row}.unit_id), '') AS unit_type
+        ) s
+        WHERE {row}.status IN ({_STATUS_LIST}) AND o.n <= s.nights
+        {_DAILY_STATS_UPSERT};
+    """
+
+
+def daily_stats_expected_sql(window=False):
+    """SELECT de daily_stats recalculada de reservations (``window``: só :start-:end)"""
+    stays_window = " AND r.check_out >= :start AND r.check_in < :end" if window else ""
+    dates_window = "HAVING stat_date >= :start AND stat_date < :end" if window else ""
+    return f"""
+        WITH stays AS (
+            SELECT r.check_in, CAST(r.rate AS REAL) AS rate,
+                   COALESCE(u.type, '') AS unit_type,
+                   CAST(julianday(r.check_out) - julianday(r.check_in) AS INTEGER) AS nights
+            FROM reservations r
+            LEFT JOIN units u ON u.id = r.unit_id
+            WHERE r.status IN ({_STATUS_LIST}){stays_window}
+        )
+        SELECT date(s.check_in, '+' || o.n || ' days') AS stat_date, s.unit_type,
+               SUM(o.n < s.nights) AS rooms_sold, SUM((o.n < s.nights) * s.rate) AS revenue,
+               SUM(o.n = 0) AS arrivals, SUM(o.n = s.nights) AS departures
+        FROM stays s
+        JOIN day_offsets o ON o.n <= s.nights
+        GROUP BY stat_date, s.unit_type
+        {dates_window}
+    """
+
+
+def rebuild_daily_stats(c):
+    """Recalcula daily_stats inteira a partir de reservations (corrige divergências)"""
+    c.execute("DELETE FROM daily_stats")
+    c.execute(
+        "INSERT INTO daily_stats (stat_date, unit_type, rooms_sold, revenue, arrivals, departures)"
+        + daily_stats_expected_sql()
+    )
+
+
+def _create_daily_stats(c):
+    """Migração 3: estatísticas diárias materializadas, mantidas por triggers"""
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS daily_stats (
+            stat_date DATE NOT NULL,
+            unit_type TEXT NOT NULL,
+            rooms_sold INTEGER NOT NULL DEFAULT 0,
+            revenue DECIMAL(14, 2) NOT NULL DEFAULT 0,
+            arrivals INTEGER NOT NULL DEFAULT 0,
+            departures INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (stat_date, unit_type)
+        ) WITHOUT ROWID
+    ''')
+
+    # Deslocamentos 0..N usados para expandir estadias em noites
+    c.execute("CREATE TABLE IF NOT EXISTS day_offsets (n INTEGER PRIMARY KEY)")
+    c.execute(f'''
+        INSERT OR IGNORE INTO day_offsets (n)
+        WITH RECURSIVE seq(n) AS (SELECT 0 UNION ALL SELECT n + 1 FROM seq WHERE n < {MAX_STAT_NIGHTS})
+        SELECT n FROM seq
+    ''')
+
+    # Manutenção incremental na mesma transação da escrita em reservations
+    c.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_reservations_stats_insert
+        AFTER INSERT ON reservations
+        BEGIN
+            {_stay_delta_sql("NEW", 1)}
+        END
+    ''')
+    c.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_reservations_stats_update
+        AFTER UPDATE OF unit_id, check_in, check_out, status, rate ON reservations
+        BEGIN
+            {_stay_delta_sql("OLD", -1)}
+            {_stay_delta_sql("NEW", 1)}
+        END
+    ''')
+    c.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_reservations_stats_delete
+        AFTER DELETE ON reservations
+        BEGIN
+            {_stay_delta_sql("OLD", -1)}
+        END
+    ''')
+
+    rebuild_daily_stats(c)
+
+
+def _create_unit_stay_index(c):
+    """Migração 4: índice para checar conflitos de estadia por unidade"""
+    c.execute('''
+        CREATE INDEX IF NOT EXISTS idx_reservations_unit_stay
+        ON reservations (unit_id, check_out, check_in, status)
+    ''')
+
+
+# Tabelas com contador de versão incrementado a cada escrita
+VERSIONED_TABLES = ('guests', 'units', 'reservations', 'rates', 'housekeeping')
+
+
+def _create_data_versions(c):
+    """Migração 5: contadores de versão por tabela para invalidar caches"""
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS data_versions (
+            table_name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    ''')
+    c.executemany(
+        "INSERT OR IGNORE INTO data_versions (table_name) VALUES (?)",
+        [(table,) for table in VERSIONED_TABLES + ('daily_stats',)]
+    )
+    for table in VERSIONED_TABLES:
+        for operation in ('INSERT', 'UPDATE', 'DELETE'):
+            c.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_version_{operation.lower()}
+                AFTER {operation} ON {table}
+                BEGIN
+                    UPDATE data_versions SET version = version + 1 WHERE table_name = '{table}';
+                END
+            ''')
+
+
+def bump_data_version(c, *tables):
+    """Incrementa a versão de tabelas alteradas fora dos triggers (cargas em lote)"""
+    c.executemany(
+        "UPDATE data_versions SET version = version + 1 WHERE table_name = ?",
+        [(table,) for table in tables]
+    )
+
+
+# Status de reserva que bloqueiam a unidade para outras estadias
+BLOCKING_STATUSES = ('confirmed', 'checked-in')
+
+
+def _create_overbooking_guard(c):
+    """Migração 6: impede duas reservas ativas na mesma unidade e noite"""
+    blocking = ", ".join(f"'{s}'" for s in BLOCKING_STATUSES)
+    conflict = f"""
+        SELECT RAISE(ABORT, 'overbooking: unidade já reservada no período')
+        WHERE EXISTS (
+            SELECT 1 FROM reservations r
+            WHERE r.unit_id = NEW.unit_id
+            AND r.check_out > NEW.check_in AND r.check_in < NEW.check_out
+            AND r.status IN ({blocking})
+            AND r.id IS NOT NEW.id
+        );
+    """
+    c.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_reservations_overbooking_insert
+        BEFORE INSERT ON reservations
+        WHEN NEW.status IN ({blocking})
+        BEGIN
+            {conflict}
+        END
+    ''')
+    c.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_reservations_overbooking_update
+        BEFORE UPDATE OF unit_id, check_in, check_out, status ON reservations
+        WHEN NEW.status IN ({blocking})
+        BEGIN
+            {conflict}
+        END
+    ''')
+
+
+def _digits_sql(column):
+    """Expressão SQL que remove a pontuação usual de telefones e documentos"""
+    expression = column
+    for char in (' ', '-', '.', '/', '(', ')', '+'):
+        expression = f"replace({expression}, '{char}', '')"
+    return expression
+
+
+def _create_guest_search(c):
+    """Migração 7: índice full-text de hóspedes e índice de histórico por hóspede"""
+    # Telefone e documento são indexados só com dígitos, para casar qualquer formatação
+    c.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS guests_fts USING fts5(
+            first_name, last_name, email, phone, document_number,
+            tokenize = "unicode61 remove_diacritics 2",
+            prefix = '2 3'
+        )
+    ''')
+    values = (
+        f"NEW.id, NEW.first_name, NEW.last_name, NEW.email, "
+        f"{_digits_sql('NEW.phone')}, {_digits_sql('NEW.document_number')}"
+    )
+    insert = f"""
+        INSERT INTO guests_fts (rowid, first_name, last_name, email, phone, document_number)
+        VALUES ({values});
+    """
+    c.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_guests_fts_insert
+        AFTER INSERT ON guests
+        BEGIN
+            {insert}
+        END
+    ''')
+    c.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_guests_fts_update
+        AFTER UPDATE OF id, first_name, last_name, email, phone, document_number ON guests
+        BEGIN
+            DELETE FROM guests_fts WHERE rowid = OLD.id;
+            {insert}
+        END
+    ''')
+    c.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_guests_fts_delete
+        AFTER DELETE ON guests
+        BEGIN
+            DELETE FROM guests_fts WHERE rowid = OLD.id;
+        END
+    ''')
+    c.execute(f"""
+        INSERT INTO guests_fts (rowid, first_name, last_name, email, phone, document_number)
+        SELECT id, first_name, last_name, email, {_digits_sql('phone')}, {_digits_sql('document_number')}
+        FROM guests
+    """)
+
+    c.execute('''
+        CREATE INDEX IF NOT EXISTS idx_reservations_guest
+        ON reservations (guest_id, check_in)
+    ''')
+
+
+def _create_reservation_list_indexes(c):
+    """Migração 8: índices da listagem paginada de reservas (filtro + ordenação)"""
+    # O rowid entra implicitamente no fim de cada índice, servindo de desempate do keyset
+    for name, columns in (
+        ('idx_reservations_check_in', 'check_in'),
+        ('idx_reservations_created', 'created_at'),
+        ('idx_reservations_status_check_in', 'status, check_in'),
+        ('idx_reservations_source_check_in', 'source, check_in'),
+        ('idx_reservations_unit_check_in', 'unit_id, check_in'),
+    ):
+        c.execute(f"CREATE INDEX IF NOT EXISTS {name} ON reservations ({columns})")
+
+
+def _create_housekeeping_planning(c):
+    """Migração 9: dia, prioridade e horário planejado das tarefas de housekeeping"""
+    for column in ("task_date DATE", "priority INTEGER DEFAULT 0", "scheduled_start TIMESTAMP"):
+        c.execute(f"ALTER TABLE housekeeping ADD COLUMN {column}")
+    c.execute("UPDATE housekeeping SET task_date = date(created_at)")
+    c.execute('''
+        CREATE INDEX IF NOT EXISTS idx_housekeeping_day
+        ON housekeeping (task_date, status, unit_id, task_type)
+    ''')
+
+
+def _allow_reservation_upserts(c):
+    """Migração 10: guarda de overbooking compatível com upsert por código de confirmação"""
+    # O BEFORE INSERT roda antes da resolução do conflito: num upsert, a reserva
+    # com o mesmo código é a que será atualizada, não uma concorrente
+    blocking = ", ".join(f"'{s}'" for s in BLOCKING_STATUSES)
+    c.execute("DROP TRIGGER IF EXISTS trg_reservations_overbooking_insert")
+    c.execute(f'''
+        CREATE TRIGGER trg_reservations_overbooking_insert
+        BEFORE INSERT ON reservations
+        WHEN NEW.status IN ({blocking})
+        BEGIN
+            SELECT RAISE(ABORT, 'overbooking: unidade já reservada no período')
+            WHERE EXISTS (
+                SELECT 1 FROM reservations r
+                WHERE r.unit_id = NEW.unit_id
+                AND r.check_out > NEW.check_in AND r.check_in < NEW.check_out
+                AND r.status IN ({blocking})
+                AND (NEW.confirmation_code IS NULL OR r.confirmation_code IS NOT NEW.confirmation_code)
+            );
+        END
+    ''')
+
+
+def _create_demand_forecast(c):
+    """Migração 11: curvas de pickup e previsão de demanda por data e tipo"""
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS pickup_curves (
+            unit_type TEXT NOT NULL,
+            dow INTEGER NOT NULL,
+            lead_days INTEGER NOT NULL,
+            pickup REAL NOT NULL,
+            pickup_adr REAL,
+            PRIMARY KEY (unit_type, dow, lead_days)
+        ) WITHOUT ROWID
+    ''')
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS demand_forecast (
+            forecast_date DATE NOT NULL,
+            unit_type TEXT NOT NULL,
+            lead_days INTEGER NOT NULL,
+            capacity INTEGER NOT NULL,
+            on_the_books INTEGER NOT NULL,
+            expected_rooms REAL NOT NULL,
+            expected_occupancy REAL NOT NULL,
+            otb_revenue REAL NOT NULL,
+            expected_revenue REAL NOT NULL,
+            PRIMARY KEY (forecast_date, unit_type)
+        ) WITHOUT ROWID
+    ''')
+    # Estado da última atualização (linha única)
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS forecast_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            curve_date DATE,
+            source_version TEXT,
+            refreshed_at TIMESTAMP
+        )
+    ''')
+    c.execute("INSERT OR IGNORE INTO forecast_state (id) VALUES (1)")
+    c.execute("INSERT OR IGNORE INTO data_versions (table_name) VALUES ('demand_forecast')")
+
+
+# Status de unidade que a retiram da venda
+OUT_OF_SERVICE_STATUSES = ('maintenance', 'out_of_order')
+
+_OUT_OF_SERVICE_LIST = ", ".join(f"'{s}'" for s in OUT_OF_SERVICE_STATUSES)
+
+# Inventário esperado por (data, tipo), recalculado a partir de reservations e units.
+# Chaves: noites vendidas, linhas já existentes e datas com tarifa cadastrada.
+INVENTORY_EXPECTED_SQL = f"""
+    WITH sold AS (
+        SELECT date(r.check_in, '+' || o.n || ' days') AS inv_date,
+               COALESCE(u.type, '') AS unit_type, COUNT(*) AS rooms_sold
+        FROM reservations r
+        LEFT JOIN units u ON u.id = r.unit_id
+        JOIN day_offsets o ON o.n < CAST(julianday(r.check_out) - julianday(r.check_in) AS INTEGER)
+        WHERE r.status IN ({_STATUS_LIST})
+        GROUP BY 1, 2
+    ), capacity AS (
+        SELECT type AS unit_type, COUNT(*) AS total_rooms,
+               SUM(status IN ({_OUT_OF_SERVICE_LIST})) AS out_of_order
+        FROM units GROUP BY type
+    ), keys AS (
+        SELECT inv_date, unit_type FROM sold
+        UNION SELECT inv_date, unit_type FROM inventory
+        UNION SELECT date, unit_type FROM rates
+    )
+    SELECT k.inv_date, k.unit_type, COALESCE(c.total_rooms, 0) AS total_rooms,
+           COALESCE(c.out_of_order, 0) AS out_of_order, COALESCE(s.rooms_sold, 0) AS rooms_sold
+    FROM keys k
+    LEFT JOIN capacity c ON c.unit_type = k.unit_type
+    LEFT JOIN sold s ON s.inv_date = k.inv_date AND s.unit_type = k.unit_type
+"""
+
+# "Hoje" dentro dos triggers: a capacidade de datas passadas é histórica e não muda
+_TODAY_SQL = "date('now', 'localtime')"
+
+
+def _unit_capacity_sql(unit_type):
+    """Colunas (total_rooms, out_of_order) atuais de um tipo de unidade"""
+    return f"""
+        (SELECT COUNT(*) FROM units WHERE type = {unit_type}),
+        (SELECT COUNT(*) FROM units WHERE type = {unit_type} AND status IN ({_OUT_OF_SERVICE_LIST}))
+    """
+
+
+def _inventory_stay_sql(row, sign):
+    """INSERT que soma (sign=1) ou subtrai (sign=-1) as noites de uma estadia do inventário"""
+    return f"""
+        INSERT INTO inventory (inv_date, unit_type, total_rooms, out_of_order, rooms_sold)
+        SELECT date({row}.check_in, '+' || o.n || ' days'), s.unit_type, s.total_rooms, s.out_of_order, {sign}
+        FROM day_offsets o, (
+            SELECT t.unit_type, t.nights,
+                   (SELECT COUNT(*) FROM units WHERE type = t.unit_type) AS total_rooms,
+                   (SELECT COUNT(*) FROM units WHERE type = t.unit_type
+                    AND status IN ({_OUT_OF_SERVICE_LIST})) AS out_of_order
+            FROM (
+                SELECT COALESCE((SELECT type FROM units WHERE id = {row}.unit_id), '') AS unit_type,
+                       CAST(julianday({row}.check_out) - julianday({row}.check_in) AS INTEGER) AS nights
+            ) t
+        ) s
+        WHERE {row}.status IN ({_STATUS_LIST}) AND o.n < s.nights
+        ON CONFLICT (inv_date, unit_type) DO UPDATE SET rooms_sold = rooms_sold + excluded.rooms_sold;
+    """
+
+
+def _inventory_unit_sql(row, sign):
+    """UPDATE que soma ou subtrai uma unidade da capacidade das datas de hoje em diante"""
+    return f"""
+        UPDATE inventory SET
+            total_rooms = total_rooms + {sign},
+            out_of_order = out_of_order + {sign} * ({row}.status IN ({_OUT_OF_SERVICE_LIST}))
+        WHERE unit_type = {row}.type AND inv_date >= {_TODAY_SQL};
+    """
+
+
+def rebuild_inventory(c, today=None):
+    """Recalcula o inventário a partir de reservations e units (corrige divergências).
+
+    Noites vendidas são sempre recalculadas; a capacidade de datas passadas
+    é preservada. Também realinha ``rates.availability``.
+    """
+    today = (today or date.today()).isoformat()
+    c.execute(f"""
+        INSERT INTO inventory (inv_date, unit_type, total_rooms, out_of_order, rooms_sold)
+        SELECT * FROM ({INVENTORY_EXPECTED_SQL}) WHERE true
+        ON CONFLICT (inv_date, unit_type) DO UPDATE SET
+            rooms_sold = excluded.rooms_sold,
+            total_rooms = CASE WHEN inv_date >= :today THEN excluded.total_rooms ELSE total_rooms END,
+            out_of_order = CASE WHEN inv_date >= :today THEN excluded.out_of_order ELSE out_of_order END
+    """, {'today': today})
+    c.execute("""
+        UPDATE rates SET availability = i.available
+        FROM inventory i
+        WHERE i.inv_date = rates.date AND i.unit_type = rates.unit_type
+        AND rates.availability IS NOT i.available
+    """)
+
+
+def _create_inventory(c):
+    """Migração 12: inventário por data e tipo, mantido por triggers"""
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS inventory (
+            inv_date DATE NOT NULL,
+            unit_type TEXT NOT NULL,
+            total_rooms INTEGER NOT NULL DEFAULT 0,
+            out_of_order INTEGER NOT NULL DEFAULT 0,
+            rooms_sold INTEGER NOT NULL DEFAULT 0,
+            available INTEGER GENERATED ALWAYS AS (MAX(total_rooms - out_of_order - rooms_sold, 0)) VIRTUAL,
+            PRIMARY KEY (inv_date, unit_type)
+        ) WITHOUT ROWID
+    ''')
+
+    # Noites vendidas: mesma transação da escrita em reservations
+    c.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_reservations_inventory_insert
+        AFTER INSERT ON reservations
+        BEGIN
+            {_inventory_stay_sql("NEW", 1)}
+        END
+    ''')
+    c.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_reservations_inventory_update
+        AFTER UPDATE OF unit_id, check_in, check_out, status ON reservations
+        BEGIN
+            {_inventory_stay_sql("OLD", -1)}
+            {_inventory_stay_sql("NEW", 1)}
+        END
+    ''')
+    c.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_reservations_inventory_delete
+        AFTER DELETE ON reservations
+        BEGIN
+            {_inventory_stay_sql("OLD", -1)}
+        END
+    ''')
+
+    # Capacidade: unidades criadas, removidas, retipadas ou fora de serviço
+    c.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_units_inventory_insert
+        AFTER INSERT ON units
+        BEGIN
+            {_inventory_unit_sql("NEW", 1)}
+        END
+    ''')
+    c.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_units_inventory_update
+        AFTER UPDATE OF type, status ON units
+        WHEN OLD.type IS NOT NEW.type
+          OR (OLD.status IN ({_OUT_OF_SERVICE_LIST})) IS NOT (NEW.status IN ({_OUT_OF_SERVICE_LIST}))
+        BEGIN
+            {_inventory_unit_sql("OLD", -1)}
+            {_inventory_unit_sql("NEW", 1)}
+        END
+    ''')
+    c.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_units_inventory_delete
+        AFTER DELETE ON units
+        BEGIN
+            {_inventory_unit_sql("OLD", -1)}
+        END
+    ''')
+
+    # rates.availability acompanha o inventário; tarifa nova cria a linha da data
+    sync = """
+        UPDATE rates SET availability = NEW.available
+        WHERE unit_type = NEW.unit_type AND date = NEW.inv_date AND availability IS NOT NEW.available;
+    """
+    c.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_inventory_rates_insert
+        AFTER INSERT ON inventory
+        BEGIN
+            {sync}
+        END
+    ''')
+    c.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_inventory_rates_update
+        AFTER UPDATE ON inventory
+        WHEN OLD.available IS NOT NEW.available
+        BEGIN
+            {sync}
+        END
+    ''')
+    c.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_rates_inventory_insert
+        AFTER INSERT ON rates
+        BEGIN
+            INSERT INTO inventory (inv_date, unit_type, total_rooms, out_of_order, rooms_sold)
+            SELECT NEW.date, NEW.unit_type, {_unit_capacity_sql("NEW.unit_type")}, 0 WHERE true
+            ON CONFLICT (inv_date, unit_type) DO NOTHING;
+            UPDATE rates SET availability = (
+                SELECT available FROM inventory WHERE inv_date = NEW.date AND unit_type = NEW.unit_type
+            )
+            WHERE id = NEW.id;
+        END
+    ''')
+
+    c.execute("INSERT OR IGNORE INTO data_versions (table_name) VALUES ('inventory')")
+    rebuild_inventory(c)
+
+
+# Colunas de rates publicadas aos canais (ARI: disponibilidade, tarifa e restrições)
+ARI_COLUMNS = ('rate', 'availability', 'min_stay', 'max_stay', 'stop_sell', 'cutof_days')
+
+
+def _create_ari_changes(c):
+    """Migração 13: captura das alterações de ARI para o feed dos canais"""
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS ari_changes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            unit_type TEXT NOT NULL,
+            ari_date DATE NOT NULL,
+            rate DECIMAL(10, 2),
+            availability INTEGER,
+            min_stay INTEGER,
+            max_stay INTEGER,
+            stop_sell BOOLEAN,
+            cutof_days INTEGER,
+            changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    # Posição já entregue de cada canal
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS ari_feed_state (
+            channel TEXT PRIMARY KEY,
+            last_change_id INTEGER NOT NULL DEFAULT 0,
+            delivered_at TIMESTAMP
+        )
+    ''')
+
+    columns = ', '.join(ARI_COLUMNS)
+    values = ', '.join(f"NEW.{column}" for column in ARI_COLUMNS)
+    capture = f"""
+        INSERT INTO ari_changes (unit_type, ari_date, {columns})
+        VALUES (NEW.unit_type, NEW.date, {values});
+    """
+    changed = ' OR '.join(f"OLD.{column} IS NOT NEW.{column}" for column in ARI_COLUMNS + ('unit_type', 'date'))
+    c.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_rates_ari_insert
+        AFTER INSERT ON rates
+        BEGIN
+            {capture}
+        END
+    ''')
+    c.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_rates_ari_update
+        AFTER UPDATE ON rates
+        WHEN {changed}
+        BEGIN
+            {capture}
+        END
+    ''')
+
+
+def _add_rate_base(c):
+    """Migração 14: tarifa base preservada quando o RMS grava a tarifa otimizada"""
+    # NULL: a própria tarifa é a base (ainda não otimizada)
+    c.execute("ALTER TABLE rates ADD COLUMN base_rate DECIMAL(10, 2)")
+
+
+def _create_job_runs(c):
+    """Migração 15: agenda e histórico das rotinas em segundo plano"""
+    # Próxima execução e lease de cada rotina: só um processo a executa por vez
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS job_state (
+            job TEXT PRIMARY KEY,
+            next_run_at TIMESTAMP,
+            lease_owner TEXT,
+            lease_expires TIMESTAMP
+        ) WITHOUT ROWID
+    ''')
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS job_runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            job TEXT NOT NULL,
+            owner TEXT,
+            started_at TIMESTAMP NOT NULL,
+            duration_ms REAL,
+            status TEXT NOT NULL,
+            result TEXT,
+            error TEXT
+        )
+    ''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_job_runs_job ON job_runs (job, id)")
+
+
+def _create_loyalty_ledger(c):
+    """Migração 16: pontos de fidelidade creditados por reserva"""
+    # Uma linha por reserva: creditar de novo a mesma estadia não tem efeito
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS loyalty_ledger (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            reservation_id INTEGER NOT NULL UNIQUE,
+            guest_id INTEGER NOT NULL,
+            points INTEGER NOT NULL,
+            accrued_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (reservation_id) REFERENCES reservations (id),
+            FOREIGN KEY (guest_id) REFERENCES guests (id)
+        )
+    ''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_loyalty_ledger_guest ON loyalty_ledger (guest_id, points)")
+
+
+def _index_reservation_created_keyset(c):
+    """Migração 17: ordenação por criação sem NULL (o keyset por tupla não alcança NULL)"""
+    c.execute("DROP INDEX IF EXISTS idx_reservations_created")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_reservations_created ON reservations (COALESCE(created_at, ''))")
+
+
+# Migrações em ordem; a posição (1-based) é gravada em PRAGMA user_version
+MIGRATIONS = [
+    _create_base_schema,
+    _create_stay_index,
+    _create_daily_stats,
+    _create_unit_stay_index,
+    _create_data_versions,
+    _create_overbooking_guard,
+    _create_guest_search,
+    _create_reservation_list_indexes,
+    _create_housekeeping_planning,
+    _allow_reservation_upserts,
+    _create_demand_forecast,
+    _create_inventory,
+    _create_ari_changes,
+    _add_rate_base,
+    _create_job_runs,
+    _create_loyalty_ledger,
+    _index_reservation_created_keyset,
+]
+
+
+def init_schema(conn):
+    """Aplica as migrações pendentes e os dados iniciais numa conexão"""
+    c = conn.cursor()
+    c.execute("BEGIN IMMEDIATE")
+    try:
+        # Versão lida dentro da transação: outro processo pode ter migrado
+        current_version = c.execute("PRAGMA user_version").fetchone()[0]
+        for version, migration in enumerate(MIGRATIONS, start=1):
+            if version > current_version:
+                migration(c)
+        c.execute(f"PRAGMA user_version = {len(MIGRATIONS)}")
+        _seed_demo_data(c)
+        c.execute("COMMIT")
+    except Exception:
+        c.execute("ROLLBACK")
+        raise
+    return current_version
+
+
+def connect(path=DEFAULT_DB_PATH):
+    """Abre uma conexão configurada (autocommit, pragmas de desempenho)"""
+    conn = sqlite3.connect(
+        path,
+        timeout=30,
+        isolation_level=None,
+        check_same_thread=False,
+        factory=InstrumentedConnection,
+    )
+    for pragma, value in CONNECTION_PRAGMAS:
+        conn.execute(f"PRAGMA {pragma} = {value}")
+    return conn
+
+
+class ConnectionPool:
+    """Pool de conexões SQLite compartilhado por todas as sessões do processo"""
+
+    def __init__(self, path=DEFAULT_DB_PATH, size=POOL_SIZE):
+        self.path = path
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+        # Schema e migrações rodam uma única vez, na criação do pool
+        conn = connect(path)
+        init_schema(conn)
+        self._created = 1
+        self._idle.put(conn)
+
+    def acquire(self, timeout=30):
+        """Retira uma conexão do pool, abrindo uma nova se houver folga"""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                return connect(self.path)
+        try:
+            return self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError(
+                f"Nenhuma conexão livre em {timeout}s no pool de {self.path} ({self.size} conexões em uso)"
+            ) from None
+
+    def release(self, conn):
+        """Devolve uma conexão ao pool"""
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close_all(self):
+        """Fecha as conexões ociosas (usado em testes e no desligamento)"""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(path=DEFAULT_DB_PATH):
+    """Retorna o pool do banco, criando-o (e migrando o schema) na primeira chamada"""
+    pool = _pools.get(path)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(path)
+            if pool is None:
+                pool = ConnectionPool(path)
+                _pools[path] = pool
+    return pool
+
+
+@contextmanager
+def connection(path=DEFAULT_DB_PATH):
+    """Empresta uma conexão do pool para leituras ou escritas em autocommit"""
+    with get_pool(path).connection() as conn:
+        yield conn
+
+
+@contextmanager
+def transaction(path=DEFAULT_DB_PATH, immediate=False):
+    """Empresta uma conexão e envolve o bloco numa transação explícita"""
+    with get_pool(path).connection() as conn:
+        conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
@@ -0,0 +1,239 @@
+"""Gerador de bases sintéticas compatíveis com ``orion_pms.db``.
+
+Cria unidades, hóspedes, reservas de vários anos sem sobreposição (passadas,
+em casa e futuras), tarifas e tarefas de housekeeping numa escala
+configurável, para medir o comportamento do sistema em hotéis grandes.
+
+Uso: ``python -m orion.datagen destino.db --units 300 --years 3``
+"""
+import random
+from datetime import date, datetime, timedelta
+
+from orion import database
+
+UNIT_TYPES = {
+    # tipo: (proporção, capacidade, capacidade máxima, tarifa base, tempo de limpeza)
+    'Standard': (0.6, 2, 3, 250.00, 30),
+    'Luxo': (0.3, 2, 4, 450.00, 45),
+    'Suite': (0.1, 4, 6, 750.00, 60),
+}
+VIEW_TYPES = ['city', 'garden', 'ocean', 'pool']
+SOURCES = ['Direto', 'Telefone', 'Walk-in', 'Booking.com', 'Expedia', 'Airbnb']
+SOURCE_WEIGHTS = [20, 8, 4, 35, 20, 13]
+PAYMENT_METHODS = ['Cartão de crédito', 'PIX', 'Dinheiro', 'Faturado']
+NATIONALITIES = ['BR', 'AR', 'US', 'PT', 'UY', 'CL', 'DE', 'FR', 'IT', 'ES']
+NATIONALITY_WEIGHTS = [60, 10, 6, 5, 4, 4, 3, 3, 3, 2]
+FIRST_NAMES = [
+    'Ana', 'João', 'Maria', 'José', 'Francisco', 'Antônio', 'Carlos', 'Paulo', 'Pedro', 'Lucas',
+    'Luiz', 'Marcos', 'Gabriel', 'Rafael', 'Daniel', 'Marcelo', 'Bruno', 'Eduardo', 'Felipe', 'Rodrigo',
+    'Juliana', 'Fernanda', 'Patrícia', 'Aline', 'Camila', 'Letícia', 'Beatriz', 'Larissa', 'Mariana', 'Helena',
+]
+LAST_NAMES = [
+    'Silva', 'Santos', 'Oliveira', 'Souza', 'Rodrigues', 'Ferreira', 'Alves', 'Pereira', 'Lima', 'Gomes',
+    'Costa', 'Ribeiro', 'Martins', 'Carvalho', 'Almeida', 'Lopes', 'Soares', 'Fernandes', 'Vieira', 'Barbosa',
+    'Araújo', 'Conceição', 'Gonçalves', 'Müller', 'García', 'Smith', 'Rossi', 'Dubois', 'Schmidt', 'López',
+]
+SEASON_FACTORS = {12: 1.5, 1: 1.5, 2: 1.5, 6: 1.2, 7: 1.2, 11: 1.2}
+
+
+def _generate_units(rng, count):
+    units = []
+    names = list(UNIT_TYPES)
+    weights = [UNIT_TYPES[t][0] for t in names]
+    per_floor = 20
+    for i in range(count):
+        unit_type = rng.choices(names, weights)[0]
+        _, capacity, max_capacity, base_rate, cleaning_time = UNIT_TYPES[unit_type]
+        floor = i // per_floor + 1
+        code = f"{floor}{i % per_floor + 1:02d}"
+        status = 'maintenance' if rng.random() < 0.02 else 'available'
+        last_maintenance = date.today() - timedelta(days=rng.randint(10, 180))
+        units.append((
+            code, f"{unit_type} {code}", unit_type, floor, capacity, max_capacity,
+            round(base_rate * rng.uniform(0.9, 1.15), 2), status, 'WiFi, TV, Ar-condicionado',
+            rng.choice(VIEW_TYPES), cleaning_time, last_maintenance.isoformat(),
+            (last_maintenance + timedelta(days=180)).isoformat()
+        ))
+    return units
+
+
+def _generate_guests(rng, count):
+    guests = []
+    for i in range(count):
+        first_name = rng.choice(FIRST_NAMES)
+        last_name = rng.choice(LAST_NAMES)
+        guests.append((
+            first_name, last_name,
+            f"{first_name}.{last_name}{i}@example.com".lower(),
+            f"+55 {rng.randint(11, 99)} 9{rng.randint(1000, 9999)}-{rng.randint(1000, 9999)}",
+            'CPF', f"{i:011d}",
+            rng.choices(NATIONALITIES, NATIONALITY_WEIGHTS)[0],
+            (date(1950, 1, 1) + timedelta(days=rng.randint(0, 18000))).isoformat(),
+        ))
+    return guests
+
+
+def _nightly_rate(base_rate, day):
+    rate = base_rate * SEASON_FACTORS.get(day.month, 0.9)
+    if day.weekday() >= 5:
+        rate *= 1.25
+    return round(rate, 2)
+
+
+def _generate_reservations(rng, units, guest_count, start, end, today, occupancy):
+    """Estadias sem sobreposição por unidade, da data inicial até o fim do horizonte"""
+    mean_stay = 3
+    mean_gap = max(mean_stay * (1 - occupancy) / max(occupancy, 0.05), 0.2)
+    reservations = []
+    for unit_id, base_rate in units:
+        day = start + timedelta(days=rng.randint(0, 3))
+        while True:
+            nights = max(1, min(int(rng.expovariate(1 / mean_stay)) + 1, 21))
+            check_in, check_out = day, day + timedelta(days=nights)
+            if check_out > end:
+                break
+            lead_days = min(int(rng.expovariate(1 / 25)), 365)
+            created_at = datetime.combine(check_in - timedelta(days=lead_days), datetime.min.time()) \
+                + timedelta(minutes=rng.randint(0, 1439))
+            if created_at.date() > today:
+                # Reserva ainda não feita: fica fora da base
+                day = check_out + timedelta(days=int(rng.expovariate(1 / mean_gap)))
+                continue
+
+            if check_out <= today:
+                status = 'checked-out'
+            elif check_in <= today:
+                status = 'checked-in'
+            else:
+                status = 'confirmed'
+            rate = _nightly_rate(base_rate, check_in)
+            adults = rng.choices([1, 2, 3], [30, 60, 10])[0]
+            row = [
+                None, rng.randint(1, guest_count), unit_id,
+                check_in.isoformat(), check_out.isoformat(), adults, rng.choices([0, 1, 2], [75, 15, 10])[0],
+                status, rng.choices(SOURCES, SOURCE_WEIGHTS)[0], rate, round(rate * nights, 2),
+                'paid' if status == 'checked-out' else 'pending', rng.choice(PAYMENT_METHODS),
+                created_at.isoformat(sep=' ')
+            ]
+            reservations.append(tuple(row))
+
+            # Cancelamentos não bloqueiam a unidade e convivem com outras estadias
+            if rng.random() < 0.08:
+                row[7], row[11] = 'cancelled', 'refunded'
+                reservations.append(tuple(row))
+
+            day = check_out + timedelta(days=int(rng.expovariate(1 / mean_gap)))
+    rng.shuffle(reservations)
+    return [
+        (f"GEN-{i:08d}",) + row[1:] for i, row in enumerate(reservations, start=1)
+    ]
+
+
+def _generate_rates(today, days):
+    rates = []
+    for i in range(days):
+        day = today + timedelta(days=i)
+        for unit_type, (_, _, _, base_rate, _) in UNIT_TYPES.items():
+            rates.append((unit_type, day.isoformat(), _nightly_rate(base_rate, day), 1, 30, False, 0))
+    return rates
+
+
+def _generate_housekeeping(rng, units, today, days):
+    tasks = []
+    attendants = [f"Camareira {i}" for i in range(1, 11)]
+    for offset in range(days, 0, -1):
+        day = today - timedelta(days=offset)
+        for unit_id, cleaning_time in units:
+            if rng.random() < 0.35:
+                task_type = rng.choices(['checkout', 'stayover', 'inspection'], [50, 40, 10])[0]
+                estimated = cleaning_time if task_type == 'checkout' else cleaning_time // 2
+                created = datetime.combine(day, datetime.min.time()) + timedelta(hours=8)
+                tasks.append((
+                    unit_id, task_type, 'completed', rng.choice(attendants), estimated,
+                    max(5, int(rng.gauss(estimated, estimated * 0.2))), None,
+                    day.isoformat(), created.isoformat(sep=' '),
+                    (created + timedelta(hours=rng.uniform(0.5, 6))).isoformat(sep=' ', timespec='seconds')
+                ))
+    return tasks
+
+
+def generate_dataset(db_path, units=200, guests=20000, years=3, future_days=365, occupancy=0.7,
+                     rate_days=365, housekeeping_days=30, seed=42):
+    """Popula um banco novo (ou vazio de reservas) com dados sintéticos"""
+    rng = random.Random(seed)
+    today = date.today()
+    start = today - timedelta(days=int(365 * years))
+    end = today + timedelta(days=future_days)
+
+    with database.transaction(db_path, immediate=True) as conn:
+        # Substitui os dados de demonstração
+        for table in ('housekeeping', 'reservations', 'rates', 'guests', 'units'):
+            conn.execute(f"DELETE FROM {table}")
+
+        conn.executemany("""
+            INSERT INTO units
+            (code, name, type, floor, capacity, max_capacity, base_rate, status, amenities, view_type,
+             cleaning_time, last_maintenance, next_maintenance)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, _generate_units(rng, units))
+        unit_rows = conn.execute("SELECT id, base_rate, cleaning_time FROM units ORDER BY id").fetchall()
+
+        conn.executemany("""
+            INSERT INTO guests
+            (first_name, last_name, email, phone, document_type, document_number, nationality, date_of_birth)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, _generate_guests(rng, guests))
+
+        reservations = _generate_reservations(
+            rng, [(u[0], u[1]) for u in unit_rows], guests, start, end, today, occupancy
+        )
+        conn.executemany("""
+            INSERT INTO reservations
+            (confirmation_code, guest_id, unit_id, check_in, check_out, adults, children, status, source,
+             rate, total_amount, payment_status, payment_method, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, reservations)
+
+        # availability vem do inventário (trigger de rates)
+        conn.executemany("""
+            INSERT INTO rates (unit_type, date, rate, min_stay, max_stay, stop_sell, cutof_days)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, _generate_rates(today, rate_days))
+
+        conn.executemany("""
+            INSERT INTO housekeeping
+            (unit_id, task_type, status, assigned_to, estimated_time, actual_time, notes, task_date,
+             created_at, completed_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, _generate_housekeeping(rng, [(u[0], u[2]) for u in unit_rows], today, housekeeping_days))
+
+    with database.connection(db_path) as conn:
+        conn.execute("ANALYZE")
+        return {
+            table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in ('units', 'guests', 'reservations', 'rates', 'housekeeping')
+        }
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Gera uma base sintética do Orion PMS")
+    parser.add_argument("db_path")
+    parser.add_argument("--units", type=int, default=200)
+    parser.add_argument("--guests", type=int, default=20000)
+    parser.add_argument("--years", type=float, default=3)
+    parser.add_argument("--future-days", type=int, default=365)
+    parser.add_argument("--occupancy", type=float, default=0.7)
+    parser.add_argument("--rate-days", type=int, default=365)
+    parser.add_argument("--housekeeping-days", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    counts = generate_dataset(
+        args.db_path, units=args.units, guests=args.guests, years=args.years,
+        future_days=args.future_days, occupancy=args.occupancy, rate_days=args.rate_days,
+        housekeeping_days=args.housekeeping_days, seed=args.seed
+    )
+    print(json.dumps(counts, indent=2))
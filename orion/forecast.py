@@ -0,0 +1,266 @@
+"""Previsão de demanda por curvas de pickup.
+
+A partir do histórico de reservas (``created_at`` × noites da estadia)
+calcula-se, por tipo de unidade, dia da semana e antecedência, quantas
+unidades em média ainda são vendidas depois de faltarem ``L`` dias para a
+data (pickup aditivo). A previsão de cada data futura é o que já está
+vendido (``daily_stats``) mais o pickup esperado para a antecedência atual,
+limitado à capacidade do tipo.
+
+As curvas são recalculadas uma vez por dia (``pickup_curves``) e a previsão
+fica em ``demand_forecast``, atualizada fora da renderização pela rotina
+``forecast`` (:mod:`orion.jobs`); reservas novas só regravam as datas cujo
+resultado mudou.
+"""
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from orion import database
+from orion.cache import cached, get_data_versions
+
+HISTORY_DAYS = 730
+MAX_LEAD = 365
+DEFAULT_HORIZON = 365
+
+# Tabelas cujas mudanças invalidam a previsão
+SOURCE_TABLES = ('reservations', 'units', 'daily_stats')
+
+FORECAST_COLUMNS = [
+    'date', 'unit_type', 'lead_days', 'capacity', 'on_the_books', 'expected_rooms',
+    'expected_occupancy', 'otb_revenue', 'expected_revenue',
+]
+
+
+def _days(values):
+    """Datas ISO (texto) como datetime64[D]"""
+    return np.array(values, dtype='datetime64[D]')
+
+
+def _weekday(days):
+    """Dia da semana (segunda = 0) de um array datetime64[D]"""
+    return (days.astype('int64') + 3) % 7
+
+
+def _unit_capacity(conn):
+    return dict(conn.execute("SELECT type, COUNT(*) FROM units GROUP BY type ORDER BY type").fetchall())
+
+
+def build_pickup_curves(conn, today, history_days=HISTORY_DAYS):
+    """Curvas de pickup aditivo por (tipo, dia da semana, antecedência).
+
+    Retorna ``(unit_types, pickup, pickup_adr)``: ``pickup[t, dow, L]`` é a
+    média de unidades vendidas com antecedência menor que ``L`` dias e
+    ``pickup_adr`` a diária média dessas vendas.
+    """
+    history_start = today - timedelta(days=history_days)
+    unit_types = list(_unit_capacity(conn))
+    sold = ','.join('?' * len(database.SOLD_STATUSES))
+    rows = conn.execute(f"""
+        SELECT u.type, r.check_in, r.check_out, date(r.created_at), CAST(r.rate AS REAL)
+        FROM reservations r JOIN units u ON u.id = r.unit_id
+        WHERE r.status IN ({sold}) AND r.check_out > ? AND r.check_in < ?
+        AND r.created_at IS NOT NULL
+    """, (*database.SOLD_STATUSES, history_start.isoformat(), today.isoformat())).fetchall()
+
+    shape = (len(unit_types), 7, MAX_LEAD + 1)
+    if not rows or not unit_types:
+        return unit_types, np.zeros(shape), np.full(shape, np.nan)
+
+    types, check_in, check_out, created, rate = zip(*rows)
+    type_index = pd.Index(unit_types).get_indexer(types)
+    check_in, check_out, created = _days(check_in), _days(check_out), _days(created)
+    rate = np.array(rate, dtype=float)
+
+    # Expande cada estadia em noites (vetorizado)
+    nights = (check_out - check_in).astype('int64')
+    owner = np.repeat(np.arange(len(nights)), nights)
+    offsets = np.arange(len(owner)) - np.repeat(np.cumsum(nights) - nights, nights)
+    stay = check_in[owner] + offsets
+    keep = (stay >= np.datetime64(history_start)) & (stay < np.datetime64(today))
+    owner, stay = owner[keep], stay[keep]
+
+    lead = np.clip((stay - created[owner]).astype('int64'), 0, MAX_LEAD)
+    flat = np.ravel_multi_index((type_index[owner], _weekday(stay), lead), shape)
+    size = int(np.prod(shape))
+    counts = np.bincount(flat, minlength=size).reshape(shape).astype(float)
+    revenue = np.bincount(flat, weights=rate[owner], minlength=size).reshape(shape)
+
+    # Pickup(L): vendas com antecedência < L, na média das datas do histórico
+    history = np.arange(np.datetime64(history_start), np.datetime64(today), dtype='datetime64[D]')
+    dates_per_dow = np.bincount(_weekday(history), minlength=7).astype(float)
+    sold_before = np.concatenate([np.zeros(shape[:2] + (1,)), np.cumsum(counts, axis=2)[:, :, :-1]], axis=2)
+    revenue_before = np.concatenate([np.zeros(shape[:2] + (1,)), np.cumsum(revenue, axis=2)[:, :, :-1]], axis=2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pickup = np.nan_to_num(sold_before / dates_per_dow[None, :, None])
+        pickup_adr = revenue_before / sold_before
+    return unit_types, pickup, pickup_adr
+
+
+def _store_curves(conn, unit_types, pickup, pickup_adr):
+    conn.execute("DELETE FROM pickup_curves")
+    t, dow, lead = np.indices(pickup.shape).reshape(3, -1)
+    adr = pickup_adr.ravel()
+    conn.executemany(
+        "INSERT INTO pickup_curves (unit_type, dow, lead_days, pickup, pickup_adr) VALUES (?, ?, ?, ?, ?)",
+        zip(
+            np.array(unit_types, dtype=object)[t], dow.tolist(), lead.tolist(), pickup.ravel().tolist(),
+            [None if np.isnan(value) else value for value in adr.tolist()]
+        )
+    )
+
+
+def _load_curves(conn, unit_types):
+    curves = pd.read_sql_query("SELECT * FROM pickup_curves", conn)
+    shape = (len(unit_types), 7, MAX_LEAD + 1)
+    pickup, pickup_adr = np.zeros(shape), np.full(shape, np.nan)
+    t = pd.Index(unit_types).get_indexer(curves['unit_type'])
+    known = t >= 0
+    index = (t[known], curves['dow'].to_numpy()[known], curves['lead_days'].to_numpy()[known])
+    pickup[index] = curves['pickup'].to_numpy()[known]
+    pickup_adr[index] = curves['pickup_adr'].to_numpy(dtype=float)[known]
+    return pickup, pickup_adr
+
+
+def compute_forecast(conn, today, horizon, unit_types, pickup, pickup_adr):
+    """Previsão (DataFrame) para ``horizon`` dias a partir de ``today``"""
+    capacity = _unit_capacity(conn)
+    dates = np.arange(np.datetime64(today), np.datetime64(today + timedelta(days=horizon)), dtype='datetime64[D]')
+    grid = pd.MultiIndex.from_product([dates, unit_types], names=['date', 'unit_type']).to_frame(index=False)
+
+    otb = pd.read_sql_query("""
+        SELECT stat_date AS date, unit_type, rooms_sold AS on_the_books, revenue AS otb_revenue
+        FROM daily_stats WHERE stat_date >= ? AND stat_date < ?
+    """, conn, params=(today.isoformat(), (today + timedelta(days=horizon)).isoformat()), parse_dates=['date'])
+    grid = grid.merge(otb, on=['date', 'unit_type'], how='left')
+    grid[['on_the_books', 'otb_revenue']] = grid[['on_the_books', 'otb_revenue']].astype(float).fillna(0)
+
+    day = grid['date'].to_numpy().astype('datetime64[D]')
+    lead = (day - np.datetime64(today)).astype('int64')
+    index = (pd.Index(unit_types).get_indexer(grid['unit_type']), _weekday(day), np.minimum(lead, MAX_LEAD))
+
+    grid['lead_days'] = lead
+    grid['capacity'] = grid['unit_type'].map(capacity).fillna(0).astype(int)
+    expected = np.minimum(grid['on_the_books'].to_numpy() + pickup[index], grid['capacity'].to_numpy())
+    grid['expected_rooms'] = np.maximum(expected, grid['on_the_books'].to_numpy()).round(2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        grid['expected_occupancy'] = np.nan_to_num(grid['expected_rooms'] / grid['capacity']).round(4)
+
+    # Receita do pickup pela diária histórica dessas vendas (ou a média do tipo)
+    adr = pd.Series(pickup_adr[index])
+    type_adr = grid.groupby('unit_type')['otb_revenue'].transform('sum') / \
+        grid.groupby('unit_type')['on_the_books'].transform('sum')
+    adr = adr.fillna(type_adr).fillna(0)
+    picked_up = grid['expected_rooms'] - grid['on_the_books']
+    grid['expected_revenue'] = (grid['otb_revenue'] + picked_up * adr).round(2)
+    grid['otb_revenue'] = grid['otb_revenue'].round(2)
+    grid['on_the_books'] = grid['on_the_books'].astype(int)
+    return grid[FORECAST_COLUMNS]
+
+
+def _source_version(versions, today, horizon):
+    return f"{today.isoformat()}:{horizon}:" + ':'.join(str(versions.get(table, 0)) for table in SOURCE_TABLES)
+
+
+def refresh_forecast(today=None, horizon=DEFAULT_HORIZON, force=False, db_path=database.DEFAULT_DB_PATH):
+    """Atualiza ``demand_forecast`` se reservas, unidades ou o dia mudaram.
+
+    As curvas só são recalculadas uma vez por dia; as datas cuja previsão não
+    mudou não são regravadas. Retorna o número de linhas gravadas.
+    """
+    today = today or date.today()
+    source_version = _source_version(get_data_versions(db_path), today, horizon)
+    with database.connection(db_path) as conn:
+        state = conn.execute("SELECT curve_date, source_version FROM forecast_state WHERE id = 1").fetchone()
+    if not force and state and state[1] == source_version:
+        return 0
+
+    with database.transaction(db_path, immediate=True) as conn:
+        versions = dict(conn.execute("SELECT table_name, version FROM data_versions").fetchall())
+        source_version = _source_version(versions, today, horizon)
+        curve_date, current_version = conn.execute(
+            "SELECT curve_date, source_version FROM forecast_state WHERE id = 1"
+        ).fetchone()
+        if not force and current_version == source_version:
+            return 0
+
+        if force or curve_date != today.isoformat():
+            unit_types, pickup, pickup_adr = build_pickup_curves(conn, today)
+            _store_curves(conn, unit_types, pickup, pickup_adr)
+        else:
+            unit_types = list(_unit_capacity(conn))
+            pickup, pickup_adr = _load_curves(conn, unit_types)
+
+        forecast = compute_forecast(conn, today, horizon, unit_types, pickup, pickup_adr)
+        forecast['date'] = forecast['date'].dt.strftime('%Y-%m-%d')
+
+        # Grava só as datas cuja previsão mudou
+        stored = pd.read_sql_query(
+            "SELECT * FROM demand_forecast WHERE forecast_date >= ?", conn, params=(today.isoformat(),)
+        ).rename(columns={'forecast_date': 'date'})
+        merged = forecast.merge(stored, on=['date', 'unit_type'], how='left', suffixes=('', '_stored'))
+        changed = np.zeros(len(merged), dtype=bool)
+        for column in FORECAST_COLUMNS[2:]:
+            changed |= ~np.isclose(merged[column].astype(float), merged[f"{column}_stored"].astype(float))
+        rows = forecast[changed]
+
+        conn.execute("DELETE FROM demand_forecast WHERE forecast_date < ? OR forecast_date >= ?",
+                     (today.isoformat(), (today + timedelta(days=horizon)).isoformat()))
+        conn.executemany(f"""
+            INSERT OR REPLACE INTO demand_forecast
+            (forecast_date, {', '.join(FORECAST_COLUMNS[1:])})
+            VALUES ({', '.join('?' * len(FORECAST_COLUMNS))})
+        """, rows.itertuples(index=False, name=None))
+        conn.execute("""
+            UPDATE forecast_state SET curve_date = ?, source_version = ?, refreshed_at = CURRENT_TIMESTAMP
+            WHERE id = 1
+        """, (today.isoformat(), source_version))
+        if len(rows):
+            database.bump_data_version(conn, 'demand_forecast')
+    return len(rows)
+
+
+@cached('demand_forecast')
+def _load_forecast(start, end, unit_types=None, db_path=database.DEFAULT_DB_PATH):
+    query = f"""
+        SELECT forecast_date AS date, {', '.join(FORECAST_COLUMNS[1:])}
+        FROM demand_forecast WHERE forecast_date >= ? AND forecast_date < ?
+    """
+    params = [start.isoformat(), end.isoformat()]
+    if unit_types is not None:
+        unit_types = list(unit_types)
+        query += f" AND unit_type IN ({','.join('?' * len(unit_types))})"
+        params.extend(unit_types)
+    with database.connection(db_path) as conn:
+        return pd.read_sql_query(query + " ORDER BY date, unit_type", conn, params=params, parse_dates=['date'])
+
+
+@cached(*SOURCE_TABLES)
+def _compute_forecast(start, end, unit_types=None, db_path=database.DEFAULT_DB_PATH):
+    """Previsão calculada em memória, sem gravar (banco ainda sem previsão)"""
+    today = date.today()
+    with database.connection(db_path) as conn:
+        types, pickup, pickup_adr = build_pickup_curves(conn, today)
+        forecast = compute_forecast(conn, today, (end - today).days, types, pickup, pickup_adr)
+    forecast['date'] = forecast['date'].astype('datetime64[ns]')
+    forecast = forecast[forecast['date'] >= pd.Timestamp(start)]
+    if unit_types is not None:
+        forecast = forecast[forecast['unit_type'].isin(list(unit_types))]
+    return forecast.reset_index(drop=True)
+
+
+def get_forecast(start, days, unit_types=None, db_path=database.DEFAULT_DB_PATH):
+    """Previsão de demanda por data e tipo, lida de ``demand_forecast``.
+
+    Só lê: a tabela é atualizada pela rotina ``forecast`` (``python -m
+    orion.jobs run --job forecast``). Sem previsão gravada para o período, ela
+    é calculada em memória. Datas anteriores a hoje não têm previsão e ficam
+    de fora.
+    """
+    today = date.today()
+    start, end = max(start, today), start + timedelta(days=days)
+    forecast = _load_forecast(start, end, unit_types, db_path)
+    if forecast.empty and end > start:
+        forecast = _compute_forecast(start, end, unit_types, db_path)
+    return forecast
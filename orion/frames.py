@@ -0,0 +1,80 @@
+"""Tipos compactos para os DataFrames lidos do banco.
+
+Colunas de texto com poucos valores distintos (status, tipo, origem...)
+viram ``category`` - um código inteiro por linha e cada texto guardado uma
+única vez -, contagens pequenas usam inteiros de 8/16 bits (aceitando
+nulos) quando todos os valores cabem no tipo e datas são convertidas uma
+vez, na leitura. O tipo é escolhido pelo
+nome da coluna, então todas as consultas compartilham o mesmo vocabulário.
+Valores monetários continuam em ``float64``: somas em relatórios não podem
+perder centavos.
+"""
+import numpy as np
+import pandas as pd
+
+CATEGORY_COLUMNS = frozenset({
+    'status', 'type', 'unit_type', 'source', 'payment_status', 'payment_method', 'view_type',
+    'task_type', 'nationality', 'loyalty_tier', 'currency', 'assigned_to',
+})
+
+INTEGER_COLUMNS = {
+    'id': 'Int32',
+    'adults': 'Int8',
+    'children': 'Int8',
+    'capacity': 'Int8',
+    'max_capacity': 'Int8',
+    'priority': 'Int8',
+    'floor': 'Int16',
+    'nights': 'Int16',
+    'cleaning_time': 'Int16',
+    'estimated_time': 'Int16',
+}
+
+
+def _downcast(series, dtype):
+    """Série no tipo inteiro menor, ou inalterada se algum valor não couber nele"""
+    target = pd.api.types.pandas_dtype(dtype)
+    if not pd.api.types.is_numeric_dtype(series):
+        return series
+    limits = np.iinfo(target.numpy_dtype)
+    low, high = series.min(), series.max()
+    if pd.notna(low) and (low < limits.min or high > limits.max):
+        return series
+    try:
+        return series.astype(target)
+    except (TypeError, ValueError):  # valores fracionários
+        return series
+
+
+def compact(frame):
+    """Converte as colunas conhecidas no próprio DataFrame (sem copiar as demais)"""
+    for column in frame.columns:
+        if column in CATEGORY_COLUMNS and frame[column].dtype == object:
+            frame[column] = frame[column].astype('category')
+        elif column in INTEGER_COLUMNS:
+            frame[column] = _downcast(frame[column], INTEGER_COLUMNS[column])
+    return frame
+
+
+def _parse_dates(frame, dates):
+    for column in dates:
+        frame[column] = pd.to_datetime(frame[column], format='ISO8601')
+
+
+def read_frame(conn, query, params=None, dates=(), index_col=None):
+    """``read_sql_query`` com datas convertidas e tipos compactos"""
+    frame = pd.read_sql_query(query, conn, params=params, index_col=index_col)
+    _parse_dates(frame, dates)
+    return compact(frame)
+
+
+def from_rows(rows, columns, dates=()):
+    """DataFrame compacto a partir de linhas já lidas do cursor"""
+    frame = pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+    _parse_dates(frame, dates)
+    return compact(frame)
+
+
+def memory_usage(frame):
+    """Bytes ocupados pelo DataFrame, incluindo os textos"""
+    return int(frame.memory_usage(deep=True, index=True).sum())
@@ -0,0 +1,82 @@
+"""Busca e consulta de hóspedes.
+
+A busca usa o índice FTS5 ``guests_fts`` (mantido por triggers): cada termo
+digitado vira uma consulta de prefixo, sem distinção de acentos ou
+maiúsculas, sobre nome, sobrenome, e-mail, telefone e documento.
+"""
+import re
+
+import pandas as pd
+
+from orion import database, frames
+from orion.cache import cached
+
+MIN_QUERY_LENGTH = 2
+DEFAULT_LIMIT = 20
+
+# Termos formados só por dígitos e pontuação de telefone/documento
+_NUMERIC_TERM = re.compile(r"^[\d\s().+/-]+$")
+
+
+def build_match_query(text):
+    """Converte o texto digitado numa expressão MATCH de prefixos (None se vazio)"""
+    terms = []
+    digits = None
+    for term in text.split():
+        if _NUMERIC_TERM.match(term):
+            # O índice guarda telefone e documento apenas com dígitos: trechos
+            # numéricos seguidos ("+55 11 9...") formam um único termo
+            digits = (digits or "") + re.sub(r"\D", "", term)
+            continue
+        if digits:
+            terms.append(digits)
+        digits = None
+        terms.append(term)
+    if digits:
+        terms.append(digits)
+    return " AND ".join('"' + term.replace('"', '""') + '"*' for term in terms) or None
+
+
+@cached('guests')
+def search_guests(text, limit=DEFAULT_LIMIT, db_path=database.DEFAULT_DB_PATH):
+    """Hóspedes que casam com todos os termos, mais relevantes primeiro"""
+    columns = ['id', 'first_name', 'last_name', 'email', 'phone', 'document_number',
+               'nationality', 'loyalty_tier']
+    query = build_match_query(text or "")
+    if query is None or len(text.strip()) < MIN_QUERY_LENGTH:
+        return pd.DataFrame(columns=columns)
+
+    with database.connection(db_path) as conn:
+        return frames.read_frame(conn, f"""
+            SELECT {', '.join('g.' + column for column in columns)}
+            FROM guests_fts
+            JOIN guests g ON g.id = guests_fts.rowid
+            WHERE guests_fts MATCH ?
+            ORDER BY bm25(guests_fts, 10.0, 10.0, 5.0, 3.0, 3.0)
+            LIMIT ?
+        """, (query, limit))
+
+
+@cached('guests')
+def get_guest(guest_id, db_path=database.DEFAULT_DB_PATH):
+    """Cadastro completo do hóspede (dict) ou None"""
+    with database.connection(db_path) as conn:
+        cur = conn.execute("SELECT * FROM guests WHERE id = ?", (guest_id,))
+        row = cur.fetchone()
+        if row is None:
+            return None
+        return dict(zip([d[0] for d in cur.description], row))
+
+
+@cached('reservations', 'units')
+def get_guest_stays(guest_id, db_path=database.DEFAULT_DB_PATH):
+    """Histórico de reservas do hóspede, mais recentes primeiro"""
+    with database.connection(db_path) as conn:
+        return frames.read_frame(conn, """
+            SELECT r.confirmation_code, u.code AS unit_code, u.type AS unit_type,
+                   r.check_in, r.check_out, r.status, r.total_amount
+            FROM reservations r
+            LEFT JOIN units u ON u.id = r.unit_id
+            WHERE r.guest_id = ?
+            ORDER BY r.check_in DESC
+        """, (guest_id,), dates=('check_in', 'check_out'))
@@ -0,0 +1,167 @@
+"""Geração e escalonamento das tarefas diárias de housekeeping.
+
+As tarefas do dia (saídas, estadias em andamento e manutenção) são criadas
+num único ``INSERT ... SELECT``, sem duplicar as já existentes; uma unidade
+com manutenção em aberto não ganha outra até a conclusão, que agenda a
+próxima. O escalonador distribui as tarefas pendentes entre as camareiras
+com uma fila de prioridade pelo horário em que cada uma fica livre:
+unidades com chegada no dia vêm primeiro e, dentro de cada prioridade, as
+tarefas mais longas primeiro (LPT), o que mantém o fim do turno (makespan)
+próximo do ótimo.
+"""
+import heapq
+from datetime import datetime, time, timedelta
+
+import pandas as pd
+
+from orion import database, frames
+from orion.cache import cached
+
+# Status de reserva que geram limpeza de saída / arrumação de estadia
+DEPARTURE_STATUSES = ('confirmed', 'checked-in', 'checked-out')
+STAYOVER_STATUSES = database.BLOCKING_STATUSES
+
+MAINTENANCE_MINUTES = 60
+MAINTENANCE_INTERVAL_DAYS = 180
+STAYOVER_FACTOR = 0.5
+MIN_TASK_MINUTES = 10
+DEFAULT_SHIFT_START = time(8, 0)
+
+# Prioridades: unidade com chegada no dia precisa estar pronta antes
+PRIORITY_ARRIVAL = 1
+PRIORITY_NORMAL = 0
+
+
+def default_attendants(count):
+    return [f"Camareira {i}" for i in range(1, count + 1)]
+
+
+def generate_tasks(day, db_path=database.DEFAULT_DB_PATH):
+    """Cria as tarefas do dia que ainda não existem; retorna quantas foram criadas"""
+    departures = ','.join('?' * len(DEPARTURE_STATUSES))
+    stayovers = ','.join('?' * len(STAYOVER_STATUSES))
+    day_iso = day.isoformat()
+    with database.transaction(db_path, immediate=True) as conn:
+        cur = conn.execute(f"""
+            INSERT INTO housekeeping (unit_id, task_type, status, estimated_time, task_date, priority, notes)
+            WITH candidates (unit_id, task_type, estimated_time) AS (
+                SELECT r.unit_id, 'checkout', u.cleaning_time
+                FROM reservations r JOIN units u ON u.id = r.unit_id
+                WHERE r.check_out = ? AND r.status IN ({departures})
+                UNION
+                SELECT r.unit_id, 'stayover', MAX(CAST(u.cleaning_time * ? AS INTEGER), ?)
+                FROM reservations r JOIN units u ON u.id = r.unit_id
+                WHERE r.check_in < ? AND r.check_out > ? AND r.status IN ({stayovers})
+                UNION
+                SELECT id, 'maintenance', ?
+                FROM units
+                WHERE (status = 'maintenance' OR next_maintenance <= ?)
+                AND NOT EXISTS (
+                    SELECT 1 FROM housekeeping h
+                    WHERE h.unit_id = units.id AND h.task_type = 'maintenance' AND h.status != 'completed'
+                )
+            ),
+            arrivals AS (
+                SELECT DISTINCT unit_id FROM reservations
+                WHERE check_in = ? AND status IN ({stayovers})
+            )
+            SELECT c.unit_id, c.task_type, 'pending', c.estimated_time, ?,
+                   CASE WHEN a.unit_id IS NULL THEN ? ELSE ? END,
+                   CASE WHEN a.unit_id IS NULL THEN NULL ELSE 'Chegada hoje' END
+            FROM candidates c
+            LEFT JOIN arrivals a ON a.unit_id = c.unit_id
+            WHERE NOT EXISTS (
+                SELECT 1 FROM housekeeping h
+                WHERE h.task_date = ? AND h.unit_id = c.unit_id AND h.task_type = c.task_type
+            )
+        """, (
+            day_iso, *DEPARTURE_STATUSES,
+            STAYOVER_FACTOR, MIN_TASK_MINUTES, day_iso, day_iso, *STAYOVER_STATUSES,
+            MAINTENANCE_MINUTES, day_iso,
+            day_iso, *STAYOVER_STATUSES,
+            day_iso, PRIORITY_NORMAL, PRIORITY_ARRIVAL,
+            day_iso,
+        ))
+    return cur.rowcount
+
+
+def schedule_tasks(tasks, attendants):
+    """Distribui tarefas entre camareiras minimizando o fim do turno.
+
+    ``tasks`` é uma sequência de dicts com ``id``, ``estimated_time`` (min) e
+    ``priority``. Retorna {id: (camareira, início, fim)} em minutos desde o
+    início do turno.
+    """
+    if not attendants:
+        raise ValueError("Informe ao menos uma camareira")
+    order = sorted(tasks, key=lambda task: (-task['priority'], -(task['estimated_time'] or 0), task['id']))
+    # (minuto em que fica livre, posição, nome): empate resolvido pela ordem da equipe
+    free_at = [(0, position, name) for position, name in enumerate(attendants)]
+    heapq.heapify(free_at)
+    plan = {}
+    for task in order:
+        start, position, name = heapq.heappop(free_at)
+        end = start + (task['estimated_time'] or MIN_TASK_MINUTES)
+        plan[task['id']] = (name, start, end)
+        heapq.heappush(free_at, (end, position, name))
+    return plan
+
+
+def plan_day(day, attendants, shift_start=DEFAULT_SHIFT_START, db_path=database.DEFAULT_DB_PATH):
+    """Gera as tarefas do dia e (re)distribui as pendentes entre a equipe"""
+    generate_tasks(day, db_path)
+    shift = datetime.combine(day, shift_start)
+    with database.transaction(db_path, immediate=True) as conn:
+        cur = conn.execute("""
+            SELECT id, estimated_time, priority FROM housekeeping
+            WHERE task_date = ? AND status = 'pending'
+        """, (day.isoformat(),))
+        tasks = [dict(zip(('id', 'estimated_time', 'priority'), row)) for row in cur.fetchall()]
+        plan = schedule_tasks(tasks, attendants)
+        conn.executemany(
+            "UPDATE housekeeping SET assigned_to = ?, scheduled_start = ? WHERE id = ?",
+            [
+                (name, (shift + timedelta(minutes=start)).isoformat(sep=' '), task_id)
+                for task_id, (name, start, _) in plan.items()
+            ]
+        )
+    return get_day_tasks(day, db_path=db_path)
+
+
+@cached('housekeeping', 'units')
+def get_day_tasks(day, db_path=database.DEFAULT_DB_PATH):
+    """Tarefas do dia com unidade, responsável e horário planejado"""
+    with database.connection(db_path) as conn:
+        tasks = frames.read_frame(conn, """
+            SELECT h.id, u.code AS unit_code, u.floor, h.task_type, h.status, h.priority,
+                   h.assigned_to, h.estimated_time, h.scheduled_start, h.notes
+            FROM housekeeping h
+            JOIN units u ON u.id = h.unit_id
+            WHERE h.task_date = ?
+            ORDER BY h.assigned_to, h.scheduled_start, u.code
+        """, (day.isoformat(),), dates=('scheduled_start',))
+    tasks['scheduled_end'] = tasks['scheduled_start'] + pd.to_timedelta(tasks['estimated_time'], unit='m')
+    return tasks
+
+
+def complete_task(task_id, actual_time=None, db_path=database.DEFAULT_DB_PATH):
+    """Marca uma tarefa como concluída.
+
+    Concluir uma manutenção devolve a unidade ao serviço e agenda a próxima
+    para daqui a ``MAINTENANCE_INTERVAL_DAYS`` dias.
+    """
+    with database.transaction(db_path) as conn:
+        cur = conn.execute("""
+            UPDATE housekeeping SET status = 'completed', actual_time = ?, completed_at = CURRENT_TIMESTAMP
+            WHERE id = ? AND status != 'completed'
+        """, (actual_time, task_id))
+        if cur.rowcount == 0:
+            return False
+        conn.execute("""
+            UPDATE units SET
+                last_maintenance = DATE('now', 'localtime'),
+                next_maintenance = DATE('now', 'localtime', ?),
+                status = CASE WHEN status = 'maintenance' THEN 'available' ELSE status END
+            WHERE id = (SELECT unit_id FROM housekeeping WHERE id = ? AND task_type = 'maintenance')
+        """, (f"+{MAINTENANCE_INTERVAL_DAYS} days", task_id))
+    return True
@@ -0,0 +1,243 @@
+"""Instrumentação de renderização, consultas SQL e construção de gráficos.
+
+Eventos medidos (``render``, ``sql``, ``figure``) são anexados à coleta ativa
+no contexto atual - normalmente a renderização de um módulo - para o painel
+da barra lateral. Operações acima de ``SLOW_THRESHOLD_MS`` também entram no
+log rotativo de lentidão, compartilhado pelo processo, que pode ser exportado
+em CSV e, opcionalmente, gravado em arquivo (``ORION_SLOW_LOG``).
+"""
+import contextvars
+import csv
+import functools
+import io
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+ENABLED = os.environ.get("ORION_INSTRUMENTATION", "1") != "0"
+SLOW_THRESHOLD_MS = float(os.environ.get("ORION_SLOW_MS", "200"))
+SLOW_LOG_SIZE = 500
+MAX_SQL_LENGTH = 400
+
+EVENT_FIELDS = ['timestamp', 'kind', 'name', 'duration_ms', 'rows', 'params', 'context']
+
+logger = logging.getLogger("orion.slow")
+if os.environ.get("ORION_SLOW_LOG"):
+    _handler = RotatingFileHandler(os.environ["ORION_SLOW_LOG"], maxBytes=5_000_000, backupCount=3)
+    _handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+
+_slow_log = deque(maxlen=SLOW_LOG_SIZE)
+_slow_lock = threading.Lock()
+_current = contextvars.ContextVar("orion_collector", default=None)
+
+
+class Collector:
+    """Eventos medidos durante uma renderização"""
+
+    def __init__(self, name, parent=None):
+        self.name = name
+        self.parent = parent
+        self.events = []
+        self.started = time.perf_counter()
+        self.duration_ms = None
+
+    def totals(self):
+        """Tempo total e quantidade de eventos por tipo"""
+        totals = {}
+        for event in self.events:
+            kind = totals.setdefault(event['kind'], {'count': 0, 'duration_ms': 0.0})
+            kind['count'] += 1
+            kind['duration_ms'] += event['duration_ms']
+        return totals
+
+
+def record(kind, name, duration_ms, rows=None, params=None):
+    """Registra um evento medido na coleta atual e, se lento, no log de lentidão"""
+    collector = _current.get()
+    event = {
+        'timestamp': datetime.now().isoformat(timespec='milliseconds'),
+        'kind': kind,
+        'name': name,
+        'duration_ms': round(duration_ms, 3),
+        'rows': rows,
+        'params': params,
+        'context': collector.name if collector else None,
+    }
+    # Coletas aninhadas (ex.: fragmentos do dashboard) também somam na coleta externa
+    target = collector
+    while target is not None:
+        target.events.append(event)
+        target = target.parent
+    if duration_ms >= SLOW_THRESHOLD_MS:
+        with _slow_lock:
+            _slow_log.append(event)
+        logger.info("%s %.1fms %s rows=%s params=%s context=%s",
+                    kind, duration_ms, name, rows, params, event['context'])
+    return event
+
+
+@contextmanager
+def collect(name):
+    """Ativa uma coleta (ex.: renderização de um módulo) no contexto atual"""
+    collector = Collector(name, parent=_current.get())
+    token = _current.set(collector)
+    try:
+        yield collector
+    finally:
+        _current.reset(token)
+        collector.duration_ms = (time.perf_counter() - collector.started) * 1000
+        if ENABLED:
+            record('render', name, collector.duration_ms)
+
+
+@contextmanager
+def measure(kind, name):
+    """Mede um bloco de código"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if ENABLED:
+            record(kind, name, (time.perf_counter() - started) * 1000)
+
+
+def timed(kind, name=None):
+    """Decorador equivalente a :func:`measure` para funções"""
+    def decorator(func):
+        label = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with measure(kind, label):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def slow_operations():
+    """Cópia do log de lentidão, mais recentes primeiro"""
+    with _slow_lock:
+        return list(reversed(_slow_log))
+
+
+def export_csv(events):
+    """Eventos em CSV (para download)"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EVENT_FIELDS)
+    writer.writeheader()
+    writer.writerows(events)
+    return buffer.getvalue()
+
+
+def _normalize_sql(sql):
+    sql = re.sub(r"\s+", " ", sql).strip()
+    return sql if len(sql) <= MAX_SQL_LENGTH else sql[:MAX_SQL_LENGTH] + "…"
+
+
+def _params_shape(parameters, many=False):
+    """Formato dos parâmetros (quantidade/tipos), sem registrar valores"""
+    if many:
+        try:
+            count = len(parameters)
+        except TypeError:
+            return "executemany[stream]"
+        first = parameters[0] if count else ()
+        return f"executemany[{count}×{len(first)}]"
+    if isinstance(parameters, dict):
+        return f"dict[{len(parameters)}]"
+    return f"{type(parameters).__name__}[{len(parameters)}]"
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor que mede execução e leitura de cada consulta"""
+
+    _event = None
+
+    def execute(self, sql, parameters=()):
+        self._finish()
+        if not ENABLED:
+            return super().execute(sql, parameters)
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._event = [sql, _params_shape(parameters), time.perf_counter() - started, 0]
+
+    def executemany(self, sql, seq_of_parameters):
+        self._finish()
+        if not ENABLED:
+            return super().executemany(sql, seq_of_parameters)
+        shape = _params_shape(seq_of_parameters, many=True)
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._event = [sql, shape, time.perf_counter() - started, 0]
+            self._finish()
+
+    def _fetch(self, method, *args):
+        if self._event is None:
+            return method(*args)
+        started = time.perf_counter()
+        result = method(*args)
+        self._event[2] += time.perf_counter() - started
+        return result
+
+    def fetchone(self):
+        row = self._fetch(super().fetchone)
+        if self._event is not None:
+            if row is None:
+                self._finish()
+            else:
+                self._event[3] += 1
+        return row
+
+    def fetchmany(self, size=None):
+        rows = self._fetch(super().fetchmany, size or self.arraysize)
+        if self._event is not None:
+            self._event[3] += len(rows)
+            if len(rows) < (size or self.arraysize):
+                self._finish()
+        return rows
+
+    def fetchall(self):
+        rows = self._fetch(super().fetchall)
+        if self._event is not None:
+            self._event[3] += len(rows)
+            self._finish()
+        return rows
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        self._finish()
+
+    def _finish(self):
+        event, self._event = self._event, None
+        if event is not None:
+            sql, params, seconds, rows = event
+            record('sql', _normalize_sql(sql), seconds * 1000, rows=rows, params=params)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Conexão cujos cursores (inclusive os atalhos execute*) são instrumentados"""
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
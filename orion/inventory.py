@@ -0,0 +1,146 @@
+"""Inventário por data e tipo de unidade.
+
+A tabela ``inventory`` guarda, para cada noite e tipo, o total de unidades,
+as fora de serviço, as vendidas e a disponibilidade resultante. É mantida
+por triggers na mesma transação das escritas em ``reservations``, ``units``
+e ``rates`` (ver :func:`orion.database._create_inventory`), de modo que ler
+a ocupação de uma data é uma busca pela chave primária, sem varrer reservas.
+``rates.availability`` acompanha a disponibilidade do inventário.
+
+``verify`` aponta divergências contra um recálculo completo e ``rebuild``
+as corrige::
+
+    python -m orion.inventory verify
+    python -m orion.inventory rebuild
+"""
+from datetime import date
+
+import pandas as pd
+
+from orion import database
+from orion.cache import cached
+
+INVENTORY_COLUMNS = ['date', 'unit_type', 'total_rooms', 'out_of_order', 'rooms_sold', 'available', 'occupancy']
+
+
+def _capacity(conn, unit_types=None):
+    """Capacidade atual por tipo, usada nas datas ainda sem linha no inventário"""
+    query = f"""
+        SELECT type AS unit_type, COUNT(*) AS total_rooms,
+               SUM(status IN ({','.join('?' * len(database.OUT_OF_SERVICE_STATUSES))})) AS out_of_order
+        FROM units
+    """
+    params = list(database.OUT_OF_SERVICE_STATUSES)
+    if unit_types is not None:
+        query += f" WHERE type IN ({','.join('?' * len(unit_types))})"
+        params.extend(unit_types)
+    return pd.read_sql_query(query + " GROUP BY type ORDER BY type", conn, params=params)
+
+
+def _occupancy(sold, total, out_of_order):
+    """Vendidas sobre as unidades em serviço (0-1)"""
+    sellable = total - out_of_order
+    return (sold / sellable.where(sellable > 0)).fillna(0.0).round(4)
+
+
+@cached('reservations', 'units', 'rates', 'inventory')
+def get_inventory(start, end, unit_types=None, db_path=database.DEFAULT_DB_PATH):
+    """Inventário de cada noite de ``start`` até ``end`` (exclusive) e tipo"""
+    with database.connection(db_path) as conn:
+        capacity = _capacity(conn, None if unit_types is None else list(unit_types))
+        stored = pd.read_sql_query("""
+            SELECT inv_date AS date, unit_type, total_rooms, out_of_order, rooms_sold
+            FROM inventory WHERE inv_date >= ? AND inv_date < ?
+        """, conn, params=(start.isoformat(), end.isoformat()), parse_dates=['date'])
+
+    grid = pd.MultiIndex.from_product(
+        [pd.date_range(start, end, inclusive='left'), capacity['unit_type']], names=['date', 'unit_type']
+    ).to_frame(index=False)
+    grid = grid.merge(stored, on=['date', 'unit_type'], how='left')
+    # Datas sem linha: nada vendido, capacidade atual do tipo
+    defaults = capacity.set_index('unit_type')
+    for column in ('total_rooms', 'out_of_order'):
+        grid[column] = grid[column].fillna(grid['unit_type'].map(defaults[column])).astype(int)
+    grid['rooms_sold'] = grid['rooms_sold'].fillna(0).astype(int)
+    grid['available'] = (grid['total_rooms'] - grid['out_of_order'] - grid['rooms_sold']).clip(lower=0)
+    grid['occupancy'] = _occupancy(grid['rooms_sold'], grid['total_rooms'], grid['out_of_order'])
+    return grid[INVENTORY_COLUMNS]
+
+
+def get_day_inventory(day, unit_type, db_path=database.DEFAULT_DB_PATH):
+    """Inventário de uma noite e tipo (uma busca pela chave primária)"""
+    with database.connection(db_path) as conn:
+        row = conn.execute("""
+            SELECT total_rooms, out_of_order, rooms_sold, available FROM inventory
+            WHERE inv_date = ? AND unit_type = ?
+        """, (day.isoformat(), unit_type)).fetchone()
+        if row is None:
+            capacity = _capacity(conn, [unit_type])
+            total, out_of_order = (0, 0) if capacity.empty else capacity.iloc[0, 1:].astype(int)
+            row = (total, out_of_order, 0, max(total - out_of_order, 0))
+    total, out_of_order, sold, available = (int(value) for value in row)
+    sellable = total - out_of_order
+    return {
+        'date': day, 'unit_type': unit_type, 'total_rooms': total, 'out_of_order': out_of_order,
+        'rooms_sold': sold, 'available': available,
+        'occupancy': round(sold / sellable, 4) if sellable > 0 else 0.0,
+    }
+
+
+def verify_inventory(today=None, db_path=database.DEFAULT_DB_PATH):
+    """Linhas do inventário (ou de ``rates.availability``) divergentes do recálculo.
+
+    A capacidade só é comparada de ``today`` em diante: a de datas passadas
+    é histórica.
+    """
+    today = (today or date.today()).isoformat()
+    with database.connection(db_path) as conn:
+        return pd.read_sql_query(f"""
+            WITH expected AS ({database.INVENTORY_EXPECTED_SQL})
+            SELECT e.inv_date AS date, e.unit_type,
+                   i.rooms_sold, e.rooms_sold AS expected_rooms_sold,
+                   i.total_rooms, e.total_rooms AS expected_total_rooms,
+                   i.out_of_order, e.out_of_order AS expected_out_of_order,
+                   r.availability AS rates_availability, i.available
+            FROM expected e
+            LEFT JOIN inventory i ON i.inv_date = e.inv_date AND i.unit_type = e.unit_type
+            LEFT JOIN rates r ON r.date = e.inv_date AND r.unit_type = e.unit_type
+            WHERE i.inv_date IS NULL
+               OR i.rooms_sold != e.rooms_sold
+               OR (e.inv_date >= :today AND (i.total_rooms != e.total_rooms OR i.out_of_order != e.out_of_order))
+               OR (r.id IS NOT NULL AND r.availability IS NOT i.available)
+            ORDER BY e.inv_date, e.unit_type
+        """, conn, params={'today': today})
+
+
+def rebuild_inventory(today=None, db_path=database.DEFAULT_DB_PATH):
+    """Recalcula o inventário numa transação; retorna o número de divergências corrigidas"""
+    drift = len(verify_inventory(today, db_path))
+    with database.transaction(db_path, immediate=True) as conn:
+        database.rebuild_inventory(conn, today)
+        database.bump_data_version(conn, 'inventory')
+    return drift
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Verifica ou reconstrói o inventário do Orion PMS")
+    parser.add_argument("command", choices=['verify', 'rebuild'])
+    parser.add_argument("--db", default=database.DEFAULT_DB_PATH)
+    args = parser.parse_args(argv)
+
+    if args.command == 'verify':
+        drift = verify_inventory(db_path=args.db)
+        if drift.empty:
+            print("Inventário consistente")
+            return 0
+        print(drift.to_string(index=False))
+        print(f"{len(drift)} linhas divergentes")
+        return 1
+    print(f"Inventário reconstruído ({rebuild_inventory(db_path=args.db)} linhas corrigidas)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
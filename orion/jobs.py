@@ -0,0 +1,337 @@
+"""Rotinas recorrentes executadas em segundo plano, fora da renderização.
+
+Um único agendador por processo (:func:`start_scheduler`) roda numa thread
+daemon e, a cada ``TICK_SECONDS``, executa as rotinas vencidas de cada banco
+(todas as propriedades no modo multipropriedade). A agenda fica no próprio
+banco (``job_state``): antes de executar, a rotina é reservada com um lease
+numa transação ``IMMEDIATE``, de modo que várias sessões, processos do
+Streamlit ou um worker dedicado nunca executam a mesma rotina ao mesmo
+tempo nem repetem uma execução já feita. Cada execução fica em
+``job_runs`` com duração, status e resultado.
+
+Rotinas periódicas que nunca rodaram rodam no primeiro ciclo; rotinas
+diárias rodam no horário configurado - a primeira vez que são vistas só
+agendam a próxima execução (uma reprecificação nunca roda na partida do
+app). Um horário que passou com o processo parado roda no ciclo seguinte.
+Falhas são tentadas de novo após ``RETRY_SECONDS``.
+
+Uso::
+
+    python -m orion.jobs status
+    python -m orion.jobs run [--job reprice]
+    python -m orion.jobs worker
+"""
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+from datetime import datetime, time as clock_time, timedelta
+
+import pandas as pd
+
+from orion import database, instrumentation
+
+ENABLED = os.environ.get("ORION_JOBS", "1") != "0"
+TICK_SECONDS = float(os.environ.get("ORION_JOBS_TICK", "30"))
+LEASE_SECONDS = 1800      # execução mais longa esperada; depois disso o lease expira
+RETRY_SECONDS = 300
+HISTORY_RUNS = 200        # execuções guardadas por rotina
+
+RATE_HORIZON_DAYS = 365
+REPRICE_DAYS = 180
+STATS_CHECK_PAST_DAYS = 90  # daily_stats conferida de 90 dias atrás até o fim do horizonte
+
+logger = logging.getLogger(__name__)
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def _timestamp(moment):
+    return moment.isoformat(sep=' ', timespec='seconds')
+
+
+class Job:
+    """Rotina agendada: a cada ``every`` segundos ou diariamente às ``at``"""
+
+    def __init__(self, name, func, every=None, at=None, description=""):
+        if (every is None) == (at is None):
+            raise ValueError(f"Rotina {name}: informe every ou at")
+        self.name = name
+        self.func = func  # func(db_path, today) -> resultado (JSON)
+        self.every = every
+        self.at = at
+        self.description = description
+
+    def next_run(self, now):
+        """Próxima execução depois de ``now``"""
+        if self.every is not None:
+            return now + timedelta(seconds=self.every)
+        scheduled = datetime.combine(now.date(), self.at)
+        return scheduled if scheduled > now else scheduled + timedelta(days=1)
+
+
+def refresh_forecast(db_path, today):
+    """Única rotina que grava ``demand_forecast`` (a leitura nunca atualiza)"""
+    from orion import forecast
+    return {'rows': forecast.refresh_forecast(today, db_path=db_path)}
+
+
+def extend_rate_horizon(db_path, today):
+    from orion import revenue
+    return {'created': revenue.extend_rate_horizon(today, RATE_HORIZON_DAYS, db_path=db_path)}
+
+
+def reprice(db_path, today):
+    """Reprecifica o horizonte com a previsão gravada pela rotina ``forecast``"""
+    from orion.revenue import RevenueManagementSystem
+
+    grid = RevenueManagementSystem(db_path).optimize_rates(today, REPRICE_DAYS, write=True)
+    return {'rates': len(grid)}
+
+
+def materialize_stats(db_path, today):
+    """Confere daily_stats e o inventário e reconstrói só o que divergiu"""
+    from orion import inventory, kpis
+
+    stats_drift = len(kpis.verify_daily_stats(
+        today - timedelta(days=STATS_CHECK_PAST_DAYS), today + timedelta(days=RATE_HORIZON_DAYS), db_path
+    ))
+    if stats_drift:
+        kpis.refresh_daily_stats(db_path)
+    drift = len(inventory.verify_inventory(today, db_path))
+    if drift:
+        inventory.rebuild_inventory(today, db_path)
+    return {'stats_drift': stats_drift, 'inventory_drift': drift}
+
+
+def generate_housekeeping(db_path, today):
+    from orion import housekeeping
+    return {'tasks': housekeeping.generate_tasks(today, db_path)}
+
+
+def accrue_loyalty(db_path, today):
+    """Credita estadias encerradas fora do check-out do PMS (ex.: feeds importados)"""
+    from orion import loyalty
+    return loyalty.backfill(db_path=db_path)
+
+
+def publish_ari(db_path, today):
+    from orion import channels
+    return {'ranges': channels.ChannelPublisher(db_path=db_path).publish(today)}
+
+
+def prune_ari(db_path, today):
+    """Descarta alterações de ARI já entregues (todas, se não há canal)"""
+    from orion import channels
+    with database.transaction(db_path, immediate=True) as conn:
+        return {'pruned': channels.prune_changes(conn)}
+
+
+def default_jobs():
+    """Rotinas padrão do PMS (a publicação de ARI só com endpoint configurado)"""
+    from orion import channels
+
+    jobs = [
+        Job('forecast', refresh_forecast, every=900, description="Previsão de demanda"),
+        Job('rate_horizon', extend_rate_horizon, at=clock_time(1, 0), description="Extensão do horizonte de tarifas"),
+        Job('reprice', reprice, at=clock_time(2, 0), description="Reprecificação noturna (RMS)"),
+        Job('stats', materialize_stats, at=clock_time(3, 0), description="Estatísticas diárias e inventário"),
+        Job('loyalty', accrue_loyalty, at=clock_time(4, 0), description="Pontos de fidelidade"),
+        Job('housekeeping', generate_housekeeping, at=clock_time(5, 0), description="Tarefas de housekeeping do dia"),
+        Job('ari_prune', prune_ari, at=clock_time(3, 30), description="Limpeza do feed de ARI"),
+    ]
+    if channels.DEFAULT_ENDPOINT:
+        jobs.append(Job('ari_publish', publish_ari, every=30, description="Publicação de ARI nos canais"))
+    return jobs
+
+
+def default_db_paths():
+    """Bancos atendidos: todas as propriedades ou o banco padrão"""
+    from orion import properties
+
+    configured = properties.get_properties()
+    return [spec['db_path'] for spec in configured.values()] or [database.DEFAULT_DB_PATH]
+
+
+class Scheduler:
+    """Executa as rotinas vencidas de cada banco, uma de cada vez"""
+
+    def __init__(self, jobs=None, db_paths=None, tick=TICK_SECONDS):
+        self.jobs = {job.name: job for job in (default_jobs() if jobs is None else jobs)}
+        self.db_paths = default_db_paths() if db_paths is None else list(db_paths)
+        self.tick = tick
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{id(self):x}"
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _claim(self, job, db_path, now, force=False):
+        """Reserva a rotina se estiver vencida e livre; retorna se conseguiu"""
+        now_iso = _timestamp(now)
+        with database.transaction(db_path, immediate=True) as conn:
+            row = conn.execute(
+                "SELECT next_run_at, lease_owner, lease_expires FROM job_state WHERE job = ?", (job.name,)
+            ).fetchone()
+            if row is None and job.at is not None and not force:
+                # Rotina diária vista pela primeira vez: espera o horário agendado
+                conn.execute("INSERT INTO job_state (job, next_run_at) VALUES (?, ?)",
+                             (job.name, _timestamp(job.next_run(now))))
+                return False
+            if row is not None:
+                next_run_at, lease_owner, lease_expires = row
+                if lease_owner is not None and lease_expires > now_iso:
+                    return False
+                if not force and next_run_at is not None and next_run_at > now_iso:
+                    return False
+            conn.execute("""
+                INSERT INTO job_state (job, lease_owner, lease_expires) VALUES (?, ?, ?)
+                ON CONFLICT (job) DO UPDATE SET
+                    lease_owner = excluded.lease_owner, lease_expires = excluded.lease_expires
+            """, (job.name, self.owner, _timestamp(now + timedelta(seconds=LEASE_SECONDS))))
+        return True
+
+    def _finish(self, job, db_path, now, duration_ms, status, result=None, error=None):
+        # Agenda a partir do relógio do agendador (``now`` + duração da execução)
+        finished = now + timedelta(milliseconds=duration_ms)
+        next_run = job.next_run(finished)
+        if status == 'failed':
+            next_run = min(next_run, finished + timedelta(seconds=RETRY_SECONDS))
+        with database.transaction(db_path, immediate=True) as conn:
+            conn.execute("""
+                INSERT INTO job_runs (job, owner, started_at, duration_ms, status, result, error)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (job.name, self.owner, _timestamp(now), round(duration_ms, 1), status,
+                  None if result is None else json.dumps(result, default=str), error))
+            conn.execute("""
+                UPDATE job_state SET next_run_at = ?, lease_owner = NULL, lease_expires = NULL
+                WHERE job = ? AND lease_owner = ?
+            """, (_timestamp(next_run), job.name, self.owner))
+            conn.execute("""
+                DELETE FROM job_runs WHERE job = ? AND id <= (
+                    SELECT id FROM job_runs WHERE job = ? ORDER BY id DESC LIMIT 1 OFFSET ?
+                )
+            """, (job.name, job.name, HISTORY_RUNS))
+
+    def run_job(self, name, db_path, now=None, force=False):
+        """Executa uma rotina se vencida (ou ``force``) e livre; retorna o status ou None"""
+        job = self.jobs[name]
+        now = now or datetime.now()
+        if not self._claim(job, db_path, now, force):
+            return None
+        clock = time.perf_counter()
+        try:
+            with instrumentation.measure('job', job.name):
+                result = job.func(db_path, now.date())
+        except Exception:
+            duration_ms = (time.perf_counter() - clock) * 1000
+            self._finish(job, db_path, now, duration_ms, 'failed', error=traceback.format_exc(limit=5))
+            return 'failed'
+        duration_ms = (time.perf_counter() - clock) * 1000
+        self._finish(job, db_path, now, duration_ms, 'ok', result=result)
+        return 'ok'
+
+    def run_pending(self, now=None):
+        """Executa as rotinas vencidas; retorna [(banco, rotina, status)]"""
+        executed = []
+        for db_path in self.db_paths:
+            for name in self.jobs:
+                if self._stop.is_set():
+                    return executed
+                status = self.run_job(name, db_path, now)
+                if status is not None:
+                    executed.append((db_path, name, status))
+        return executed
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.run_pending()
+            except Exception:
+                # Falha ao acessar o banco (ex.: arquivo bloqueado): tenta no próximo ciclo
+                logger.exception("Falha no ciclo do agendador")
+            self._stop.wait(self.tick)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="orion-jobs", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+def start_scheduler():
+    """Inicia o agendador do processo (uma vez); None se desativado (``ORION_JOBS=0``)"""
+    global _scheduler
+    if not ENABLED:
+        return None
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = Scheduler().start()
+    return _scheduler
+
+
+def get_job_status(db_path=database.DEFAULT_DB_PATH):
+    """Última execução, duração média e falhas de cada rotina"""
+    with database.connection(db_path) as conn:
+        return pd.read_sql_query("""
+            WITH stats AS (
+                SELECT job, COUNT(*) AS runs, SUM(status = 'failed') AS failures,
+                       ROUND(AVG(duration_ms), 1) AS avg_ms, ROUND(MAX(duration_ms), 1) AS max_ms,
+                       MAX(id) AS last_id
+                FROM job_runs GROUP BY job
+            )
+            SELECT s.job, r.started_at AS last_run, r.status, r.duration_ms AS last_ms,
+                   st.avg_ms, st.max_ms, st.runs, st.failures, r.result, s.next_run_at,
+                   s.lease_owner AS running_on
+            FROM job_state s
+            LEFT JOIN stats st ON st.job = s.job
+            LEFT JOIN job_runs r ON r.id = st.last_id
+            ORDER BY s.job
+        """, conn)
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Rotinas em segundo plano do Orion PMS")
+    parser.add_argument("command", choices=['status', 'run', 'worker'])
+    parser.add_argument("--db", action="append", help="Banco (repetível); padrão: propriedades ou ORION_DB_PATH")
+    parser.add_argument("--job", help="Executa só esta rotina, mesmo que não esteja vencida")
+    args = parser.parse_args(argv)
+
+    scheduler = Scheduler(db_paths=args.db)
+    if args.command == 'status':
+        for db_path in scheduler.db_paths:
+            print(f"# {db_path}")
+            print(get_job_status(db_path).to_string(index=False))
+        return 0
+    if args.command == 'run':
+        if args.job:
+            if args.job not in scheduler.jobs:
+                parser.error(f"rotina desconhecida: {args.job} ({', '.join(scheduler.jobs)})")
+            executed = [(db_path, args.job, scheduler.run_job(args.job, db_path, force=True))
+                        for db_path in scheduler.db_paths]
+        else:
+            executed = scheduler.run_pending()
+        for db_path, name, status in executed:
+            print(f"{db_path} {name}: {status or 'em execução em outro processo'}")
+        return 1 if any(status == 'failed' for _, _, status in executed) else 0
+
+    print(f"Agendador em execução a cada {scheduler.tick:.0f}s (Ctrl+C para sair)")
+    try:
+        scheduler._loop()
+    except KeyboardInterrupt:
+        scheduler.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
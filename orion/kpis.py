@@ -0,0 +1,185 @@
+"""Motor de KPIs do dashboard a partir das estatísticas diárias materializadas.
+
+As consultas leem ``daily_stats`` (uma linha por data e tipo de unidade),
+mantida por triggers a cada escrita em ``reservations``; o histórico de
+reservas nunca é varrido durante a renderização.
+"""
+from datetime import timedelta
+
+import pandas as pd
+
+from orion import database, frames
+from orion.cache import cached
+
+
+def _type_filter(unit_types, column):
+    if unit_types is None:
+        return "", []
+    unit_types = list(unit_types)
+    return f" AND {column} IN ({','.join('?' * len(unit_types))})", unit_types
+
+
+@cached('units')
+def get_unit_counts(unit_types=None, db_path=database.DEFAULT_DB_PATH):
+    """Quantidade de unidades por tipo"""
+    clause, params = _type_filter(unit_types, "type")
+    with database.connection(db_path) as conn:
+        rows = conn.execute(
+            f"SELECT type, COUNT(*) FROM units WHERE 1 = 1{clause} GROUP BY type", params
+        ).fetchall()
+    return pd.Series(dict(rows), dtype='int64').rename_axis('unit_type')
+
+
+@cached('daily_stats', 'reservations', 'units')
+def get_period_stats(start, end, unit_types=None, db_path=database.DEFAULT_DB_PATH):
+    """Totais por tipo de unidade para as datas de ``start`` até ``end`` (exclusive)"""
+    clause, params = _type_filter(unit_types, "unit_type")
+    with database.connection(db_path) as conn:
+        stats = pd.read_sql_query(f"""
+            SELECT unit_type, SUM(rooms_sold) AS rooms_sold, SUM(revenue) AS revenue,
+                   SUM(arrivals) AS arrivals, SUM(departures) AS departures
+            FROM daily_stats
+            WHERE stat_date >= ? AND stat_date < ?{clause}
+            GROUP BY unit_type
+        """, conn, params=[start.isoformat(), end.isoformat(), *params], index_col='unit_type')
+
+    units = get_unit_counts(unit_types, db_path)
+    stats = stats.reindex(units.index.union(stats.index)).astype(float).fillna(0)
+    stats['rooms_available'] = units.reindex(stats.index).fillna(0) * max((end - start).days, 0)
+    return stats
+
+
+@cached('daily_stats', 'reservations', 'units')
+def get_period_totals(start, end, unit_types=None, db_path=database.DEFAULT_DB_PATH):
+    """Totais do período numa única consulta, sem DataFrames (usado nas visões de grupo)"""
+    stats_clause, params = _type_filter(unit_types, "unit_type")
+    units_clause, _ = _type_filter(unit_types, "type")
+    with database.connection(db_path) as conn:
+        row = conn.execute(f"""
+            SELECT COALESCE(SUM(rooms_sold), 0), COALESCE(SUM(revenue), 0),
+                   COALESCE(SUM(arrivals), 0), COALESCE(SUM(departures), 0),
+                   (SELECT COUNT(*) FROM units WHERE 1 = 1{units_clause})
+            FROM daily_stats
+            WHERE stat_date >= ? AND stat_date < ?{stats_clause}
+        """, [*params, start.isoformat(), end.isoformat(), *params]).fetchone()
+    rooms_sold, revenue, arrivals, departures, units = row
+    return {
+        'rooms_sold': float(rooms_sold), 'revenue': float(revenue), 'arrivals': float(arrivals),
+        'departures': float(departures), 'rooms_available': float(units * max((end - start).days, 0)),
+    }
+
+
+def summarize(stats):
+    """Ocupação, ADR, RevPAR e chegadas a partir dos totais de um período.
+
+    ``stats`` é o DataFrame por tipo de unidade ou um dict de totais.
+    """
+    if isinstance(stats, pd.DataFrame):
+        stats = stats[['rooms_sold', 'revenue', 'rooms_available', 'arrivals']].sum()
+    rooms_sold = float(stats['rooms_sold'])
+    revenue = float(stats['revenue'])
+    rooms_available = float(stats['rooms_available'])
+    return {
+        'occupancy_rate': round(rooms_sold / rooms_available * 100, 1) if rooms_available else 0.0,
+        'adr': round(revenue / rooms_sold, 2) if rooms_sold else 0.0,
+        'revpar': round(revenue / rooms_available, 2) if rooms_available else 0.0,
+        'revenue': round(revenue, 2),
+        'arrivals': int(stats['arrivals']),
+    }
+
+
+def get_kpis(start, end, unit_types=None, db_path=database.DEFAULT_DB_PATH):
+    """KPIs do período e variação (%) em relação ao período anterior de mesmo tamanho"""
+    length = end - start
+    current = summarize(get_period_stats(start, end, unit_types, db_path))
+    previous = summarize(get_period_stats(start - length, start, unit_types, db_path))
+    changes = {
+        key: round((value - previous[key]) / previous[key] * 100, 1) if previous[key] else None
+        for key, value in current.items()
+    }
+    return current, changes
+
+
+def get_occupancy_by_unit_type(start, end, unit_types=None, db_path=database.DEFAULT_DB_PATH):
+    """Taxa de ocupação (%) por tipo de unidade"""
+    stats = get_period_stats(start, end, unit_types, db_path)
+    rate = (stats['rooms_sold'] / stats['rooms_available'].where(stats['rooms_available'] > 0) * 100)
+    return rate.fillna(0).round(1).rename('occupancy_rate').reset_index()
+
+
+@cached('daily_stats', 'reservations')
+def get_daily_revenue(start, end, unit_types=None, db_path=database.DEFAULT_DB_PATH):
+    """Receita e unidades vendidas por data (datas sem reservas aparecem zeradas)"""
+    clause, params = _type_filter(unit_types, "unit_type")
+    with database.connection(db_path) as conn:
+        daily = pd.read_sql_query(f"""
+            SELECT stat_date AS date, SUM(revenue) AS revenue, SUM(rooms_sold) AS rooms_sold
+            FROM daily_stats
+            WHERE stat_date >= ? AND stat_date < ?{clause}
+            GROUP BY stat_date
+        """, conn, params=[start.isoformat(), end.isoformat(), *params], parse_dates=['date'])
+    dates = pd.date_range(start, end - timedelta(days=1), freq='D', name='date')
+    return daily.set_index('date').reindex(dates, fill_value=0).reset_index()
+
+
+@cached('daily_stats', 'reservations')
+def get_daily_totals(start, end, unit_types=None, db_path=database.DEFAULT_DB_PATH):
+    """Linhas (data, receita, unidades vendidas) das datas com movimento, sem DataFrame"""
+    clause, params = _type_filter(unit_types, "unit_type")
+    with database.connection(db_path) as conn:
+        return conn.execute(f"""
+            SELECT stat_date, SUM(revenue), SUM(rooms_sold)
+            FROM daily_stats
+            WHERE stat_date >= ? AND stat_date < ?{clause}
+            GROUP BY stat_date
+        """, [start.isoformat(), end.isoformat(), *params]).fetchall()
+
+
+def verify_daily_stats(start, end, db_path=database.DEFAULT_DB_PATH):
+    """Linhas de ``daily_stats`` no período divergentes do recálculo a partir das reservas"""
+    with database.connection(db_path) as conn:
+        return pd.read_sql_query(f"""
+            WITH expected AS ({database.daily_stats_expected_sql(window=True)}),
+            stored AS (SELECT * FROM daily_stats WHERE stat_date >= :start AND stat_date < :end),
+            keys AS (
+                SELECT stat_date, unit_type FROM expected
+                UNION SELECT stat_date, unit_type FROM stored
+            )
+            SELECT k.stat_date AS date, k.unit_type,
+                   s.rooms_sold, e.rooms_sold AS expected_rooms_sold,
+                   s.revenue, e.revenue AS expected_revenue,
+                   s.arrivals, e.arrivals AS expected_arrivals,
+                   s.departures, e.departures AS expected_departures
+            FROM keys k
+            LEFT JOIN expected e ON e.stat_date = k.stat_date AND e.unit_type = k.unit_type
+            LEFT JOIN stored s ON s.stat_date = k.stat_date AND s.unit_type = k.unit_type
+            WHERE COALESCE(s.rooms_sold, 0) != COALESCE(e.rooms_sold, 0)
+               OR ABS(COALESCE(s.revenue, 0) - COALESCE(e.revenue, 0)) > 0.005
+               OR COALESCE(s.arrivals, 0) != COALESCE(e.arrivals, 0)
+               OR COALESCE(s.departures, 0) != COALESCE(e.departures, 0)
+            ORDER BY k.stat_date, k.unit_type
+        """, conn, params={'start': start.isoformat(), 'end': end.isoformat()})
+
+
+def refresh_daily_stats(db_path=database.DEFAULT_DB_PATH):
+    """Reconstrói daily_stats a partir do histórico completo de reservas"""
+    with database.transaction(db_path, immediate=True) as conn:
+        database.rebuild_daily_stats(conn)
+        database.bump_data_version(conn, 'daily_stats')
+
+
+@cached('reservations', 'guests', 'units')
+def get_arrivals(day, unit_types=None, db_path=database.DEFAULT_DB_PATH):
+    """Chegadas previstas para o dia"""
+    clause, params = _type_filter(unit_types, "u.type")
+    with database.connection(db_path) as conn:
+        return frames.read_frame(conn, f"""
+            SELECT r.confirmation_code, COALESCE(g.first_name || ' ' || g.last_name, '') AS guest,
+                   u.code AS unit, u.type AS unit_type, r.adults, r.children, r.check_out,
+                   r.source, r.status
+            FROM reservations r
+            JOIN units u ON u.id = r.unit_id
+            LEFT JOIN guests g ON g.id = r.guest_id
+            WHERE r.check_in = ? AND r.status IN ('confirmed', 'checked-in'){clause}
+            ORDER BY u.code
+        """, [day.isoformat(), *params], dates=('check_out',))
@@ -0,0 +1,124 @@
+"""Programa de fidelidade: acúmulo de pontos e categoria dos hóspedes.
+
+Cada estadia encerrada (``checked-out``) credita pontos proporcionais ao
+``total_amount`` numa linha de ``loyalty_ledger``, cuja chave única é a
+reserva - creditar de novo a mesma reserva não tem efeito. Saldo e
+categoria (``guests.loyalty_points``/``loyalty_tier``) são recalculados a
+partir do ledger com SQL por conjunto, apenas para os hóspedes afetados.
+
+O mesmo caminho atende o check-out de uma reserva
+(:func:`orion.booking.check_out_reservation`, na mesma transação) e a carga
+do histórico completo, feita numa passada pela chave primária de
+``reservations`` em blocos de ``BATCH_SIZE`` reservas, um bloco por
+transação::
+
+    python -m orion.loyalty backfill
+    python -m orion.loyalty recalculate
+"""
+from orion import database
+
+POINTS_PER_REAL = 1.0
+BATCH_SIZE = 50_000
+
+# Categoria por pontos acumulados (maior limite primeiro)
+TIERS = (
+    ('Platinum', 50_000),
+    ('Gold', 20_000),
+    ('Silver', 5_000),
+    ('Standard', 0),
+)
+
+
+def _tier_sql(points):
+    cases = ' '.join(f"WHEN {points} >= {threshold} THEN '{tier}'" for tier, threshold in TIERS[:-1])
+    return f"CASE {cases} ELSE '{TIERS[-1][0]}' END"
+
+
+def _update_guests(conn, since_id=None):
+    """Recalcula saldo e categoria dos hóspedes com créditos após ``since_id`` (todos se None)"""
+    scope = "" if since_id is None else "WHERE guest_id IN (SELECT guest_id FROM loyalty_ledger WHERE id > :since)"
+    cur = conn.execute(f"""
+        UPDATE guests SET
+            loyalty_points = t.points,
+            loyalty_tier = {_tier_sql('t.points')},
+            updated_at = CURRENT_TIMESTAMP
+        FROM (
+            SELECT guest_id, SUM(points) AS points FROM loyalty_ledger {scope} GROUP BY guest_id
+        ) t
+        WHERE guests.id = t.guest_id
+        AND (guests.loyalty_points IS NOT t.points OR guests.loyalty_tier IS NOT {_tier_sql('t.points')})
+    """, {'since': since_id})
+    return cur.rowcount
+
+
+def accrue(conn, first_id=None, last_id=None, reservation_id=None):
+    """Credita as estadias encerradas ainda sem pontos e atualiza os hóspedes.
+
+    Executa na transação de ``conn``; o escopo é uma reserva ou um intervalo
+    de ids. Retorna (reservas creditadas, hóspedes atualizados).
+    """
+    clauses, params = [], {'rate': POINTS_PER_REAL}
+    if reservation_id is not None:
+        clauses.append("r.id = :reservation")
+        params['reservation'] = reservation_id
+    if first_id is not None:
+        clauses.append("r.id >= :first")
+        params['first'] = first_id
+    if last_id is not None:
+        clauses.append("r.id <= :last")
+        params['last'] = last_id
+    scope = ''.join(f" AND {clause}" for clause in clauses)
+
+    since = conn.execute("SELECT COALESCE(MAX(id), 0) FROM loyalty_ledger").fetchone()[0]
+    cur = conn.execute(f"""
+        INSERT INTO loyalty_ledger (reservation_id, guest_id, points)
+        SELECT r.id, r.guest_id, CAST(COALESCE(r.total_amount, 0) * :rate AS INTEGER)
+        FROM reservations r
+        WHERE r.status = 'checked-out' AND r.guest_id IS NOT NULL{scope}
+        ON CONFLICT (reservation_id) DO NOTHING
+    """, params)
+    accrued = cur.rowcount
+    return accrued, (_update_guests(conn, since) if accrued else 0)
+
+
+def backfill(batch_size=BATCH_SIZE, db_path=database.DEFAULT_DB_PATH):
+    """Credita todo o histórico de estadias encerradas; retorna totais da carga"""
+    with database.connection(db_path) as conn:
+        first, last = conn.execute("SELECT MIN(id), MAX(id) FROM reservations").fetchone()
+    totals = {'reservations': 0, 'guests': 0}
+    if first is None:
+        return totals
+    for start in range(first, last + 1, batch_size):
+        # Um bloco por transação: escritas concorrentes esperam pouco
+        with database.transaction(db_path, immediate=True) as conn:
+            accrued, guests = accrue(conn, start, start + batch_size - 1)
+        totals['reservations'] += accrued
+        totals['guests'] += guests
+    return totals
+
+
+def recalculate_tiers(db_path=database.DEFAULT_DB_PATH):
+    """Recalcula saldo e categoria de todos os hóspedes (ex.: após mudar ``TIERS``)"""
+    with database.transaction(db_path, immediate=True) as conn:
+        return _update_guests(conn)
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Programa de fidelidade do Orion PMS")
+    parser.add_argument("command", choices=['backfill', 'recalculate'])
+    parser.add_argument("--db", default=database.DEFAULT_DB_PATH)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    if args.command == 'backfill':
+        totals = backfill(args.batch_size, db_path=args.db)
+        print(f"{totals['reservations']} estadias creditadas, {totals['guests']} hóspedes atualizados")
+    else:
+        print(f"{recalculate_tiers(db_path=args.db)} hóspedes atualizados")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
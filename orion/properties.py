@@ -0,0 +1,200 @@
+"""Modo multipropriedade: um banco por hotel e consultas em paralelo.
+
+As propriedades ficam num arquivo JSON indicado por ``ORION_PROPERTIES``::
+
+    {
+        "SAO": {"name": "Orion São Paulo", "db_path": "sao.db"},
+        "RIO": {"name": "Orion Rio", "db_path": "/dados/rio.db"}
+    }
+
+Caminhos relativos são resolvidos a partir da pasta do arquivo. Sem o
+arquivo o PMS opera numa única propriedade (``ORION_DB_PATH``). Com o
+arquivo, as telas de uma propriedade (reservas, tarifas, housekeeping...)
+usam o banco escolhido no seletor da barra lateral.
+
+As visões de grupo espalham a mesma função de dados por todas as
+propriedades num pool de threads compartilhado e juntam os resultados
+(scatter-gather). Threads bastam: o SQLite libera o GIL durante as
+consultas, cada banco tem o seu pool de conexões e os caches por versão de
+dados continuam valendo por propriedade. Para que o trabalho em Python não
+serialize as threads, cada propriedade devolve apenas linhas/totais do SQL
+e os DataFrames são montados uma vez, depois da coleta. KPIs do grupo são
+recalculados sobre os totais somados, nunca pela média das taxas de cada
+hotel.
+"""
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from orion import database, kpis
+
+PROPERTIES_FILE = os.environ.get("ORION_PROPERTIES", "")
+MAX_WORKERS = int(os.environ.get("ORION_PROPERTY_WORKERS", "16"))
+
+_properties = None
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class PropertyError(Exception):
+    """Falha ao consultar uma ou mais propriedades"""
+
+    def __init__(self, errors):
+        self.errors = errors  # {código: exceção}
+        details = "; ".join(f"{code}: {error}" for code, error in errors.items())
+        super().__init__(f"Falha em {len(errors)} propriedade(s): {details}")
+
+
+def load_properties(path=PROPERTIES_FILE):
+    """Lê o cadastro de propriedades: {código: {'name', 'db_path'}}"""
+    if not path:
+        return {}
+    with open(path, encoding='utf-8') as f:
+        config = json.load(f)
+    base_dir = os.path.dirname(os.path.abspath(path))
+    properties = {}
+    for code, spec in config.items():
+        if 'db_path' not in spec:
+            raise ValueError(f"Propriedade {code} sem db_path")
+        properties[code] = {
+            'name': spec.get('name', code),
+            'db_path': os.path.join(base_dir, spec['db_path']),
+        }
+    return properties
+
+
+def get_properties():
+    """Propriedades configuradas (lidas uma vez por processo)"""
+    global _properties
+    if _properties is None:
+        _properties = load_properties()
+    return _properties
+
+
+def is_multi_property():
+    return len(get_properties()) > 1
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="orion-property")
+    return _executor
+
+
+def scatter(func, *args, properties=None, discard=None, **kwargs):
+    """Executa ``func(*args, db_path=..., **kwargs)`` em cada propriedade em paralelo.
+
+    Retorna {código: resultado} na ordem do cadastro; se alguma propriedade
+    falhar, levanta :class:`PropertyError` com os erros de todas, depois de
+    passar os resultados das demais a ``discard`` (ex.: fechar arquivos).
+    """
+    properties = get_properties() if properties is None else properties
+    executor = _get_executor()
+    futures = {
+        code: executor.submit(func, *args, db_path=spec['db_path'], **kwargs)
+        for code, spec in properties.items()
+    }
+    results, errors = {}, {}
+    for code, future in futures.items():
+        try:
+            results[code] = future.result()
+        except Exception as error:
+            errors[code] = error
+    if errors:
+        if discard is not None:
+            for result in results.values():
+                discard(result)
+        raise PropertyError(errors)
+    return results
+
+
+def _with_property(frames, properties):
+    """Concatena DataFrames por propriedade com as colunas property/property_name"""
+    frames = [
+        frame.assign(property=code, property_name=properties[code]['name'])
+        for code, frame in frames.items()
+    ]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def _add_totals(totals):
+    return {key: sum(values[key] for values in totals) for key in totals[0]} if totals else {
+        'rooms_sold': 0.0, 'revenue': 0.0, 'arrivals': 0.0, 'departures': 0.0, 'rooms_available': 0.0
+    }
+
+
+def group_kpis(start, end, unit_types=None, properties=None):
+    """KPIs do grupo e de cada propriedade no período.
+
+    Retorna ``(por_propriedade, grupo, variações)``: um DataFrame com uma
+    linha por propriedade e os KPIs/variações (%) do grupo, calculados sobre
+    os totais somados.
+    """
+    properties = get_properties() if properties is None else properties
+    length = end - start
+
+    def period(db_path):
+        return (
+            kpis.get_period_totals(start, end, unit_types, db_path),
+            kpis.get_period_totals(start - length, start, unit_types, db_path),
+        )
+
+    totals = scatter(period, properties=properties)
+    rows = [
+        dict(property=code, property_name=properties[code]['name'], **kpis.summarize(current))
+        for code, (current, _) in totals.items()
+    ]
+    current = kpis.summarize(_add_totals([pair[0] for pair in totals.values()]))
+    previous = kpis.summarize(_add_totals([pair[1] for pair in totals.values()]))
+    changes = {
+        key: round((value - previous[key]) / previous[key] * 100, 1) if previous[key] else None
+        for key, value in current.items()
+    }
+    return pd.DataFrame(rows), current, changes
+
+
+def group_daily_revenue(start, end, unit_types=None, properties=None):
+    """Receita e unidades vendidas por data e propriedade (datas sem reservas zeradas)"""
+    properties = get_properties() if properties is None else properties
+    gathered = scatter(kpis.get_daily_totals, start, end, unit_types, properties=properties)
+    # Um único DataFrame montado depois da coleta
+    daily = pd.DataFrame(
+        [(code, *row) for code, rows in gathered.items() for row in rows],
+        columns=['property', 'date', 'revenue', 'rooms_sold']
+    )
+    daily['date'] = pd.to_datetime(daily['date'])
+    grid = pd.MultiIndex.from_product(
+        [list(properties), pd.date_range(start, end, inclusive='left')], names=['property', 'date']
+    )
+    daily = daily.set_index(['property', 'date']).reindex(grid, fill_value=0).reset_index()
+    daily['property_name'] = daily['property'].map({code: spec['name'] for code, spec in properties.items()})
+    return daily
+
+
+def group_rate_grid(start, days, unit_types=None, properties=None):
+    """Grade de tarifas sugeridas de todas as propriedades"""
+    from orion.revenue import RevenueManagementSystem
+
+    properties = get_properties() if properties is None else properties
+
+    def optimize(db_path):
+        return RevenueManagementSystem(db_path).optimize_rates(start, days, unit_types)
+
+    return _with_property(scatter(optimize, properties=properties), properties)
+
+
+def group_report_rows(report_ids, start, end, properties=None):
+    """Linhas dos relatórios em todas as propriedades, em arquivos temporários.
+
+    Retorna {código: {relatório: arquivo}}; as linhas são lidas com
+    :func:`orion.reports.iter_spool`.
+    """
+    from orion import reports
+
+    return scatter(reports.spool_rows, report_ids, start, end, properties=properties, discard=reports.close_spools)
@@ -0,0 +1,323 @@
+"""Relatórios gerenciais gerados em streaming (CSV ou Excel).
+
+Cada relatório é uma consulta agregada no SQLite cujas linhas são lidas em
+blocos (``fetchmany``) e escritas diretamente no arquivo de saída - CSV ou
+planilha ``openpyxl`` em modo *write-only* - sem montar DataFrames. A
+memória usada fica limitada ao tamanho do bloco, seja o relatório de um
+mês ou o fechamento anual com todas as reservas.
+
+No modo multipropriedade os relatórios agregados podem ser consolidados:
+as consultas rodam em paralelo em cada banco e as linhas saem com a coluna
+da propriedade (ver :mod:`orion.properties`).
+"""
+import csv
+import io
+import os
+import pickle
+import tempfile
+import time
+from calendar import monthrange
+from datetime import date, timedelta
+
+from orion import database
+
+CHUNK_ROWS = 5_000
+# Relatórios agregados (planilha) e o detalhamento linha a linha (CSV: sem o
+# limite de linhas do Excel e ordens de grandeza mais rápido de gerar)
+SUMMARY_REPORTS = ['daily_performance', 'monthly_performance', 'revenue_by_source', 'nationality_mix']
+DETAIL_REPORTS = ['reservations']
+# Linhas coletadas por propriedade acima deste tamanho vão para disco
+SPOOL_MAX_BYTES = 4 * 1024 * 1024
+# Arquivos gerados ficam em disco até o download; os antigos são removidos
+REPORT_DIR = os.path.join(tempfile.gettempdir(), "orion_reports")
+REPORT_MAX_AGE_SECONDS = 6 * 3600
+_SOLD = ", ".join(f"'{s}'" for s in database.SOLD_STATUSES)
+
+# Dias do período (fim exclusivo) com o total de unidades, base das taxas
+_PERIOD_DAYS = """
+    WITH RECURSIVE days(day) AS (
+        SELECT date(:start) WHERE date(:start) < date(:end)
+        UNION ALL
+        SELECT date(day, '+1 day') FROM days WHERE date(day, '+1 day') < date(:end)
+    )
+"""
+
+REPORTS = {
+    'daily_performance': {
+        'title': "Desempenho diário",
+        'columns': ['Data', 'UHs vendidas', 'UHs disponíveis', 'Ocupação (%)', 'ADR', 'RevPAR',
+                    'Receita', 'Chegadas', 'Saídas'],
+        'sql': _PERIOD_DAYS + """
+            , totals AS (
+                SELECT stat_date, SUM(rooms_sold) AS sold, SUM(revenue) AS revenue,
+                       SUM(arrivals) AS arrivals, SUM(departures) AS departures
+                FROM daily_stats WHERE stat_date >= :start AND stat_date < :end
+                GROUP BY stat_date
+            ), inventory AS (SELECT COUNT(*) AS rooms FROM units)
+            SELECT d.day, COALESCE(t.sold, 0), i.rooms,
+                   ROUND(COALESCE(t.sold, 0) * 100.0 / NULLIF(i.rooms, 0), 1),
+                   ROUND(COALESCE(t.revenue / NULLIF(t.sold, 0), 0), 2),
+                   ROUND(COALESCE(t.revenue, 0) / NULLIF(i.rooms, 0), 2),
+                   ROUND(COALESCE(t.revenue, 0), 2), COALESCE(t.arrivals, 0), COALESCE(t.departures, 0)
+            FROM days d CROSS JOIN inventory i
+            LEFT JOIN totals t ON t.stat_date = d.day
+            ORDER BY d.day
+        """,
+    },
+    'monthly_performance': {
+        'title': "Desempenho mensal por tipo",
+        'columns': ['Mês', 'Tipo de unidade', 'UHs vendidas', 'UHs disponíveis', 'Ocupação (%)', 'ADR',
+                    'RevPAR', 'Receita'],
+        'sql': _PERIOD_DAYS + """
+            , months AS (SELECT substr(day, 1, 7) AS month, COUNT(*) AS days FROM days GROUP BY month),
+            inventory AS (SELECT type AS unit_type, COUNT(*) AS rooms FROM units GROUP BY type),
+            totals AS (
+                SELECT substr(stat_date, 1, 7) AS month, unit_type,
+                       SUM(rooms_sold) AS sold, SUM(revenue) AS revenue
+                FROM daily_stats WHERE stat_date >= :start AND stat_date < :end
+                GROUP BY month, unit_type
+            )
+            SELECT m.month, i.unit_type, COALESCE(t.sold, 0), i.rooms * m.days,
+                   ROUND(COALESCE(t.sold, 0) * 100.0 / NULLIF(i.rooms * m.days, 0), 1),
+                   ROUND(COALESCE(t.revenue / NULLIF(t.sold, 0), 0), 2),
+                   ROUND(COALESCE(t.revenue, 0) / NULLIF(i.rooms * m.days, 0), 2),
+                   ROUND(COALESCE(t.revenue, 0), 2)
+            FROM months m CROSS JOIN inventory i
+            LEFT JOIN totals t ON t.month = m.month AND t.unit_type = i.unit_type
+            ORDER BY m.month, i.unit_type
+        """,
+    },
+    'revenue_by_source': {
+        'title': "Receita por origem",
+        'columns': ['Mês', 'Origem', 'Reservas', 'Diárias', 'Receita', 'ADR'],
+        'sql': f"""
+            SELECT substr(check_in, 1, 7) AS month, source, COUNT(*),
+                   SUM(julianday(check_out) - julianday(check_in)) AS nights,
+                   ROUND(SUM(total_amount), 2),
+                   ROUND(SUM(total_amount) / NULLIF(SUM(julianday(check_out) - julianday(check_in)), 0), 2)
+            FROM reservations
+            WHERE check_in >= :start AND check_in < :end AND status IN ({_SOLD})
+            GROUP BY month, source
+            ORDER BY month, SUM(total_amount) DESC
+        """,
+    },
+    'nationality_mix': {
+        'title': "Hóspedes por nacionalidade",
+        'columns': ['Nacionalidade', 'Hóspedes', 'Reservas', 'Diárias', 'Receita', 'Participação (%)'],
+        'sql': f"""
+            SELECT COALESCE(g.nationality, 'N/I'), COUNT(DISTINCT r.guest_id), COUNT(*),
+                   SUM(julianday(r.check_out) - julianday(r.check_in)),
+                   ROUND(SUM(r.total_amount), 2),
+                   ROUND(SUM(r.total_amount) * 100.0 / NULLIF(SUM(SUM(r.total_amount)) OVER (), 0), 1)
+            FROM reservations r
+            LEFT JOIN guests g ON g.id = r.guest_id
+            WHERE r.check_in >= :start AND r.check_in < :end AND r.status IN ({_SOLD})
+            GROUP BY 1
+            ORDER BY SUM(r.total_amount) DESC
+        """,
+    },
+    'reservations': {
+        'title': "Reservas do período",
+        'columns': ['Código', 'Hóspede', 'Nacionalidade', 'Unidade', 'Tipo', 'Check-in', 'Check-out',
+                    'Noites', 'Adultos', 'Crianças', 'Status', 'Origem', 'Diária', 'Total', 'Pagamento',
+                    'Criada em'],
+        'sql': """
+            SELECT r.confirmation_code, g.first_name || ' ' || g.last_name, g.nationality,
+                   u.code, u.type, r.check_in, r.check_out,
+                   CAST(julianday(r.check_out) - julianday(r.check_in) AS INTEGER),
+                   r.adults, r.children, r.status, r.source, r.rate, r.total_amount,
+                   r.payment_status, r.created_at
+            FROM reservations r
+            LEFT JOIN guests g ON g.id = r.guest_id
+            LEFT JOIN units u ON u.id = r.unit_id
+            WHERE r.check_in >= :start AND r.check_in < :end
+            ORDER BY r.check_in, r.id
+        """,
+    },
+}
+
+
+def month_period(year, month):
+    """Período (início, fim exclusivo) de um mês"""
+    return date(year, month, 1), date(year, month, monthrange(year, month)[1]) + timedelta(days=1)
+
+
+def year_period(year):
+    """Período (início, fim exclusivo) de um ano"""
+    return date(year, 1, 1), date(year + 1, 1, 1)
+
+
+def iter_rows(conn, report_id, start, end, chunk_rows=CHUNK_ROWS):
+    """Linhas do relatório, lidas do banco em blocos"""
+    cur = conn.execute(REPORTS[report_id]['sql'], {'start': start.isoformat(), 'end': end.isoformat()})
+    while True:
+        rows = cur.fetchmany(chunk_rows)
+        if not rows:
+            break
+        yield from rows
+
+
+def write_csv(report_id, start, end, fileobj, chunk_rows=CHUNK_ROWS, db_path=database.DEFAULT_DB_PATH):
+    """Escreve um relatório em CSV (arquivo texto); retorna o número de linhas"""
+    writer = csv.writer(fileobj, delimiter=';')
+    writer.writerow(REPORTS[report_id]['columns'])
+    count = 0
+    with database.connection(db_path) as conn:
+        for row in iter_rows(conn, report_id, start, end, chunk_rows):
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def write_xlsx(report_ids, start, end, fileobj, chunk_rows=CHUNK_ROWS, db_path=database.DEFAULT_DB_PATH):
+    """Escreve os relatórios numa planilha (uma aba cada) em modo write-only.
+
+    Todas as abas são lidas na mesma transação, refletindo o mesmo instante.
+    Retorna {relatório: número de linhas}.
+    """
+    from openpyxl import Workbook  # só quem gera planilhas paga a importação
+
+    workbook = Workbook(write_only=True)
+    counts = {}
+    with database.connection(db_path) as conn:
+        conn.execute("BEGIN")
+        try:
+            for report_id in report_ids:
+                report = REPORTS[report_id]
+                sheet = workbook.create_sheet(report['title'][:31])
+                sheet.append(report['columns'])
+                count = 0
+                for row in iter_rows(conn, report_id, start, end, chunk_rows):
+                    sheet.append(row)
+                    count += 1
+                counts[report_id] = count
+        finally:
+            conn.execute("COMMIT")
+    workbook.save(fileobj)
+    return counts
+
+
+def preview(report_id, start, end, limit=100, db_path=database.DEFAULT_DB_PATH):
+    """Primeiras linhas do relatório (cabeçalho, linhas) para exibição"""
+    with database.connection(db_path) as conn:
+        cur = conn.execute(REPORTS[report_id]['sql'], {'start': start.isoformat(), 'end': end.isoformat()})
+        return REPORTS[report_id]['columns'], cur.fetchmany(limit)
+
+
+def spool_rows(report_ids, start, end, chunk_rows=CHUNK_ROWS, db_path=database.DEFAULT_DB_PATH):
+    """Grava as linhas dos relatórios em arquivos temporários: {relatório: arquivo}.
+
+    Os blocos lidos do banco são serializados um a um (:func:`iter_spool`),
+    sem acumular o relatório em memória. Todos os relatórios são lidos na
+    mesma transação.
+    """
+    spools = {}
+    with database.connection(db_path) as conn:
+        conn.execute("BEGIN")
+        try:
+            for report_id in report_ids:
+                spool = spools[report_id] = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+                cur = conn.execute(REPORTS[report_id]['sql'], {'start': start.isoformat(), 'end': end.isoformat()})
+                while rows := cur.fetchmany(chunk_rows):
+                    pickle.dump(rows, spool, protocol=pickle.HIGHEST_PROTOCOL)
+                spool.seek(0)
+        except BaseException:
+            close_spools(spools)
+            raise
+        finally:
+            conn.execute("COMMIT")
+    return spools
+
+
+def close_spools(spools):
+    """Fecha (e descarta) os arquivos de :func:`spool_rows`"""
+    for spool in spools.values():
+        spool.close()
+
+
+def iter_spool(spool):
+    """Linhas gravadas por :func:`spool_rows` (fecha o arquivo ao terminar)"""
+    with spool:
+        while True:
+            try:
+                yield from pickle.load(spool)
+            except EOFError:
+                return
+
+
+def _output_file(suffix):
+    """Arquivo de saída em ``REPORT_DIR``, removendo os gerados há mais tempo"""
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    expired = time.time() - REPORT_MAX_AGE_SECONDS
+    for entry in os.scandir(REPORT_DIR):
+        try:
+            if entry.is_file() and entry.stat().st_mtime < expired:
+                os.remove(entry.path)
+        except OSError:
+            pass  # removido por outra sessão
+    return tempfile.NamedTemporaryFile(prefix="orion_", suffix=suffix, dir=REPORT_DIR, delete=False)
+
+
+def render(report_ids, start, end, file_format='xlsx', db_path=database.DEFAULT_DB_PATH):
+    """Gera o relatório num arquivo em ``REPORT_DIR``; retorna (caminho, nome para download)"""
+    label = f"{start.isoformat()}_{end.isoformat()}"
+    if file_format == 'csv' and len(report_ids) != 1:
+        raise ValueError("CSV comporta um relatório por arquivo")
+    with _output_file(f".{file_format}") as output:
+        if file_format == 'csv':
+            text = io.TextIOWrapper(output, encoding='utf-8-sig', newline='')
+            write_csv(report_ids[0], start, end, text, db_path=db_path)
+            text.flush()
+            text.detach()
+            name = f"orion_{report_ids[0]}_{label}.csv"
+        else:
+            write_xlsx(report_ids, start, end, output, db_path=db_path)
+            name = f"orion_relatorios_{label}.xlsx"
+    return output.name, name
+
+
+def render_group(report_ids, start, end, file_format='xlsx', properties=None):
+    """Relatórios agregados de todas as propriedades num único arquivo; retorna (caminho, nome).
+
+    As propriedades são lidas em paralelo, cada uma para os seus arquivos
+    temporários (:func:`spool_rows`), que depois são copiados em sequência
+    para a saída.
+    """
+    from orion.properties import group_report_rows
+
+    if set(report_ids) & set(DETAIL_REPORTS):
+        raise ValueError("Relatórios detalhados são gerados por propriedade")
+    if file_format == 'csv' and len(report_ids) != 1:
+        raise ValueError("CSV comporta um relatório por arquivo")
+
+    gathered = {}
+    label = f"{start.isoformat()}_{end.isoformat()}"
+    try:
+        gathered = group_report_rows(report_ids, start, end, properties)
+        with _output_file(f".{file_format}") as output:
+            if file_format == 'csv':
+                report_id = report_ids[0]
+                text = io.TextIOWrapper(output, encoding='utf-8-sig', newline='')
+                writer = csv.writer(text, delimiter=';')
+                writer.writerow(['Propriedade', *REPORTS[report_id]['columns']])
+                for code, spools in gathered.items():
+                    writer.writerows((code, *row) for row in iter_spool(spools[report_id]))
+                text.flush()
+                text.detach()
+                name = f"orion_grupo_{report_id}_{label}.csv"
+            else:
+                from openpyxl import Workbook
+
+                workbook = Workbook(write_only=True)
+                for report_id in report_ids:
+                    sheet = workbook.create_sheet(REPORTS[report_id]['title'][:31])
+                    sheet.append(['Propriedade', *REPORTS[report_id]['columns']])
+                    for code, spools in gathered.items():
+                        for row in iter_spool(spools[report_id]):
+                            sheet.append((code, *row))
+                workbook.save(output)
+                name = f"orion_grupo_relatorios_{label}.xlsx"
+    finally:
+        for spools in gathered.values():
+            close_spools(spools)
+    return output.name, name
@@ -0,0 +1,161 @@
+"""Listagem de reservas com filtros no servidor e paginação por keyset.
+
+Cada página é uma única consulta que continua a partir da última linha da
+página anterior (``(valor de ordenação, id)``), em vez de ``OFFSET``: o custo
+de uma página não cresce com a profundidade da navegação nem com o tamanho
+do histórico, e apenas as linhas da página saem do banco.
+"""
+from orion import database, frames
+from orion.cache import cached
+from orion.guests import build_match_query
+
+# Colunas de ordenação permitidas (todas indexadas). Sem NULL: a comparação
+# por tupla do keyset nunca é verdadeira para NULL
+SORT_COLUMNS = {
+    'check_in': 'r.check_in',
+    'check_out': 'r.check_out',
+    'created_at': "COALESCE(r.created_at, '')",
+}
+STATUSES = ['confirmed', 'checked-in', 'checked-out', 'cancelled', 'no-show']
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+PAGE_COLUMNS = [
+    'id', 'confirmation_code', 'guest_name', 'unit_code', 'unit_type', 'check_in', 'check_out',
+    'nights', 'adults', 'children', 'status', 'source', 'total_amount', 'payment_status', 'created_at',
+]
+
+
+def _filter_clauses(statuses, sources, start, end, unit_ids, guest):
+    clauses, params = [], []
+    if statuses:
+        clauses.append(f"r.status IN ({','.join('?' * len(statuses))})")
+        params.extend(statuses)
+    if sources:
+        clauses.append(f"r.source IN ({','.join('?' * len(sources))})")
+        params.extend(sources)
+    if start is not None:
+        clauses.append("r.check_in >= ?")
+        params.append(start.isoformat())
+    if end is not None:
+        clauses.append("r.check_in < ?")
+        params.append(end.isoformat())
+    if unit_ids:
+        clauses.append(f"r.unit_id IN ({','.join('?' * len(unit_ids))})")
+        params.extend(unit_ids)
+    if guest is not None:
+        if isinstance(guest, int):
+            clauses.append("r.guest_id = ?")
+            params.append(guest)
+        else:
+            match = build_match_query(guest)
+            if match is not None:
+                clauses.append("r.guest_id IN (SELECT rowid FROM guests_fts WHERE guests_fts MATCH ?)")
+                params.append(match)
+    return clauses, params
+
+
+@cached('reservations', 'guests', 'units')
+def list_reservations(statuses=None, sources=None, start=None, end=None, unit_ids=None, guest=None,
+                      sort='check_in', descending=True, after=None, limit=DEFAULT_PAGE_SIZE,
+                      db_path=database.DEFAULT_DB_PATH):
+    """Uma página de reservas filtradas e o cursor da próxima página.
+
+    ``start``/``end`` filtram a data de check-in (fim exclusivo); ``guest``
+    é o id do hóspede ou um texto buscado no índice de hóspedes. ``after`` é
+    o cursor devolvido pela página anterior. Retorna ``(DataFrame, cursor)``,
+    com cursor ``None`` na última página.
+    """
+    if sort not in SORT_COLUMNS:
+        raise ValueError(f"Ordenação inválida: {sort}")
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    column = SORT_COLUMNS[sort]
+    direction, comparison = ('DESC', '<') if descending else ('ASC', '>')
+
+    clauses, params = _filter_clauses(statuses, sources, start, end, unit_ids, guest)
+    if after is not None:
+        clauses.append(f"({column}, r.id) {comparison} (?, ?)")
+        params.extend(after)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+    with database.connection(db_path) as conn:
+        rows = conn.execute(f"""
+            SELECT r.id, r.confirmation_code,
+                   g.first_name || ' ' || g.last_name AS guest_name,
+                   u.code AS unit_code, u.type AS unit_type,
+                   r.check_in, r.check_out,
+                   CAST(julianday(r.check_out) - julianday(r.check_in) AS INTEGER) AS nights,
+                   r.adults, r.children, r.status, r.source, r.total_amount, r.payment_status,
+                   r.created_at, {column} AS sort_value
+            FROM reservations r
+            LEFT JOIN guests g ON g.id = r.guest_id
+            LEFT JOIN units u ON u.id = r.unit_id
+            {where}
+            ORDER BY {column} {direction}, r.id {direction}
+            LIMIT ?
+        """, (*params, limit + 1)).fetchall()
+
+    # Uma linha a mais indica que existe próxima página
+    cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        cursor = (rows[-1][-1], rows[-1][0])
+    # O DataFrame é montado uma vez, só com as colunas exibidas
+    page = frames.from_rows([row[:-1] for row in rows], PAGE_COLUMNS, dates=('check_in', 'check_out', 'created_at'))
+    return page, cursor
+
+
+@cached('reservations')
+def get_reservation_sources(db_path=database.DEFAULT_DB_PATH):
+    """Origens de reserva já usadas (para os filtros)"""
+    with database.connection(db_path) as conn:
+        return [row[0] for row in conn.execute(
+            "SELECT DISTINCT source FROM reservations ORDER BY source"
+        )]
+
+
+# Status exibidos na linha do tempo (estadias que ocupam a unidade)
+TIMELINE_STATUSES = ('confirmed', 'checked-in', 'checked-out')
+TIMELINE_COLUMNS = [
+    'id', 'unit_id', 'confirmation_code', 'guest_name', 'check_in', 'check_out', 'status', 'source',
+]
+
+
+@cached('reservations', 'guests', 'units')
+def get_timeline(start, end, unit_types=None, unit_offset=0, unit_limit=None, db_path=database.DEFAULT_DB_PATH):
+    """Unidades e reservas da janela visível da linha do tempo.
+
+    ``unit_offset``/``unit_limit`` selecionam a faixa de unidades (ordem do
+    código) e só as reservas dessas unidades que cruzam ``start``-``end``
+    (fim exclusivo) saem do banco. Retorna ``(unidades, reservas, total de
+    unidades)``.
+    """
+    type_clause, params = "", []
+    if unit_types is not None:
+        unit_types = list(unit_types)
+        type_clause = f"WHERE type IN ({','.join('?' * len(unit_types))})"
+        params.extend(unit_types)
+
+    with database.connection(db_path) as conn:
+        total = conn.execute(f"SELECT COUNT(*) FROM units {type_clause}", params).fetchone()[0]
+        units = frames.read_frame(conn, f"""
+            SELECT id, code, type, status FROM units {type_clause}
+            ORDER BY code LIMIT ? OFFSET ?
+        """, (*params, -1 if unit_limit is None else unit_limit, unit_offset))
+        if units.empty:
+            return units, frames.from_rows([], TIMELINE_COLUMNS), total
+        unit_ids = units['id'].tolist()
+        # Uma busca de intervalo por unidade em (unit_id, check_out, check_in, status).
+        # Sem INDEXED BY o planejador prefere (status, check_in) e percorre todo o
+        # histórico encerrado anterior à janela
+        stays = frames.read_frame(conn, f"""
+            SELECT r.id, r.unit_id, r.confirmation_code,
+                   COALESCE(g.first_name || ' ' || g.last_name, '') AS guest_name,
+                   r.check_in, r.check_out, r.status, r.source
+            FROM reservations r INDEXED BY idx_reservations_unit_stay
+            LEFT JOIN guests g ON g.id = r.guest_id
+            WHERE r.unit_id IN ({','.join('?' * len(unit_ids))})
+            AND r.check_out > ? AND r.check_in < ?
+            AND r.status IN ({','.join('?' * len(TIMELINE_STATUSES))})
+        """, (*unit_ids, start.isoformat(), end.isoformat(), *TIMELINE_STATUSES), dates=('check_in', 'check_out'))
+    return units, stays, total
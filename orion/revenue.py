@@ -0,0 +1,220 @@
+"""Revenue Management: precificação dinâmica em lote.
+
+Os fatores de temporada, demanda, ocupação e fim de semana são aplicados de
+forma vetorizada sobre uma grade data × tipo de unidade × cenário de
+ocupação, a partir de uma única consulta de intervalo em ``rates``. O fator
+de demanda vem da ocupação prevista pelas curvas de pickup
+(:mod:`orion.forecast`).
+"""
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from orion import database, forecast, inventory
+from orion.cache import cached
+
+# Tarifa base usada quando não há tarifa cadastrada para a data
+DEFAULT_BASE_RATES = {'Standard': 250.00, 'Luxo': 450.00, 'Suite': 750.00}
+FALLBACK_BASE_RATE = 750.00
+
+# Fator sazonal por mês (índice 1-12)
+SEASON_FACTORS = np.array([np.nan, 1.5, 1.5, 0.9, 0.9, 0.9, 1.2, 1.2, 0.9, 0.9, 0.9, 1.2, 1.5])
+
+WEEKEND_FACTOR = 1.25
+
+# Fator de demanda interpolado pela ocupação prevista (0-1)
+DEMAND_CURVE = (
+    [0.0, 0.4, 0.6, 0.75, 0.85, 0.95],
+    [0.85, 0.95, 1.0, 1.15, 1.35, 1.6],
+)
+
+# Desconto por tamanho da estadia, interpolado pelo número de noites
+LENGTH_OF_STAY_CURVE = (
+    [1, 3, 7, 14, 30],
+    [1.0, 0.97, 0.92, 0.88, 0.85],
+)
+
+
+class RevenueManagementSystem:
+    def __init__(self, db_path=database.DEFAULT_DB_PATH):
+        self.db_path = db_path
+
+    def calculate_optimal_rate(self, unit_type, check_in, length_of_stay, current_occupancy=None):
+        """Calcula a tarifa ideal baseada em múltiplos fatores.
+
+        Sem ``current_occupancy`` usa a ocupação real da data no inventário.
+        """
+        if current_occupancy is None:
+            current_occupancy = inventory.get_day_inventory(check_in, unit_type, self.db_path)['occupancy']
+        grid = self.optimize_rates(
+            check_in, 1, unit_types=[unit_type],
+            occupancy_scenarios=[current_occupancy],
+            length_of_stay=length_of_stay
+        )
+        return float(grid['optimal_rate'].iloc[0])
+
+    def optimize_rates(self, start, days, unit_types=None, occupancy_scenarios=None,
+                       length_of_stay=1, write=False):
+        """Precifica um horizonte inteiro de uma vez.
+
+        Sem ``occupancy_scenarios`` usa a ocupação real de cada data e tipo
+        (``inventory``); com uma lista de cenários (0-1) gera uma linha por
+        data × tipo × cenário. ``length_of_stay`` aplica o desconto de estadias
+        longas. ``write=True`` grava as tarifas em ``rates``.
+        """
+        if write and length_of_stay != 1:
+            raise ValueError("Tarifas gravadas em rates são por noite avulsa (length_of_stay=1)")
+        end = start + timedelta(days=days)
+        if unit_types is None:
+            unit_types = self._get_unit_types()
+        unit_types = list(unit_types)
+
+        grid = pd.MultiIndex.from_product(
+            [pd.date_range(start, periods=days, freq='D'), unit_types],
+            names=['date', 'unit_type']
+        ).to_frame(index=False)
+
+        base_rates = self._get_base_rates(start, end, unit_types)
+        grid = grid.merge(base_rates, on=['date', 'unit_type'], how='left')
+        defaults = grid['unit_type'].map(DEFAULT_BASE_RATES).fillna(FALLBACK_BASE_RATE)
+        grid['base_rate'] = grid['base_rate'].astype(float).fillna(defaults)
+
+        if occupancy_scenarios is None:
+            occupancy = self._get_actual_occupancy(start, end, unit_types)
+            grid = grid.merge(occupancy, on=['date', 'unit_type'], how='left')
+            grid['occupancy'] = grid['occupancy'].astype(float).fillna(0.0)
+        else:
+            scenarios = pd.DataFrame({'occupancy': list(occupancy_scenarios)})
+            grid = grid.merge(scenarios, how='cross')
+
+        demand = forecast.get_forecast(start, days, unit_types, db_path=self.db_path)
+        grid = grid.merge(
+            demand[['date', 'unit_type', 'expected_occupancy']], on=['date', 'unit_type'], how='left'
+        )
+
+        dates = grid['date']
+        factors = (
+            self._season_factor(dates.dt.month.to_numpy())
+            * self._demand_factor(grid['expected_occupancy'].to_numpy(dtype=float))
+            * self._occupancy_factor(grid['occupancy'].to_numpy())
+            * np.where(dates.dt.weekday.to_numpy() >= 5, WEEKEND_FACTOR, 1.0)
+            * self._length_of_stay_factor(length_of_stay)
+        )
+        grid['optimal_rate'] = np.round(grid['base_rate'].to_numpy() * factors, 2)
+
+        if write:
+            self.write_rates(grid)
+        return grid
+
+    def write_rates(self, grid):
+        """Grava as tarifas calculadas em ``rates`` numa única transação"""
+        if grid.duplicated(['date', 'unit_type']).any():
+            raise ValueError("Grade com mais de um cenário por data; escolha um cenário antes de gravar")
+        rows = zip(
+            grid['unit_type'],
+            grid['date'].dt.strftime('%Y-%m-%d'),
+            grid['optimal_rate'].astype(float),
+            grid['base_rate'].astype(float)
+        )
+        # A tarifa base é preservada: otimizar de novo não acumula os fatores.
+        # Datas novas recebem a disponibilidade do inventário (trigger de rates)
+        with database.transaction(self.db_path, immediate=True) as conn:
+            conn.executemany("""
+                INSERT INTO rates (unit_type, date, rate, base_rate) VALUES (?, ?, ?, ?)
+                ON CONFLICT (unit_type, date) DO UPDATE SET
+                    rate = excluded.rate,
+                    base_rate = COALESCE(rates.base_rate, rates.rate)
+            """, rows)
+
+    def _get_unit_types(self):
+        with database.connection(self.db_path) as conn:
+            rows = conn.execute("SELECT DISTINCT type FROM units ORDER BY type").fetchall()
+        return [row[0] for row in rows]
+
+    def _get_base_rates(self, start, end, unit_types):
+        """Tarifas base do período (uma consulta de intervalo)"""
+        with database.connection(self.db_path) as conn:
+            rates = pd.read_sql_query(f"""
+                SELECT date, unit_type, COALESCE(base_rate, rate) AS base_rate FROM rates
+                WHERE date >= ? AND date < ?
+                AND unit_type IN ({','.join('?' * len(unit_types))})
+            """, conn, params=[start.isoformat(), end.isoformat(), *unit_types], parse_dates=['date'])
+        return rates
+
+    def _get_actual_occupancy(self, start, end, unit_types):
+        """Ocupação (0-1) por data e tipo a partir do inventário"""
+        occupancy = inventory.get_inventory(start, end, unit_types, db_path=self.db_path)
+        return occupancy[['date', 'unit_type', 'occupancy']]
+
+    def _season_factor(self, months):
+        """Fator de ajuste sazonal"""
+        return SEASON_FACTORS[months]
+
+    def _demand_factor(self, expected_occupancy):
+        """Fator baseado na ocupação prevista (neutro para datas sem previsão)"""
+        factor = np.interp(expected_occupancy, *DEMAND_CURVE)
+        return np.where(np.isnan(expected_occupancy), 1.0, factor)
+
+    def _length_of_stay_factor(self, nights):
+        """Fator de desconto para estadias longas"""
+        return float(np.interp(nights, *LENGTH_OF_STAY_CURVE))
+
+    def _occupancy_factor(self, occupancy_rate):
+        """Fator baseado na ocupação atual"""
+        return np.select(
+            [occupancy_rate >= 0.9, occupancy_rate >= 0.7, occupancy_rate >= 0.5],
+            [1.6, 1.3, 1.1],  # Muito alta, alta, média
+            default=0.95  # Ocupação baixa
+        )
+
+
+@cached('rates')
+def get_rate_trend(start, days, unit_types=None, db_path=database.DEFAULT_DB_PATH):
+    """Tarifas cadastradas por data e tipo de unidade"""
+    query = "SELECT date, unit_type, rate FROM rates WHERE date >= ? AND date < ?"
+    params = [start.isoformat(), (start + timedelta(days=days)).isoformat()]
+    if unit_types is not None:
+        unit_types = list(unit_types)
+        query += f" AND unit_type IN ({','.join('?' * len(unit_types))})"
+        params.extend(unit_types)
+    with database.connection(db_path) as conn:
+        return pd.read_sql_query(query + " ORDER BY date, unit_type", conn, params=params, parse_dates=['date'])
+
+
+def extend_rate_horizon(today, days=365, db_path=database.DEFAULT_DB_PATH):
+    """Cadastra as tarifas que faltam de ``today`` até ``days`` dias à frente.
+
+    A tarifa de uma data nova repete a base do mesmo dia da semana 52
+    semanas antes ou, sem histórico, a tarifa padrão do tipo. Retorna o
+    número de datas criadas.
+    """
+    defaults = ' UNION ALL '.join('SELECT ?, ?' for _ in DEFAULT_BASE_RATES)
+    with database.transaction(db_path, immediate=True) as conn:
+        cur = conn.execute(f"""
+            INSERT INTO rates (unit_type, date, rate, base_rate)
+            WITH types AS (SELECT DISTINCT type FROM units),
+                 defaults (unit_type, rate) AS ({defaults}),
+                 missing AS (
+                     SELECT t.type AS unit_type, date(?, '+' || o.n || ' days') AS day
+                     FROM types t, day_offsets o
+                     WHERE o.n < ?
+                     AND NOT EXISTS (
+                         SELECT 1 FROM rates r WHERE r.unit_type = t.type AND r.date = date(?, '+' || o.n || ' days')
+                     )
+                 ),
+                 priced AS (
+                     SELECT m.unit_type, m.day, COALESCE(
+                         (SELECT COALESCE(p.base_rate, p.rate) FROM rates p
+                          WHERE p.unit_type = m.unit_type AND p.date = date(m.day, '-364 days')),
+                         (SELECT d.rate FROM defaults d WHERE d.unit_type = m.unit_type),
+                         ?
+                     ) AS rate
+                     FROM missing m
+                 )
+            SELECT unit_type, day, rate, rate FROM priced
+        """, (
+            *(value for item in DEFAULT_BASE_RATES.items() for value in item),
+            today.isoformat(), days, today.isoformat(), FALLBACK_BASE_RATE,
+        ))
+    return cur.rowcount
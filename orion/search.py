@@ -0,0 +1,161 @@
+"""Busca de disponibilidade com cotação da estadia completa.
+
+Uma busca faz duas consultas: as unidades livres e com capacidade para o
+grupo (conflitos checados no índice por unidade) e as tarifas/restrições das
+noites da estadia. Restrições são avaliadas por tipo de unidade:
+
+- ``stop_sell`` em qualquer noite fecha a venda;
+- ``availability`` (estoque liberado) precisa ser positivo em todas as noites;
+- ``min_stay``, ``max_stay`` e ``cutof_days`` valem pela data de chegada.
+
+``cutof_days`` (antecedência mínima) restringe só as vendas dos canais
+(``channel=True``); a recepção vende até o próprio dia da chegada.
+"""
+from datetime import date
+
+import pandas as pd
+
+from orion import database
+from orion.availability import ACTIVE_STATUSES, OUT_OF_SERVICE_STATUSES
+
+RESULT_COLUMNS = [
+    'unit_id', 'code', 'name', 'type', 'capacity', 'max_capacity',
+    'nights', 'total_price', 'average_rate', 'units_left'
+]
+
+
+def _placeholders(values):
+    return ','.join('?' * len(values))
+
+
+def _load_free_units(conn, check_in, check_out, guests, unit_types, unit_ids):
+    query = f"""
+        SELECT u.id, u.code, u.name, u.type, u.capacity, u.max_capacity, u.base_rate
+        FROM units u
+        WHERE u.max_capacity >= ?
+        AND u.status NOT IN ({_placeholders(OUT_OF_SERVICE_STATUSES)})
+        AND NOT EXISTS (
+            SELECT 1 FROM reservations r
+            WHERE r.unit_id = u.id
+            AND r.check_out > ? AND r.check_in < ?
+            AND r.status IN ({_placeholders(ACTIVE_STATUSES)})
+        )
+    """
+    params = [guests, *OUT_OF_SERVICE_STATUSES, check_in.isoformat(), check_out.isoformat(), *ACTIVE_STATUSES]
+    if unit_types is not None:
+        unit_types = list(unit_types)
+        query += f" AND u.type IN ({_placeholders(unit_types)})"
+        params.extend(unit_types)
+    if unit_ids is not None:
+        unit_ids = list(unit_ids)
+        query += f" AND u.id IN ({_placeholders(unit_ids)})"
+        params.extend(unit_ids)
+    return conn.execute(query + " ORDER BY u.type, u.code", params).fetchall()
+
+
+def _load_stay_rates(conn, check_in, check_out, unit_types):
+    rows = conn.execute("""
+        SELECT unit_type, date, rate, min_stay, max_stay, stop_sell, cutof_days, availability
+        FROM rates
+        WHERE date >= ? AND date < ?
+    """, (check_in.isoformat(), check_out.isoformat())).fetchall()
+
+    by_type = {}
+    for unit_type, day, rate, min_stay, max_stay, stop_sell, cutoff, allotment in rows:
+        if unit_types is None or unit_type in unit_types:
+            by_type.setdefault(unit_type, []).append(
+                (str(day)[:10], rate, min_stay, max_stay, stop_sell, cutoff, allotment)
+            )
+    return by_type
+
+
+def _evaluate_type(nightly, check_in, nights, lead_days):
+    """Retorna (soma das tarifas, noites tarifadas, estoque) ou None se fechado.
+
+    ``lead_days`` None ignora o ``cutof_days`` (venda da recepção).
+    """
+    arrival = check_in.isoformat()
+    total, priced, allotment = 0.0, 0, None
+    for day, rate, min_stay, max_stay, stop_sell, cutoff, available in nightly:
+        if stop_sell:
+            return None
+        if available is not None:
+            if available <= 0:
+                return None
+            allotment = available if allotment is None else min(allotment, available)
+        if day == arrival:
+            if min_stay and nights < min_stay:
+                return None
+            if max_stay and nights > max_stay:
+                return None
+            if cutoff and lead_days is not None and lead_days < cutoff:
+                return None
+        total += float(rate)
+        priced += 1
+    return total, priced, allotment
+
+
+def price_stay(conn, unit_type, base_rate, check_in, check_out, today=None, channel=False):
+    """Preço total de uma estadia num tipo de unidade (None se fechada para venda)"""
+    nights = (check_out - check_in).days
+    lead_days = (check_in - (today or date.today())).days
+    if nights <= 0 or lead_days < 0:
+        return None
+    rates = _load_stay_rates(conn, check_in, check_out, [unit_type])
+    quote = _evaluate_type(rates.get(unit_type, ()), check_in, nights, lead_days if channel else None)
+    if quote is None:
+        return None
+    total, priced, _ = quote
+    return round(total + (nights - priced) * float(base_rate), 2)
+
+
+def search_availability(check_in, check_out, adults, children=0, unit_types=None,
+                        unit_ids=None, today=None, channel=False, db_path=database.DEFAULT_DB_PATH):
+    """Lista as unidades reserváveis para a estadia com o preço total"""
+    nights = (check_out - check_in).days
+    if nights <= 0:
+        return pd.DataFrame(columns=RESULT_COLUMNS)
+    lead_days = (check_in - (today or date.today())).days
+    if lead_days < 0:
+        return pd.DataFrame(columns=RESULT_COLUMNS)
+
+    with database.connection(db_path) as conn:
+        units = _load_free_units(conn, check_in, check_out, adults + children, unit_types, unit_ids)
+        if not units:
+            return pd.DataFrame(columns=RESULT_COLUMNS)
+        rates = _load_stay_rates(conn, check_in, check_out, unit_types)
+
+    # Restrições avaliadas uma vez por tipo; unidades do tipo herdam o resultado
+    evaluated = {}
+    free_by_type = {}
+    for unit in units:
+        free_by_type[unit[3]] = free_by_type.get(unit[3], 0) + 1
+
+    results = []
+    for unit_id, code, name, unit_type, capacity, max_capacity, base_rate in units:
+        if unit_type not in evaluated:
+            evaluated[unit_type] = _evaluate_type(
+                rates.get(unit_type, ()), check_in, nights, lead_days if channel else None
+            )
+        quote = evaluated[unit_type]
+        if quote is None:
+            continue
+        total, priced, allotment = quote
+        # Noites sem tarifa cadastrada usam a tarifa base da unidade
+        total_price = round(total + (nights - priced) * float(base_rate), 2)
+        units_left = free_by_type[unit_type] if allotment is None else min(allotment, free_by_type[unit_type])
+        results.append((
+            unit_id, code, name, unit_type, capacity, max_capacity,
+            nights, total_price, round(total_price / nights, 2), units_left
+        ))
+    return pd.DataFrame(results, columns=RESULT_COLUMNS)
+
+
+def quote_stay(unit_id, check_in, check_out, adults, children=0, today=None, channel=False,
+               db_path=database.DEFAULT_DB_PATH):
+    """Cotação de uma unidade específica (None se não estiver reservável)"""
+    results = search_availability(
+        check_in, check_out, adults, children, unit_ids=[unit_id], today=today, channel=channel,
+        db_path=db_path
+    )
+    return None if results.empty else results.iloc[0].to_dict()
@@ -0,0 +1,272 @@
+"""Snapshots em Parquet e importação em lote de feeds de reservas e tarifas.
+
+A exportação lê cada tabela em blocos (``fetchmany``) dentro de uma única
+transação de leitura, de modo que todas as tabelas refletem o mesmo
+instante, e grava Parquet particionado por mês no layout Hive
+(``tabela/month=AAAA-MM/part-0.parquet``), legível por pyarrow, pandas,
+DuckDB ou Spark. A memória usada é limitada ao tamanho do bloco.
+
+A importação lê Parquet (arquivo ou diretório particionado) ou CSV em lotes
+via ``pyarrow.dataset`` e grava com ``executemany`` em transações grandes,
+confirmadas a cada ``COMMIT_ROWS`` linhas. Os triggers do schema seguem
+valendo: estatísticas diárias e versões são mantidas e o overbooking
+continua bloqueado.
+"""
+import json
+import os
+import shutil
+from datetime import datetime
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from orion import database
+
+# Tabela: coluna usada para particionar por mês (None = arquivo único)
+SNAPSHOT_TABLES = {
+    'reservations': 'check_in',
+    'rates': 'date',
+    'guests': 'created_at',
+    'units': None,
+}
+CHUNK_ROWS = 50_000
+COMMIT_ROWS = 500_000
+MANIFEST_FILE = "_manifest.json"
+
+# Feeds aceitos: colunas obrigatórias e chave de upsert
+IMPORT_TABLES = {
+    'reservations': {'required': ('unit_id', 'check_in', 'check_out', 'source', 'rate'),
+                     'key': ('confirmation_code',)},
+    'rates': {'required': ('unit_type', 'date', 'rate'),
+              'key': ('unit_type', 'date'),
+              # Tarifa importada passa a ser a base da próxima otimização
+              'reset': ('base_rate',)},
+}
+
+
+def _arrow_type(declared):
+    """Tipo Arrow para o tipo declarado da coluna no SQLite"""
+    declared = (declared or '').upper()
+    if declared.startswith('INTEGER'):
+        return pa.int64()
+    if declared.startswith(('DECIMAL', 'REAL', 'NUMERIC')):
+        return pa.float64()
+    if declared.startswith('BOOLEAN'):
+        return pa.bool_()
+    if declared.startswith('DATE'):
+        return pa.date32()
+    return pa.string()
+
+
+def _table_columns(conn, table):
+    return [(row[1], row[2]) for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def _table_schema(conn, table):
+    return pa.schema([(name, _arrow_type(declared)) for name, declared in _table_columns(conn, table)])
+
+
+def _record_batch(rows, schema):
+    """Converte linhas do cursor num RecordBatch com o schema da tabela"""
+    columns = list(zip(*rows))
+    arrays = []
+    for field, values in zip(schema, columns):
+        if pa.types.is_date32(field.type):
+            # Datas ficam como texto ISO no SQLite
+            arrays.append(pc.cast(pa.array(values, pa.string()), field.type))
+        elif pa.types.is_boolean(field.type):
+            arrays.append(pa.array([None if v is None else bool(v) for v in values], field.type))
+        else:
+            arrays.append(pa.array(values, field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def _export_table(conn, table, partition_column, destination, chunk_rows):
+    schema = _table_schema(conn, table)
+    table_dir = os.path.join(destination, table)
+    os.makedirs(table_dir, exist_ok=True)
+
+    if partition_column:
+        # Ordenado pela coluna de partição: cada mês é gravado de uma vez
+        cur = conn.execute(f"""
+            SELECT *, COALESCE(substr({partition_column}, 1, 7), 'unknown') AS month
+            FROM {table} ORDER BY {partition_column}, id
+        """)
+    else:
+        cur = conn.execute(f"SELECT *, NULL AS month FROM {table} ORDER BY id")
+
+    writer, current_month, total = None, object(), 0
+    try:
+        while True:
+            rows = cur.fetchmany(chunk_rows)
+            if not rows:
+                break
+            total += len(rows)
+            start = 0
+            # Divide o bloco nas fronteiras de mês
+            for end in range(1, len(rows) + 1):
+                if end < len(rows) and rows[end][-1] == rows[start][-1]:
+                    continue
+                month = rows[start][-1]
+                if month != current_month:
+                    if writer is not None:
+                        writer.close()
+                    path = table_dir if month is None else os.path.join(table_dir, f"month={month}")
+                    os.makedirs(path, exist_ok=True)
+                    writer = pq.ParquetWriter(os.path.join(path, "part-0.parquet"), schema, compression='zstd')
+                    current_month = month
+                writer.write_batch(_record_batch([row[:-1] for row in rows[start:end]], schema))
+                start = end
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if total == 0:
+        # Tabela vazia: arquivo com o schema, para manter o snapshot completo
+        pq.write_table(schema.empty_table(), os.path.join(table_dir, "part-0.parquet"))
+    return total
+
+
+def export_snapshot(destination, tables=None, chunk_rows=CHUNK_ROWS, db_path=database.DEFAULT_DB_PATH):
+    """Exporta as tabelas para Parquet particionado por mês; retorna o manifesto"""
+    tables = list(tables or SNAPSHOT_TABLES)
+    unknown = set(tables) - set(SNAPSHOT_TABLES)
+    if unknown:
+        raise ValueError(f"Tabelas não suportadas no snapshot: {', '.join(sorted(unknown))}")
+
+    for table in tables:
+        shutil.rmtree(os.path.join(destination, table), ignore_errors=True)
+    os.makedirs(destination, exist_ok=True)
+
+    manifest = {'created_at': datetime.now().isoformat(timespec='seconds'), 'tables': {}}
+    with database.connection(db_path) as conn:
+        # Uma transação de leitura: todas as tabelas no mesmo instante (WAL)
+        conn.execute("BEGIN")
+        try:
+            manifest['schema_version'] = conn.execute("PRAGMA user_version").fetchone()[0]
+            for table in tables:
+                manifest['tables'][table] = {
+                    'rows': _export_table(conn, table, SNAPSHOT_TABLES[table], destination, chunk_rows),
+                    'partitioned_by': SNAPSHOT_TABLES[table],
+                }
+        finally:
+            conn.execute("COMMIT")
+
+    with open(os.path.join(destination, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def read_snapshot(source, table, columns=None, filter=None):
+    """Lê uma tabela do snapshot como pyarrow.Table (com filtro/projeção opcionais)"""
+    dataset = ds.dataset(os.path.join(source, table), format='parquet', partitioning='hive')
+    return dataset.to_table(columns=columns, filter=filter)
+
+
+def _open_feed(path, file_format=None):
+    if file_format is None:
+        file_format = 'csv' if str(path).lower().endswith('.csv') else 'parquet'
+    if file_format not in ('csv', 'parquet'):
+        raise ValueError(f"Formato não suportado: {file_format}")
+    partitioning = 'hive' if file_format == 'parquet' and os.path.isdir(path) else None
+    return ds.dataset(path, format=file_format, partitioning=partitioning)
+
+
+def _python_columns(batch):
+    """Colunas do lote como listas Python nos tipos gravados pelo SQLite"""
+    columns = []
+    for column in batch.columns:
+        if pa.types.is_date(column.type):
+            column = pc.cast(column, pa.string())
+        elif pa.types.is_timestamp(column.type):
+            column = pc.strftime(column, format='%Y-%m-%d %H:%M:%S')
+        elif pa.types.is_decimal(column.type):
+            column = pc.cast(column, pa.float64())
+        columns.append(column.to_pylist())
+    return columns
+
+
+def import_feed(path, table, upsert=False, file_format=None, batch_size=CHUNK_ROWS,
+                commit_rows=COMMIT_ROWS, db_path=database.DEFAULT_DB_PATH):
+    """Importa um feed de reservas ou tarifas (Parquet ou CSV) em lotes.
+
+    Só as colunas existentes na tabela são gravadas (``id`` é ignorado). Com
+    ``upsert`` as linhas com a mesma chave (código de confirmação ou
+    tipo/data da tarifa) são atualizadas em vez de recusadas. Retorna o
+    total de linhas gravadas.
+    """
+    if table not in IMPORT_TABLES:
+        raise ValueError(f"Importação não suportada para a tabela {table}")
+    spec = IMPORT_TABLES[table]
+    dataset = _open_feed(path, file_format)
+
+    with database.connection(db_path) as conn:
+        table_columns = [name for name, _ in _table_columns(conn, table) if name != 'id']
+    columns = [name for name in dataset.schema.names if name in table_columns]
+    missing = [name for name in spec['required'] if name not in columns]
+    if missing:
+        raise ValueError(f"Colunas obrigatórias ausentes no feed: {', '.join(missing)}")
+
+    sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+    if upsert:
+        key = [name for name in spec['key'] if name in columns]
+        if len(key) != len(spec['key']):
+            raise ValueError(f"Upsert requer as colunas {', '.join(spec['key'])}")
+        updates = [f"{name} = excluded.{name}" for name in columns if name not in key]
+        updates += [f"{name} = NULL" for name in spec.get('reset', ()) if name not in columns]
+        updates = ', '.join(updates)
+        sql += f" ON CONFLICT ({', '.join(key)}) DO UPDATE SET {updates}"
+
+    total = 0
+    batches = dataset.to_batches(columns=columns, batch_size=batch_size)
+    with database.connection(db_path) as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            pending = 0
+            for batch in batches:
+                if batch.num_rows == 0:
+                    continue
+                conn.executemany(sql, zip(*_python_columns(batch)))
+                total += batch.num_rows
+                pending += batch.num_rows
+                if pending >= commit_rows:
+                    conn.execute("COMMIT")
+                    conn.execute("BEGIN IMMEDIATE")
+                    pending = 0
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+    return total
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Snapshots Parquet e importação em lote do Orion PMS")
+    parser.add_argument("--db", default=database.DEFAULT_DB_PATH)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export = commands.add_parser("export", help="Exporta um snapshot Parquet")
+    export.add_argument("destination")
+    export.add_argument("--tables", nargs='*', choices=sorted(SNAPSHOT_TABLES))
+
+    feed = commands.add_parser("import", help="Importa um feed Parquet/CSV")
+    feed.add_argument("path")
+    feed.add_argument("--table", required=True, choices=sorted(IMPORT_TABLES))
+    feed.add_argument("--upsert", action="store_true")
+    feed.add_argument("--format", choices=['csv', 'parquet'])
+
+    args = parser.parse_args(argv)
+    if args.command == "export":
+        print(json.dumps(export_snapshot(args.destination, args.tables, db_path=args.db), indent=2))
+    else:
+        rows = import_feed(args.path, args.table, upsert=args.upsert, file_format=args.format, db_path=args.db)
+        print(f"{rows} linhas importadas em {args.table}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
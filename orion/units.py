@@ -0,0 +1,19 @@
+"""Consultas de unidades habitacionais compartilhadas pelos módulos."""
+from orion import database, frames
+from orion.cache import cached
+
+UNIT_COLUMNS = ['id', 'code', 'name', 'type', 'floor', 'status', 'base_rate']
+
+
+@cached('units')
+def get_units(db_path=database.DEFAULT_DB_PATH):
+    """Unidades cadastradas, ordenadas pelo código"""
+    with database.connection(db_path) as conn:
+        return frames.read_frame(conn, f"SELECT {', '.join(UNIT_COLUMNS)} FROM units ORDER BY code")
+
+
+@cached('units')
+def get_unit_codes(db_path=database.DEFAULT_DB_PATH):
+    """Unidades cadastradas como {id: código}"""
+    with database.connection(db_path) as conn:
+        return dict(conn.execute("SELECT id, code FROM units ORDER BY code").fetchall())
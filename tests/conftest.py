@@ -0,0 +1,16 @@
+import pytest
+
+from orion import database
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """Banco novo (schema e dados de demonstração) num diretório temporário"""
+    path = str(tmp_path / "orion.db")
+    database.get_pool(path)
+    yield path
+    database.get_pool(path).close_all()
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "slow: testes demorados (ex.: app num subprocesso); -m 'not slow' os pula")
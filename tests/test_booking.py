@@ -0,0 +1,60 @@
+"""Garantia de não haver overbooking no motor de reservas."""
+import threading
+from datetime import date, timedelta
+
+import pytest
+
+from orion import booking
+
+
+def test_stress_has_no_overbooking(db_path):
+    result = booking.run_booking_stress(threads=8, attempts_per_thread=25, db_path=db_path, seed=1)
+    assert result['booked'] > 0
+    assert result['conflicts'] > 0
+    assert result['overbookings'] == 0
+    assert booking.count_overbookings(db_path) == 0
+
+
+def test_overlapping_stay_raises_unit_unavailable(db_path):
+    check_in = date.today() + timedelta(days=30)
+    booking.create_reservation(1, check_in, check_in + timedelta(days=3), 'Direto', db_path=db_path)
+
+    with pytest.raises(booking.UnitUnavailableError):
+        booking.create_reservation(1, check_in + timedelta(days=2), check_in + timedelta(days=5), 'Direto',
+                                   db_path=db_path)
+    # Check-in no dia do check-out anterior não é conflito
+    booking.create_reservation(1, check_in + timedelta(days=3), check_in + timedelta(days=4), 'Direto',
+                               db_path=db_path)
+    assert booking.count_overbookings(db_path) == 0
+
+
+def test_concurrent_requests_for_same_stay_book_once(db_path):
+    check_in = date.today() + timedelta(days=30)
+    barrier = threading.Barrier(8)
+    outcomes = []
+
+    def attempt():
+        barrier.wait()
+        try:
+            booking.create_reservation(1, check_in, check_in + timedelta(days=2), 'Direto', db_path=db_path)
+            outcomes.append('booked')
+        except booking.UnitUnavailableError:
+            outcomes.append('conflict')
+
+    threads = [threading.Thread(target=attempt) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(outcomes) == ['booked'] + ['conflict'] * 7
+    assert booking.count_overbookings(db_path) == 0
+
+
+def test_cancelled_stay_frees_the_unit(db_path):
+    check_in = date.today() + timedelta(days=30)
+    check_out = check_in + timedelta(days=2)
+    reservation = booking.create_reservation(1, check_in, check_out, 'Direto', db_path=db_path)
+
+    assert booking.cancel_reservation(reservation['id'], db_path=db_path)
+    booking.create_reservation(1, check_in, check_out, 'Direto', db_path=db_path)
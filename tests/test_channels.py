@@ -0,0 +1,69 @@
+"""Feed de ARI: coalescência, entrega com novas tentativas e descarte."""
+from datetime import date, timedelta
+
+from orion import channels, database
+
+DAY = date.today() + timedelta(days=30)
+
+
+def _change(days, rate, unit_type='Luxo'):
+    return (unit_type, (DAY + timedelta(days=days)).isoformat(), rate, 5, 1, 30, 0, 0)
+
+
+def _reprice(db_path, days, rate):
+    with database.transaction(db_path, immediate=True) as conn:
+        conn.executemany("UPDATE rates SET rate = ? WHERE date = ?",
+                         [(rate, (DAY + timedelta(days=offset)).isoformat()) for offset in days])
+
+
+def _last_change(db_path):
+    with database.connection(db_path) as conn:
+        return conn.execute("SELECT MAX(id) FROM ari_changes").fetchone()[0]
+
+
+def test_coalesce_merges_adjacent_days():
+    updates = channels.coalesce([
+        _change(0, 300), _change(1, 100), _change(2, 100),
+        _change(0, 100),                 # vale a última alteração do dia
+        _change(4, 100),                 # lacuna: novo intervalo
+        _change(5, 100, 'Standard'),
+    ])
+
+    assert [(item['unit_type'], item['start'], item['end']) for item in updates] == [
+        ('Luxo', DAY.isoformat(), (DAY + timedelta(days=2)).isoformat()),
+        ('Luxo', (DAY + timedelta(days=4)).isoformat(), (DAY + timedelta(days=4)).isoformat()),
+        ('Standard', (DAY + timedelta(days=5)).isoformat(), (DAY + timedelta(days=5)).isoformat()),
+    ]
+    assert updates[0]['rate'] == 100.0 and updates[0]['stop_sell'] is False
+
+
+def test_publish_retries_after_retry_after_and_advances_cursor(db_path):
+    with channels.StubEndpoint(fail_first=1, retry_after=0) as endpoint:
+        publisher = channels.ChannelPublisher(endpoint.url, backoff=0, db_path=db_path)
+        publisher.full_sync()
+        endpoint.fail_first = 1
+        _reprice(db_path, range(3), 999)
+
+        last_change = _last_change(db_path)
+        assert publisher.pending() > 0
+        sent = publisher.publish()
+
+    assert endpoint.fail_first == 0          # a primeira tentativa foi recusada
+    assert sent == len(endpoint.batches[-1]['updates']) > 0
+    assert {update['rate'] for update in endpoint.batches[-1]['updates']} == {999.0}
+    assert publisher.pending() == 0
+    assert publisher.cursor() == last_change
+
+
+def test_prune_changes_keeps_undelivered(db_path):
+    _reprice(db_path, range(2), 111)
+    delivered = _last_change(db_path)
+    _reprice(db_path, range(2), 222)
+    with database.transaction(db_path, immediate=True) as conn:
+        conn.executemany("INSERT INTO ari_feed_state (channel, last_change_id) VALUES (?, ?)",
+                         [('a', delivered), ('b', delivered + 1_000_000)])
+        removed = channels.prune_changes(conn)
+        remaining = conn.execute("SELECT MIN(id), COUNT(*) FROM ari_changes").fetchone()
+
+    assert removed > 0
+    assert remaining[0] == delivered + 1 and remaining[1] > 0
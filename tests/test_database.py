@@ -0,0 +1,18 @@
+"""Pool de conexões."""
+import sqlite3
+
+import pytest
+
+from orion import database
+
+
+def test_exhausted_pool_raises_descriptive_error(db_path):
+    pool = database.ConnectionPool(db_path, size=1)
+    conn = pool.acquire()
+    try:
+        with pytest.raises(sqlite3.OperationalError, match="1 conexões em uso") as error:
+            pool.acquire(timeout=0.01)
+        assert db_path in str(error.value)
+    finally:
+        pool.release(conn)
+        pool.close_all()
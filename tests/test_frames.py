@@ -0,0 +1,20 @@
+"""Tipos compactos dos DataFrames."""
+import pandas as pd
+
+from orion import frames
+
+
+def test_compact_keeps_nulls_and_values_out_of_range():
+    frame = frames.compact(pd.DataFrame({
+        'id': [1, None, 3],
+        'children': [0, None, 2],
+        'adults': [1, 200, 2],       # não cabe em Int8
+        'nights': [1.5, 2.0, 3.0],   # fracionário
+        'status': ['confirmed', 'cancelled', 'confirmed'],
+    }))
+
+    assert str(frame['id'].dtype) == 'Int32' and frame['id'].isna().sum() == 1
+    assert str(frame['children'].dtype) == 'Int8'
+    assert frame['adults'].tolist() == [1, 200, 2]
+    assert frame['nights'].tolist() == [1.5, 2.0, 3.0]
+    assert frame['status'].dtype == 'category'
@@ -0,0 +1,30 @@
+"""Busca de hóspedes pelo índice FTS."""
+import pytest
+
+from orion import database, guests
+
+
+@pytest.fixture
+def guest_ids(db_path):
+    with database.transaction(db_path, immediate=True) as conn:
+        return [
+            conn.execute("""
+                INSERT INTO guests (first_name, last_name, email, phone, document_number)
+                VALUES (?, ?, ?, ?, ?)
+            """, guest).lastrowid
+            for guest in (
+                ('José', 'Conceição', 'jose@example.com', '11987654321', '12345678900'),
+                ('Joana', 'Silva', 'joana@example.com', '21912345678', '98765432100'),
+            )
+        ]
+
+
+@pytest.mark.parametrize('text', ['jose conceicao', 'JOSÉ', 'Concei', 'jo conc', '(11) 9876', '123456'])
+def test_search_is_accent_insensitive_and_matches_prefixes(db_path, guest_ids, text):
+    found = guests.search_guests(text, db_path=db_path)['id'].tolist()
+    assert guest_ids[0] in found
+    assert guest_ids[1] not in found
+
+
+def test_search_short_text_returns_nothing(db_path, guest_ids):
+    assert guests.search_guests('j', db_path=db_path).empty
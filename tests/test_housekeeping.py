@@ -0,0 +1,63 @@
+"""Distribuição das tarefas de housekeeping entre camareiras."""
+from datetime import date, timedelta
+
+import pytest
+
+from orion import booking, database, housekeeping
+
+ARRIVAL, NORMAL = housekeeping.PRIORITY_ARRIVAL, housekeeping.PRIORITY_NORMAL
+
+
+def _task(task_id, minutes, priority=NORMAL):
+    return {'id': task_id, 'estimated_time': minutes, 'priority': priority}
+
+
+def test_priority_first_then_longest_task():
+    tasks = [_task(1, 20), _task(2, 60), _task(3, 30, ARRIVAL), _task(4, 40), _task(5, 10, ARRIVAL)]
+
+    plan = housekeeping.schedule_tasks(tasks, ['Ana', 'Bia'])
+
+    # Prioritárias começam no início do turno, a mais longa com a primeira camareira
+    assert plan[3] == ('Ana', 0, 30)
+    assert plan[5] == ('Bia', 0, 10)
+    # Depois as demais, da mais longa para a mais curta, sempre com quem fica livre antes
+    assert plan[2] == ('Bia', 10, 70)
+    assert plan[4] == ('Ana', 30, 70)
+    assert plan[1] == ('Ana', 70, 90)
+
+
+def test_longest_first_balances_the_shift():
+    tasks = [_task(task_id, minutes) for task_id, minutes in enumerate([10, 10, 10, 10, 40, 40], start=1)]
+
+    plan = housekeeping.schedule_tasks(tasks, ['Ana', 'Bia'])
+
+    assert max(end for _, _, end in plan.values()) == 60
+    assert {name for name, _, _ in plan.values()} == {'Ana', 'Bia'}
+
+
+def test_tasks_without_estimate_take_the_minimum():
+    plan = housekeeping.schedule_tasks([_task(1, None)], ['Ana'])
+    assert plan[1] == ('Ana', 0, housekeeping.MIN_TASK_MINUTES)
+
+
+def test_requires_an_attendant():
+    with pytest.raises(ValueError):
+        housekeeping.schedule_tasks([_task(1, 30)], [])
+
+
+def test_plan_day_cleans_arrival_units_first(db_path):
+    day = date.today() + timedelta(days=30)
+    with database.transaction(db_path, immediate=True) as conn:
+        conn.execute("UPDATE units SET next_maintenance = NULL")  # só a unidade 4, em manutenção
+    booking.create_reservation(1, day - timedelta(days=2), day, 'Direto', db_path=db_path)
+    booking.create_reservation(1, day, day + timedelta(days=2), 'Direto', db_path=db_path)
+    booking.create_reservation(2, day - timedelta(days=2), day, 'Direto', db_path=db_path)
+
+    tasks = housekeeping.plan_day(day, ['Ana'], db_path=db_path).sort_values('scheduled_start')
+
+    # 101 recebe hóspede no dia; a manutenção da 202 (60 min) vem antes da saída da 102 (30 min)
+    assert list(zip(tasks['unit_code'], tasks['task_type'], tasks['priority'])) == [
+        ('101', 'checkout', ARRIVAL), ('202', 'maintenance', NORMAL), ('102', 'checkout', NORMAL),
+    ]
+    assert tasks['scheduled_start'].iloc[0].hour == housekeeping.DEFAULT_SHIFT_START.hour
+    assert (tasks['scheduled_start'].iloc[1:].to_numpy() == tasks['scheduled_end'].iloc[:-1].to_numpy()).all()
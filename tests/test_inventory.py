@@ -0,0 +1,31 @@
+"""Inventário mantido por triggers: sem divergência do recálculo."""
+from datetime import date, timedelta
+
+from orion import booking, database, inventory
+
+
+def test_no_drift_after_booking_and_cancelling(db_path):
+    check_in = date.today() + timedelta(days=5)
+    kept = booking.create_reservation(1, check_in, check_in + timedelta(days=3), 'Direto', db_path=db_path)
+    cancelled = booking.create_reservation(3, check_in, check_in + timedelta(days=4), 'Direto', db_path=db_path)
+    booking.cancel_reservation(cancelled['id'], db_path=db_path)
+
+    assert inventory.verify_inventory(db_path=db_path).empty
+    day = inventory.get_day_inventory(check_in + timedelta(days=1), 'Standard', db_path=db_path)
+    assert day['rooms_sold'] == 1
+    assert inventory.get_day_inventory(check_in + timedelta(days=1), 'Luxo', db_path=db_path)['rooms_sold'] == 0
+
+    booking.cancel_reservation(kept['id'], db_path=db_path)
+    assert inventory.verify_inventory(db_path=db_path).empty
+    assert inventory.get_day_inventory(check_in + timedelta(days=1), 'Standard', db_path=db_path)['rooms_sold'] == 0
+
+
+def test_rebuild_fixes_tampered_rows(db_path):
+    check_in = date.today() + timedelta(days=5)
+    booking.create_reservation(1, check_in, check_in + timedelta(days=2), 'Direto', db_path=db_path)
+    with database.transaction(db_path, immediate=True) as conn:
+        conn.execute("UPDATE inventory SET rooms_sold = rooms_sold + 5 WHERE inv_date = ?", (check_in.isoformat(),))
+
+    assert not inventory.verify_inventory(db_path=db_path).empty
+    assert inventory.rebuild_inventory(db_path=db_path) > 0
+    assert inventory.verify_inventory(db_path=db_path).empty
@@ -0,0 +1,65 @@
+"""Agendador: leases, novas tentativas e histórico de execuções."""
+from datetime import datetime, time, timedelta
+
+from orion import database, jobs
+
+NOW = datetime(2026, 3, 10, 12, 0)
+
+
+def _runs(db_path, job):
+    with database.connection(db_path) as conn:
+        return conn.execute("SELECT status FROM job_runs WHERE job = ? ORDER BY id", (job,)).fetchall()
+
+
+def test_periodic_jobs_run_on_first_tick_daily_jobs_wait(db_path):
+    ran = []
+    scheduler = jobs.Scheduler(jobs=[
+        jobs.Job('every', lambda db, today: ran.append('every'), every=60),
+        jobs.Job('daily', lambda db, today: ran.append('daily'), at=time(2, 0)),
+    ], db_paths=[db_path])
+
+    assert scheduler.run_pending(NOW) == [(db_path, 'every', 'ok')]
+    assert ran == ['every']
+    with database.connection(db_path) as conn:
+        next_run = conn.execute("SELECT next_run_at FROM job_state WHERE job = 'daily'").fetchone()[0]
+    assert next_run == '2026-03-11 02:00:00'
+
+    assert scheduler.run_job('daily', db_path, now=datetime(2026, 3, 11, 2, 0, 30)) == 'ok'
+    assert ran == ['every', 'daily']
+
+
+def test_held_lease_blocks_second_owner(db_path):
+    other = jobs.Scheduler(jobs=[], db_paths=[db_path])
+    inner = []
+
+    def job(db, today):
+        # Enquanto a rotina roda, outro agendador não consegue reservá-la
+        inner.append(other.run_job('job', db, now=NOW, force=True))
+
+    scheduler = jobs.Scheduler(jobs=[jobs.Job('job', job, every=60)], db_paths=[db_path])
+    other.jobs = scheduler.jobs
+
+    assert scheduler.run_job('job', db_path, now=NOW) == 'ok'
+    assert inner == [None]
+    assert len(_runs(db_path, 'job')) == 1
+
+
+def test_failed_job_is_retried_after_retry_seconds(db_path):
+    def fail(db, today):
+        raise RuntimeError("falha")
+
+    scheduler = jobs.Scheduler(jobs=[jobs.Job('fail', fail, every=86400)], db_paths=[db_path])
+
+    assert scheduler.run_job('fail', db_path, now=NOW) == 'failed'
+    assert scheduler.run_job('fail', db_path, now=NOW + timedelta(seconds=jobs.RETRY_SECONDS - 1)) is None
+    assert scheduler.run_job('fail', db_path, now=NOW + timedelta(seconds=jobs.RETRY_SECONDS + 1)) == 'failed'
+    assert _runs(db_path, 'fail') == [('failed',), ('failed',)]
+
+
+def test_job_runs_trimmed_to_history(db_path, monkeypatch):
+    monkeypatch.setattr(jobs, 'HISTORY_RUNS', 3)
+    scheduler = jobs.Scheduler(jobs=[jobs.Job('job', lambda db, today: None, every=60)], db_paths=[db_path])
+
+    for minute in range(5):
+        assert scheduler.run_job('job', db_path, now=NOW + timedelta(minutes=minute)) == 'ok'
+    assert len(_runs(db_path, 'job')) == 3
@@ -0,0 +1,30 @@
+"""Relatórios do grupo: arquivos temporários liberados em caso de falha."""
+import tempfile
+from datetime import date, timedelta
+
+import pytest
+
+from orion import properties, reports
+
+
+def test_failed_property_closes_other_spools(db_path, tmp_path, monkeypatch):
+    opened = []
+
+    class Spool(tempfile.SpooledTemporaryFile):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            opened.append(self)
+
+    monkeypatch.setattr(reports.tempfile, 'SpooledTemporaryFile', Spool)
+    group = {
+        'ok': {'name': 'Ok', 'db_path': db_path},
+        'bad': {'name': 'Bad', 'db_path': str(tmp_path / 'ausente' / 'orion.db')},
+    }
+    start = date.today()
+
+    with pytest.raises(properties.PropertyError, match="bad"):
+        reports.render_group(['daily_performance', 'revenue_by_source'], start, start + timedelta(days=30),
+                             properties=group)
+
+    assert len(opened) == 2
+    assert all(spool.closed for spool in opened)
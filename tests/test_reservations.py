@@ -0,0 +1,35 @@
+"""Paginação por keyset da listagem de reservas."""
+from datetime import date, timedelta
+
+import pytest
+
+from orion import booking, database, reservations
+
+
+def _walk(db_path, **kwargs):
+    ids, cursor = [], None
+    while True:
+        page, cursor = reservations.list_reservations(after=cursor, limit=7, db_path=db_path, **kwargs)
+        ids.extend(page['id'].tolist())
+        if cursor is None:
+            return ids
+
+
+@pytest.mark.parametrize('sort', sorted(reservations.SORT_COLUMNS))
+@pytest.mark.parametrize('descending', [True, False])
+def test_every_reservation_appears_once(db_path, sort, descending):
+    first = date.today() + timedelta(days=30)
+    for week in range(8):
+        check_in = first + timedelta(days=7 * week)
+        for unit_id in (1, 2, 3, 5):  # a unidade 4 está em manutenção
+            booking.create_reservation(unit_id, check_in, check_in + timedelta(days=2 + unit_id), 'Direto',
+                                       db_path=db_path)
+    # Reservas importadas sem data de criação
+    with database.transaction(db_path, immediate=True) as conn:
+        conn.execute("UPDATE reservations SET created_at = NULL WHERE id % 3 = 0")
+        expected = sorted(row[0] for row in conn.execute("SELECT id FROM reservations"))
+
+    ids = _walk(db_path, sort=sort, descending=descending)
+
+    assert len(ids) == len(set(ids))
+    assert sorted(ids) == expected
@@ -0,0 +1,50 @@
+"""Exportação de snapshots e reimportação dos feeds."""
+from datetime import date, timedelta
+
+import pytest
+
+from orion import booking, database, snapshots
+
+
+def _counts(db_path):
+    with database.connection(db_path) as conn:
+        return {
+            table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in snapshots.SNAPSHOT_TABLES
+        }
+
+
+@pytest.fixture
+def other_db(tmp_path):
+    path = str(tmp_path / "destino.db")
+    database.get_pool(path)
+    yield path
+    database.get_pool(path).close_all()
+
+
+def test_export_then_import_preserves_row_counts(db_path, other_db, tmp_path):
+    first = date.today() + timedelta(days=10)
+    for week in range(10):  # reservas em vários meses (várias partições)
+        check_in = first + timedelta(days=7 * week)
+        for unit_id in (1, 2, 3, 5):
+            booking.create_reservation(unit_id, check_in, check_in + timedelta(days=3), 'Direto', db_path=db_path)
+    expected = _counts(db_path)
+
+    manifest = snapshots.export_snapshot(str(tmp_path / "snapshot"), chunk_rows=7, db_path=db_path)
+
+    assert {table: info['rows'] for table, info in manifest['tables'].items()} == expected
+    assert snapshots.read_snapshot(str(tmp_path / "snapshot"), 'reservations').num_rows == expected['reservations']
+
+    imported = snapshots.import_feed(str(tmp_path / "snapshot" / "reservations"), 'reservations',
+                                     batch_size=7, commit_rows=10, db_path=other_db)
+    snapshots.import_feed(str(tmp_path / "snapshot" / "rates"), 'rates', upsert=True, db_path=other_db)
+
+    assert imported == expected['reservations']
+    counts = _counts(other_db)
+    assert counts['reservations'] == expected['reservations']
+    assert counts['rates'] == expected['rates']
+    assert booking.count_overbookings(other_db) == 0
+
+    # Reimportar com upsert atualiza pela chave, sem duplicar
+    snapshots.import_feed(str(tmp_path / "snapshot" / "reservations"), 'reservations', upsert=True, db_path=other_db)
+    assert _counts(other_db)['reservations'] == expected['reservations']
@@ -0,0 +1,15 @@
+"""Orçamentos de partida e de reexecução do app (``startup.*`` dos benchmarks)."""
+import pytest
+
+from orion import benchmarks
+
+BUDGETS = {case['name']: case['budget_ms'] for case in benchmarks._cases}
+
+
+@pytest.mark.slow
+def test_startup_budgets(db_path):
+    # Duas partidas: a primeira também aquece o cache de disco do interpretador
+    timings = [benchmarks.run_app(db_path, reruns=10) for _ in range(2)]
+
+    assert min(t['first_render_ms'] for t in timings) <= BUDGETS['startup.cold_first_render']
+    assert min(t['rerun_ms'] for t in timings) <= BUDGETS['startup.rerun']